@@ -1,5 +0,0 @@
-"""
-Add feedback and visual support fields to messages table
-Run this after creating with: alembic revision --autogenerate -m "add feedback fields"
-"""
-# This is just a reference - we'll update models.py directly for now
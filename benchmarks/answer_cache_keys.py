@@ -0,0 +1,64 @@
+"""
+Answer cache key check
+
+Builds cache keys the way RAGService does and checks that conversation
+context is part of the key exactly when the question depends on it:
+a bare follow-up ("Why?") asked after two different questions must get
+two different keys, while a standalone question shares one key across
+conversations. Exits non-zero on any mismatch.
+
+    python benchmarks/answer_cache_keys.py [--verbose]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.answer_cache import cache_key
+from services.context_service import ChatContext
+
+FOLLOW_UPS = ["Why?", "How?", "Yes please", "What happened next?", "Can you give an example?", "Is it big?"]
+STANDALONE = ["What is a numerator?", "Why is the sky blue?", "How do volcanoes erupt?", "Who was Rosa Parks?"]
+
+
+def conversation(question: str, answer: str) -> ChatContext:
+    return ChatContext(history=[
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": answer}
+    ])
+
+
+def key(question: str, context: ChatContext) -> str:
+    return cache_key(question, "2nd-3rd", 1, 8, context.cache_digest(question))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="Print every check, not just mismatches")
+    args = parser.parse_args()
+
+    volcanoes = conversation("Why do volcanoes erupt?", "Hot magma pushes up through the crust.")
+    leaves = conversation("Why do leaves change color?", "Trees stop making chlorophyll in the fall.")
+    fresh = ChatContext()
+    failures = 0
+    checks = 0
+
+    def check(ok: bool, label: str):
+        nonlocal failures, checks
+        checks += 1
+        failures += not ok
+        if args.verbose or not ok:
+            print(f"{'✅' if ok else '❌'} {label}")
+
+    for question in FOLLOW_UPS:
+        check(key(question, volcanoes) != key(question, leaves), f"{question!r} keyed to its conversation")
+    for question in STANDALONE:
+        check(key(question, volcanoes) == key(question, leaves) == key(question, fresh), f"{question!r} shared across conversations")
+
+    print(f"\n{checks - failures}/{checks} cache key checks passed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
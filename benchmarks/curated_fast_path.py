@@ -0,0 +1,94 @@
+"""
+Curated fast path calibration check
+
+Runs example questions through CuratedAnswerService.try_answer and checks
+that the ones content/ covers are served from the expected file and the
+rest go to Claude. Exits non-zero on any mismatch, so re-run it after
+changing the CURATED_FAST_PATH_* settings or the curriculum files.
+
+Calibration (content/ as shipped): a section must contain every topic word
+of the question (MIN_COVERAGE 1.0) - this alone rejects "Why is the sky
+blue?" style near-misses whose best section shares only one word. The
+BM25 floor of 5.0 matches RETRIEVAL_MIN_SCORE; the old 6.0 dropped short
+questions like "What is a numerator?". A heading match or a cosine of 0.3
+(down from 0.5, which only exact heading restatements reached) then
+confirms the section is about the question rather than mentioning it.
+
+    python benchmarks/curated_fast_path.py [--verbose]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.curated_answer_service import CuratedAnswerService
+
+# (question, file the answer should come from)
+SERVED = [
+    ("What is a numerator?", "math_fractions.md"),
+    ("What is a denominator?", "math_fractions.md"),
+    ("What is a fraction?", "math_fractions.md"),
+    ("How many bones are in the human body?", "science_body_systems.md"),
+    ("How does the heart pump blood?", "science_body_systems.md"),
+    ("What do the lungs do?", "science_body_systems.md"),
+    ("How many inches are in a foot?", "math_measurement_us.md"),
+    ("How many cents are in a dollar?", "math_time_money.md"),
+    ("What is multiplication?", "math_multiplication.md"),
+    ("What is subtraction?", "math_subtraction.md"),
+    ("What is division?", "math_division.md"),
+    ("What is a decimal?", "math_decimals.md"),
+    ("How do plants grow?", "science_plants_life_cycle.md"),
+    ("What is a seed?", "science_plants_life_cycle.md"),
+    ("What is a hurricane?", "science_us_weather.md"),
+]
+
+DECLINED = [
+    "Why is the sky blue?",
+    "What is a black hole?",
+    "How do you play soccer?",
+    "How do I make friends?",
+    "What is 7 times 8?",
+    "What time is it?",
+    "How is chocolate made?",
+    "Why do cats purr?",
+    "How do airplanes fly?",
+    "What is the biggest number?",
+    "What is the tallest tree?",
+    "Why do teachers get paid money?",
+    "What happens when you die?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="Print every question, not just mismatches")
+    args = parser.parse_args()
+
+    curated = CuratedAnswerService()
+    failures = 0
+
+    for question, expected in SERVED:
+        match = curated.best_match(question)
+        result = curated.try_answer(question, "3rd", 1)
+        served_from = result["sources"][0]["file"] if result else None
+        ok = served_from == expected
+        failures += not ok
+        if args.verbose or not ok:
+            detail = f"coverage {match.coverage:.2f}, heading {match.heading_match}, cosine {match.hit.score:.2f}" if match else "no candidate"
+            print(f"{'✅' if ok else '❌'} served   {question!r}: {served_from or 'declined'} (want {expected}; {detail})")
+
+    for question in DECLINED:
+        result = curated.try_answer(question, "3rd", 1)
+        ok = result is None
+        failures += not ok
+        if args.verbose or not ok:
+            print(f"{'✅' if ok else '❌'} declined {question!r}: {result['sources'][0]['file'] if result else 'declined'}")
+
+    total = len(SERVED) + len(DECLINED)
+    print(f"\n{total - failures}/{total} questions routed as expected")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Dashboard query budget check
+
+Seeds one parent per --children value, each child with a few conversations
+of questions and answers, then requests /dashboard/overview and counts the
+SQL statements it runs. The count must be the same for every family size
+and within --budget; the script exits non-zero otherwise, so a per-child
+query (N+1) coming back fails it.
+
+Runs fully offline against SQLite (pip install aiosqlite):
+
+    python benchmarks/dashboard_queries.py [--children 1 5 25] [--budget 3]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "nia_bench_dashboard.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+os.environ.setdefault("DEBUG", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from sqlalchemy import text
+
+from auth import AuthService
+from database import AsyncSessionLocal, Base, engine, migrate_db
+from main import app
+from models import Child, Conversation, Message, User
+from utils.query_counter import count_queries
+
+CONVERSATIONS_PER_CHILD = 4
+QUESTIONS_PER_CONVERSATION = 5
+
+
+async def seed_family(index: int, children: int) -> str:
+    """A parent with `children` children; returns the parent's access token"""
+    async with AsyncSessionLocal() as db:
+        parent = User(email=f"parent{index}@example.com", hashed_password="x", full_name=f"Parent {index}")
+        db.add(parent)
+        await db.flush()
+        for c in range(children):
+            child = Child(
+                parent_id=parent.id,
+                first_name=f"Kid {c}",
+                date_of_birth=datetime(2016, 5, 1),
+                grade_level="3rd",
+                is_active=c % 4 != 3
+            )
+            db.add(child)
+            await db.flush()
+            # Uneven activity so most_active_child has a clear winner
+            for v in range(CONVERSATIONS_PER_CHILD if c % 2 == 0 else 1):
+                conversation = Conversation(child_id=child.id, title=f"Topic {v}", message_count=0)
+                db.add(conversation)
+                await db.flush()
+                for q in range(QUESTIONS_PER_CONVERSATION + c):
+                    db.add(Message(conversation_id=conversation.id, role="child", content=f"Question {q}?"))
+                    db.add(Message(conversation_id=conversation.id, role="assistant", content=f"Answer {q}."))
+        await db.commit()
+        return AuthService.create_access_token({"sub": parent.id})
+
+
+async def run(family_sizes, budget: int, samples: int) -> int:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    await migrate_db()
+
+    counts = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i, children in enumerate(family_sizes):
+            token = await seed_family(i, children)
+            headers = {"Authorization": f"Bearer {token}"}
+            timings = []
+            for _ in range(samples):
+                with count_queries(engine) as counter:
+                    start = time.perf_counter()
+                    response = await client.get("/api/v1/dashboard/overview", headers=headers)
+                    timings.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+            counts[children] = counter.count
+            overview = response.json()
+            print(f"  {children:>4} children  {counter.count} queries  p50={statistics.median(timings):6.1f} ms  "
+                  f"questions={overview['total_questions']}  most_active={overview['most_active_child']['name']}")
+
+    await engine.dispose()
+    # The auth lookup is part of every request's budget
+    failures = []
+    if len(set(counts.values())) > 1:
+        failures.append(f"query count grows with family size: {counts}")
+    if max(counts.values()) > budget:
+        failures.append(f"{max(counts.values())} queries is over the budget of {budget}")
+    for failure in failures:
+        print(f"FAIL  {failure}")
+    if not failures:
+        print(f"PASS  {max(counts.values())} queries for every family size (budget {budget})")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--children", type=int, nargs="+", default=[1, 5, 25])
+    parser.add_argument("--budget", type=int, default=3, help="queries allowed per request, auth lookup included")
+    parser.add_argument("--samples", type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.children, args.budget, args.samples)))
+
+
+if __name__ == "__main__":
+    main()
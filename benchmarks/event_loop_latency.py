@@ -0,0 +1,149 @@
+"""
+Event loop latency benchmark
+
+Fires N concurrent /conversation/message requests at the fake LLM backend
+(LLM_BACKEND=fake) set to take --delay seconds to answer, then measures /health and /dashboard/overview
+latency while those calls are in flight. With the async client the probe
+latency should stay flat; --blocking swaps in the old sync call path to show
+the whole worker stalling.
+
+Runs fully offline against SQLite (pip install aiosqlite):
+
+    python benchmarks/event_loop_latency.py --concurrency 50 --delay 2.0
+    python benchmarks/event_loop_latency.py --concurrency 5 --delay 1.0 --blocking
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "nia_bench_event_loop.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("CURATED_FAST_PATH_ENABLED", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from config import settings
+from database import engine, Base, AsyncSessionLocal
+from models import User, Child
+from auth import AuthService
+from services import rag_service
+from main import app
+
+
+def install_claude_stub(delay: float, blocking: bool):
+    """Serve Claude from the fake backend with a fixed delay"""
+    settings.LLM_BACKEND = "fake"
+    settings.FAKE_LLM_LATENCY_DISTRIBUTION = "fixed"
+    settings.FAKE_LLM_LATENCY_MEDIAN_SECONDS = delay
+    rag = rag_service.get_rag_service()
+
+    if blocking:
+        # Reproduce the pre-aquery behaviour: a sync Claude call inside the route
+        async def blocking_create(request):
+            latency, error, message = rag.backend._plan(request)
+            time.sleep(latency)
+            if error is not None:
+                raise error
+            return message
+        rag.backend.create = blocking_create
+
+
+async def seed_database():
+    """Create a fresh schema with one parent and one child"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with AsyncSessionLocal() as db:
+        parent = User(email="bench@example.com", hashed_password="x", full_name="Bench Parent")
+        db.add(parent)
+        await db.flush()
+        child = Child(
+            parent_id=parent.id,
+            first_name="Ada",
+            date_of_birth=datetime(2016, 5, 1),
+            grade_level="3rd"
+        )
+        db.add(child)
+        await db.commit()
+        return AuthService.create_access_token({"sub": parent.id}), child.id
+
+
+async def probe(client: httpx.AsyncClient, token: str, samples: int, interval: float) -> dict:
+    """Time /health and /dashboard/overview requests"""
+    latencies = {"/health": [], "/api/v1/dashboard/overview": []}
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for _ in range(samples):
+        for path in latencies:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            response.raise_for_status()
+            latencies[path].append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+
+    return latencies
+
+
+def summarize(label: str, latencies: dict):
+    for path, values in latencies.items():
+        values = sorted(values)
+        p95 = values[max(0, int(len(values) * 0.95) - 1)]
+        print(f"  {label:<10} {path:<30} p50={statistics.median(values):8.1f} ms  "
+              f"p95={p95:8.1f} ms  max={values[-1]:8.1f} ms")
+
+
+async def run(concurrency: int, delay: float, samples: int, blocking: bool):
+    install_claude_stub(delay, blocking)
+    token, child_id = await seed_database()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        idle = await probe(client, token, samples, interval=0.01)
+
+        async def send(i: int):
+            response = await client.post("/api/v1/conversation/message", json={
+                "child_id": str(child_id),
+                "text": f"What is a fraction? ({i})",
+                "grade_level": "3rd"
+            })
+            response.raise_for_status()
+
+        start = time.perf_counter()
+        in_flight = [asyncio.create_task(send(i)) for i in range(concurrency)]
+        await asyncio.sleep(0.05)
+        loaded = await probe(client, token, samples, interval=delay / (samples * 2))
+        await asyncio.gather(*in_flight)
+        wall = time.perf_counter() - start
+
+    mode = "blocking sync client" if blocking else "async client"
+    print(f"\n{concurrency} concurrent LLM calls x {delay:.1f}s ({mode}), finished in {wall:.1f}s")
+    summarize("idle", idle)
+    summarize("loaded", loaded)
+
+    await rag_service.close_rag_service()
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=2.0, help="simulated Claude latency in seconds")
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--blocking", action="store_true", help="use the sync client inside the route")
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.delay, args.samples, args.blocking))
+
+
+if __name__ == "__main__":
+    main()
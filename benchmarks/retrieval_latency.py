@@ -0,0 +1,74 @@
+"""
+Curriculum retrieval latency benchmark
+
+Builds the BM25 index over content/ and times top-k lookups for a mix of
+curriculum and off-curriculum questions, then times batched lookups on the
+hashed TF-IDF matrix as the curriculum is replicated --scale times.
+
+    python benchmarks/retrieval_latency.py [--iterations 2000] [--top-k 3] [--scale 1 10 100]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings
+from services.retrieval_service import RetrievalService
+from services.vector_index import VectorIndex
+
+QUESTIONS = [
+    "What is a numerator?",
+    "How do I add decimals?",
+    "What does the heart do?",
+    "Why did the Civil War start?",
+    "How do plants make food?",
+    "What is 7 times 8?",
+    "Who was Rosa Parks?",
+    "What is a tornado?",
+    "Why is the sky blue?",
+    "Tell me about dinosaurs",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100],
+                        help="curriculum copies for the vector index scaling run")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    service = RetrievalService()
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Index build: {len(service.chunks)} chunks, {len(service.index.postings)} terms in {build_ms:.1f} ms\n")
+
+    for question in QUESTIONS:
+        timings = []
+        for _ in range(args.iterations):
+            t0 = time.perf_counter()
+            hits = service.index.search(question, args.top_k)
+            timings.append((time.perf_counter() - t0) * 1_000_000)
+        timings.sort()
+        best = f"{hits[0].chunk.chunk_id} ({hits[0].score:.1f})" if hits else "-"
+        print(f"{question:<32} p50={statistics.median(timings):6.1f} us  "
+              f"p99={timings[int(len(timings) * 0.99) - 1]:6.1f} us  top={best}")
+
+    print(f"\nVector index, batch of {len(QUESTIONS)} questions per matmul (dim={settings.VECTOR_DIM})")
+    for scale in args.scale:
+        index = VectorIndex.build(service.chunks * scale, settings.VECTOR_DIM)
+        iterations = max(5, args.iterations // (10 * scale))
+        timings = []
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            index.search_batch(QUESTIONS, args.top_k)
+            timings.append((time.perf_counter() - t0) * 1000)
+        print(f"  {len(index.chunks):>7} chunks ({index.matrix.nbytes / 1e6:7.1f} MB)  "
+              f"batch p50={statistics.median(timings):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
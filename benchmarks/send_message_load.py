@@ -0,0 +1,116 @@
+"""
+send_message load test
+
+Drives POST /conversation/message (or /message/stream) end to end - rate
+limiting, retrieval, caching, the LLM call, formatting and DB writes -
+against the deterministic fake LLM backend, so it runs on a laptop or CI
+box with no network and no API key.
+
+    python benchmarks/send_message_load.py --requests 500 --concurrency 50
+    python benchmarks/send_message_load.py --unique-questions 20 --error-rate 0.1
+    python benchmarks/send_message_load.py --stream --latency 2.0 --spread 0.8
+
+Fewer --unique-questions means more answer-cache hits and coalesced calls.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.gettempdir(), "nia_bench_send_message.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{DB_PATH}")
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from config import settings
+from database import engine
+from main import app
+from event_loop_latency import seed_database
+
+TOPICS = [
+    "volcanoes", "fractions", "the water cycle", "honey bees", "the moon",
+    "the civil war", "multiplication", "photosynthesis", "tornadoes", "the heart",
+    "dinosaurs", "decimals", "the founding fathers", "bald eagles", "rainbows"
+]
+
+
+def percentile(values, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(len(values) * pct) - 1))]
+
+
+async def run(args):
+    settings.FAKE_LLM_LATENCY_DISTRIBUTION = args.distribution
+    settings.FAKE_LLM_LATENCY_MEDIAN_SECONDS = args.latency
+    settings.FAKE_LLM_LATENCY_SPREAD = args.spread
+    settings.FAKE_LLM_ERROR_RATE = args.error_rate
+    settings.FAKE_LLM_TOKENS_PER_SECOND = args.tokens_per_second
+
+    _, child_id = await seed_database()
+    path = "/api/v1/conversation/message/stream" if args.stream else "/api/v1/conversation/message"
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, statuses = [], {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+        async def send(i: int):
+            topic = TOPICS[i % len(TOPICS)]
+            text = f"Can you tell me about {topic}? (variant {i % args.unique_questions})"
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(path, json={
+                    "child_id": str(child_id),
+                    "text": text,
+                    "grade_level": "3rd",
+                    "current_depth": 1 + i % 3
+                })
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(send(i) for i in range(args.requests)))
+        wall = time.perf_counter() - start
+
+        metrics = (await client.get("/metrics")).json()
+
+    print(f"\n{args.requests} requests, concurrency {args.concurrency}, "
+          f"fake LLM {args.distribution} median {args.latency:.2f}s, error rate {args.error_rate:.0%}")
+    print(f"  throughput   {args.requests / wall:8.1f} req/s ({wall:.1f}s)")
+    print(f"  latency      p50={statistics.median(latencies):8.1f} ms  p95={percentile(latencies, 0.95):8.1f} ms  "
+          f"p99={percentile(latencies, 0.99):8.1f} ms")
+    print(f"  status codes {statuses}")
+    print(f"  answer cache {metrics['answer_cache']}")
+    print(f"  coalescing   {metrics['single_flight']}")
+    breaker = metrics["claude_circuit_breaker"]
+    print(f"  breaker      state={breaker['state']} failures={breaker['failures']} retries={breaker['retries']} "
+          f"opened={breaker['opened']}")
+
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=30)
+    parser.add_argument("--unique-questions", type=int, default=1000, help="distinct questions per topic")
+    parser.add_argument("--stream", action="store_true", help="use /message/stream")
+    parser.add_argument("--distribution", choices=["fixed", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--latency", type=float, default=1.0, help="median fake LLM latency in seconds")
+    parser.add_argument("--spread", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
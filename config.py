@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from typing import List
+import os
 
 class Settings(BaseSettings):
     # Application
@@ -18,6 +19,9 @@ class Settings(BaseSettings):
             return url.replace("postgresql://", "postgresql+asyncpg://", 1)
         return url
     
+    # Run Alembic migrations at startup (turn off when deploys run `alembic upgrade head`)
+    DB_AUTO_MIGRATE: bool = True
+    
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
     JWT_SECRET_KEY: str = "your-jwt-secret-change-in-production"
@@ -30,6 +34,107 @@ class Settings(BaseSettings):
     TEMPERATURE: float = 0.7
     MAX_TOKENS: int = 1000
     
+    # Curriculum retrieval
+    CONTENT_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+    RETRIEVAL_TOP_K: int = 3
+    RETRIEVAL_MIN_SCORE: float = 5.0
+    VECTOR_DIM: int = 4096
+    VECTOR_INDEX_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "content_vectors.npy")
+    TOPIC_GRAPH_PATH: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "topic_graph.npz")
+    TOPIC_GRAPH_NEIGHBORS: int = 8
+    RELATED_TOPICS_MAX: int = 3
+    
+    # Curated-content fast path (depth-1 answers served from content/ without Claude)
+    CURATED_FAST_PATH_ENABLED: bool = True
+    CURATED_FAST_PATH_MIN_SCORE: float = 5.0  # BM25 floor for candidate sections
+    CURATED_FAST_PATH_MIN_COVERAGE: float = 1.0  # share of the question's topic words the section must contain
+    CURATED_FAST_PATH_MIN_SIMILARITY: float = 0.3  # cosine needed when no question word is in the headings
+    CURATED_FAST_PATH_SUBJECTS: List[str] = ["math", "science"]
+    
+    # Answer cache (L1 in-process LRU, L2 Redis when REDIS_URL is set)
+    REDIS_URL: str = ""
+    ANSWER_CACHE_MAX_ENTRIES: int = 2048
+    ANSWER_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    ANSWER_CACHE_WEB_TTL_SECONDS: int = 15 * 60
+    SINGLE_FLIGHT_LEASE_SECONDS: float = 60.0
+    SINGLE_FLIGHT_POLL_SECONDS: float = 0.1
+    
+    # Model tiering ("tiered" or "fixed", see services/model_router.py)
+    MODEL_ROUTING_POLICY: str = "tiered"
+    MODEL_STANDARD: str = "claude-sonnet-4-20250514"
+    MODEL_STANDARD_LABEL: str = "claude-sonnet-4"
+    MODEL_FAST: str = "claude-3-5-haiku-20241022"
+    MODEL_FAST_LABEL: str = "claude-3-5-haiku"
+    MODEL_LATENCY_TARGET_P95_SECONDS: float = 8.0
+    MODEL_LATENCY_WINDOW_SECONDS: float = 300.0
+    
+    # Attach the web_search tool only to questions that need fresh information
+    WEB_SEARCH_CLASSIFIER_ENABLED: bool = True
+    
+    # Multi-turn context (estimated tokens)
+    CONTEXT_ENABLED: bool = True
+    CONTEXT_HISTORY_TOKEN_BUDGET: int = 1200
+    CONTEXT_SUMMARY_TOKEN_BUDGET: int = 300
+    
+    # Claude call resilience (per-request deadline, retries, circuit breaker)
+    LLM_DEADLINE_SECONDS: float = 25.0
+    LLM_STREAM_IDLE_SECONDS: float = 15.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_SECONDS: float = 0.5
+    LLM_RETRY_MAX_SECONDS: float = 4.0
+    BREAKER_CONSECUTIVE_FAILURES: int = 5
+    BREAKER_WINDOW: int = 20
+    BREAKER_MIN_CALLS: int = 10
+    BREAKER_FAILURE_RATIO: float = 0.5
+    BREAKER_SLOW_CALL_SECONDS: float = 20.0
+    BREAKER_COOLDOWN_SECONDS: float = 30.0
+    
+    # Rate limits and daily Claude quotas (0 disables a quota)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_CHILD_PER_MINUTE: float = 6.0
+    RATE_LIMIT_CHILD_BURST: int = 3
+    RATE_LIMIT_PARENT_PER_MINUTE: float = 20.0
+    RATE_LIMIT_PARENT_BURST: int = 10
+    QUOTA_CHILD_DAILY_TOKENS: int = 100_000
+    QUOTA_PARENT_DAILY_SPEND_USD: float = 2.0
+    
+    # LLM backend: "anthropic", or "fake" for offline load tests and CI
+    LLM_BACKEND: str = "anthropic"
+    FAKE_LLM_SEED: int = 42
+    FAKE_LLM_LATENCY_DISTRIBUTION: str = "lognormal"  # fixed | uniform | lognormal
+    FAKE_LLM_LATENCY_MEDIAN_SECONDS: float = 1.5
+    FAKE_LLM_LATENCY_SPREAD: float = 0.5
+    FAKE_LLM_TOKENS_PER_SECOND: float = 80.0
+    FAKE_LLM_ERROR_RATE: float = 0.0
+    FAKE_LLM_TIMEOUT_RATE: float = 0.0
+    
+    # Speculative pre-generation of the next depth's answer
+    SPECULATION_ENABLED: bool = True
+    SPECULATION_MAX_CONCURRENCY: int = 4
+    SPECULATION_TTL_SECONDS: float = 600.0
+    SPECULATION_MIN_SAMPLES: int = 20
+    SPECULATION_MAX_WASTE_RATIO: float = 0.6
+    SPECULATION_COOLDOWN_SECONDS: float = 900.0
+    
+    # Local safety screen on questions and answers
+    SAFETY_SCREEN_ENABLED: bool = True
+    
+    # Local emoji/ASCII/SVG visuals on answers
+    VISUALS_ENABLED: bool = True
+    VISUALS_MAX: int = 3
+    VISUAL_EMOJI_MAX: int = 5
+    
+    # Offline batch pre-generation of popular answers (prewarm_answers.py)
+    PREWARM_TOP_N: int = 200
+    PREWARM_LOOKBACK_DAYS: int = 30
+    PREWARM_MIN_COUNT: int = 3
+    PREWARM_MAX_ATTEMPTS: int = 3
+    PREWARM_POLL_SECONDS: float = 60.0
+    PREWARM_STATE_PATH: str = "prewarm_state.json"
+    
+    # Conversation export: rows fetched per server-side cursor batch
+    EXPORT_BATCH_SIZE: int = 1000
+    
     # US-First Settings
     DEFAULT_TIMEZONE: str = "America/New_York"
     DEFAULT_LOCALE: str = "en-US"
@@ -1,7 +1,9 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from config import settings
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +31,40 @@ async def get_db():
         finally:
             await session.close()
 
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-    logger.info("✅ Database tables created successfully")
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+BASELINE_REVISION = "0001_baseline"
+
+# pg_advisory_lock key so only one worker migrates at a time
+MIGRATION_LOCK_KEY = 7_311_948_201
+
+def _upgrade(connection):
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    config.attributes["connection"] = connection
+
+    tables = set(inspect(connection).get_table_names())
+    # Alembic manages its own transactions (and PostgreSQL index builds run outside one)
+    connection.commit()
+    if "users" in tables and "alembic_version" not in tables:
+        # Built by Base.metadata.create_all before migrations existed
+        command.stamp(config, BASELINE_REVISION)
+        logger.info(f"✅ Existing database stamped at {BASELINE_REVISION}")
+    command.upgrade(config, "head")
+
+async def migrate_db():
+    """Bring the schema up to the latest Alembic revision"""
+    async with engine.connect() as conn:
+        postgres = conn.dialect.name == "postgresql"
+        if postgres:
+            await conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            await conn.commit()
+        try:
+            await conn.run_sync(_upgrade)
+        finally:
+            if postgres:
+                await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                await conn.commit()
+    logger.info("✅ Database schema is up to date")
@@ -7,6 +7,7 @@ export default function ChatInterface() {
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
   const [conversationId, setConversationId] = useState(null);
+  const [depth, setDepth] = useState(1);
   const messagesEndRef = useRef(null);
 
   const childId = "1";
@@ -31,31 +32,30 @@ export default function ChatInterface() {
     }
   };
 
-  const handleSubmit = async (e) => {
-    e.preventDefault();
-    if (!input.trim() || loading) return;
-
+  // Typed questions start over at depth 1; tapping "yes" on a follow-up
+  // prompt goes one level deeper, which is what the server pre-generates
+  const sendMessage = async (text, currentDepth) => {
     const userMessage = {
       id: Date.now(),
       role: 'child',
-      content: input,
+      content: text,
       timestamp: new Date()
     };
 
     setMessages(prev => [...prev, userMessage]);
-    setInput('');
     setLoading(true);
 
     try {
       const response = await conversationAPI.sendMessage({
         conversation_id: conversationId,
         child_id: childId,
-        text: input,
+        text,
         grade_level: gradeLevel,
-        current_depth: 1
+        current_depth: currentDepth
       });
 
-      setConversationId(response.conversation_id);
+      setConversationId(String(response.conversation_id));
+      setDepth(response.tutoring_depth_level);
 
       const aiMessage = {
         id: response.message_id,
@@ -63,6 +63,7 @@ export default function ChatInterface() {
         content: response.text,
         sourceLabel: response.source_label,
         visualContent: response.visual_content,
+        followUpPrompt: response.follow_up_prompt,
         timestamp: new Date(),
         feedbackGiven: null
       };
@@ -81,6 +82,25 @@ export default function ChatInterface() {
     }
   };
 
+  const handleSubmit = async (e) => {
+    e.preventDefault();
+    if (!input.trim() || loading) return;
+
+    const text = input;
+    setInput('');
+    await sendMessage(text, 1);
+  };
+
+  const handleFollowUp = async (messageId, option) => {
+    if (loading) return;
+    setMessages(prev => prev.map(msg =>
+      msg.id === messageId ? { ...msg, followUpPrompt: null } : msg
+    ));
+    if (option.id === 'yes') {
+      await sendMessage(option.text, Math.min(depth + 1, 3));
+    }
+  };
+
   return (
     <div className="min-h-screen bg-gradient-to-br from-indigo-50 via-purple-50 to-blue-50">
       {/* Header */}
@@ -141,6 +161,25 @@ export default function ChatInterface() {
                       </div>
                     )}
 
+                    {/* Follow-up Options (latest answer only) */}
+                    {message.role === 'assistant' && message.followUpPrompt && index === messages.length - 1 && (
+                      <div className="mt-3">
+                        <p className="text-sm text-gray-700 mb-2">{message.followUpPrompt.text}</p>
+                        <div className="flex flex-wrap gap-2">
+                          {message.followUpPrompt.options.map(option => (
+                            <button
+                              key={option.id}
+                              onClick={() => handleFollowUp(message.id, option)}
+                              className="px-3 py-1.5 rounded-lg text-xs font-medium bg-white border-2 border-purple-200 hover:border-purple-400 hover:bg-purple-50 transition-all"
+                              disabled={loading}
+                            >
+                              {option.text}
+                            </button>
+                          ))}
+                        </div>
+                      </div>
+                    )}
+
                     {/* Feedback Buttons */}
                     {message.role === 'assistant' && (
                       <div className="mt-3 pt-3 border-t border-gray-200 flex gap-2">
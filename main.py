@@ -4,8 +4,23 @@ from contextlib import asynccontextmanager
 import logging
 import os
 
-from database import engine, Base
+from database import migrate_db
+from config import settings
 from routers import conversation, auth, children, dashboard
+from services.rag_service import close_rag_service
+from services.retrieval_service import get_retrieval_service
+from services.answer_cache import get_answer_cache, close_answer_cache
+from services.request_coalescer import get_request_coalescer
+from services.curated_answer_service import get_curated_answer_service
+from services.model_router import get_model_router
+from services.web_search_classifier import get_web_search_classifier
+from services.llm_resilience import get_resilient_caller
+from services.rate_limiter import get_rate_limiter
+from services.speculation_service import get_speculation_service, close_speculation_service
+from services.answer_prewarm_service import load_prewarmed_answers
+from services.safety_service import get_safety_service
+from services.visual_service import get_visual_service
+from utils.pagination import NEXT_CURSOR_HEADER
 
 # Configure logging
 logging.basicConfig(
@@ -19,16 +34,24 @@ async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     logger.info("🌟 Nia is starting up...")
     
-    # Create database tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Apply pending Alembic migrations (or run `alembic upgrade head` before deploying)
+    if settings.DB_AUTO_MIGRATE:
+        await migrate_db()
     
-    logger.info("✅ Database tables created successfully")
+    # Build the curriculum index and visual engine before taking traffic
+    get_retrieval_service()
+    get_visual_service()
+    
+    # Answers pre-generated by prewarm_answers.py, for deployments without Redis
+    await load_prewarmed_answers()
     logger.info("✅ Nia API started successfully!")
     
     yield
     
     logger.info("👋 Nia is shutting down...")
+    await close_speculation_service()
+    await close_rag_service()
+    await close_answer_cache()
 
 # Create FastAPI app
 app = FastAPI(
@@ -45,6 +68,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers
@@ -69,6 +93,22 @@ async def health_check():
         "ai_service": "operational"
     }
 
+@app.get("/metrics")
+async def metrics():
+    """In-process counters for this worker"""
+    return {
+        "answer_cache": get_answer_cache().stats(),
+        "single_flight": get_request_coalescer().stats(),
+        "curated_fast_path": get_curated_answer_service().stats(),
+        "model_routing": get_model_router().stats(),
+        "web_search_classifier": get_web_search_classifier().stats(),
+        "claude_circuit_breaker": get_resilient_caller().stats(),
+        "rate_limiter": get_rate_limiter().stats(),
+        "speculation": get_speculation_service().stats(),
+        "safety": get_safety_service().stats(),
+        "visuals": get_visual_service().stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -0,0 +1,170 @@
+"""Baseline schema (what Base.metadata.create_all used to build)
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17 09:00:00
+
+Databases created by create_all before migrations existed are stamped at
+this revision by database.migrate_db() instead of running it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_baseline"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("phone", sa.String(), nullable=True),
+        sa.Column("role", sa.Enum("PARENT", "CHILD", "ADMIN", name="userrole"), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("is_verified", sa.Boolean(), nullable=False),
+        sa.Column("email_verified_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_login", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "children",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("parent_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("first_name", sa.String(), nullable=False),
+        sa.Column("nickname", sa.String(), nullable=True),
+        sa.Column("date_of_birth", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("grade_level", sa.String(), nullable=False),
+        sa.Column("pin_hash", sa.String(), nullable=True),
+        sa.Column("avatar_url", sa.String(), nullable=True),
+        sa.Column("learning_preferences", sa.JSON(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("requires_supervision", sa.Boolean(), nullable=False),
+        sa.Column("content_filter_level", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_active", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index("ix_children_id", "children", ["id"])
+
+    op.create_table(
+        "sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("access_token", sa.String(), nullable=False),
+        sa.Column("refresh_token", sa.String(), nullable=False),
+        sa.Column("device_info", sa.String(), nullable=True),
+        sa.Column("ip_address", sa.String(), nullable=True),
+        sa.Column("user_agent", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("last_used", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True)
+    )
+    op.create_index("ix_sessions_id", "sessions", ["id"])
+    op.create_index("ix_sessions_access_token", "sessions", ["access_token"], unique=True)
+    op.create_index("ix_sessions_refresh_token", "sessions", ["refresh_token"], unique=True)
+
+    op.create_table(
+        "consent_records",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column(
+            "consent_type",
+            sa.Enum("COPPA", "TERMS", "PRIVACY", "DATA_COLLECTION", name="consenttype"),
+            nullable=False
+        ),
+        sa.Column("granted", sa.Boolean(), nullable=False),
+        sa.Column("consent_text", sa.Text(), nullable=False),
+        sa.Column("version", sa.String(), nullable=False),
+        sa.Column("ip_address", sa.String(), nullable=True),
+        sa.Column("user_agent", sa.String(), nullable=True),
+        sa.Column("granted_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("revoked_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index("ix_consent_records_id", "consent_records", ["id"])
+
+    op.create_table(
+        "conversations",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("child_id", sa.Integer(), sa.ForeignKey("children.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("folder", sa.String(), nullable=False),
+        sa.Column("topics", sa.JSON(), nullable=True),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("total_depth_reached", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index("ix_conversations_id", "conversations", ["id"])
+
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "conversation_id", sa.Integer(),
+            sa.ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False
+        ),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("model_used", sa.String(), nullable=True),
+        sa.Column("source_type", sa.String(), nullable=True),
+        sa.Column("sources", sa.JSON(), nullable=True),
+        sa.Column("depth_level", sa.Integer(), nullable=False),
+        sa.Column("feedback_rating", sa.Integer(), nullable=True),
+        sa.Column("feedback_timestamp", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("visual_content", sa.JSON(), nullable=True),
+        sa.Column("visual_description", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True)
+    )
+    op.create_index("ix_messages_id", "messages", ["id"])
+
+    op.create_table(
+        "usage_logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("child_id", sa.Integer(), sa.ForeignKey("children.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("activity_type", sa.String(), nullable=False),
+        sa.Column("question", sa.Text(), nullable=True),
+        sa.Column("response_type", sa.String(), nullable=True),
+        sa.Column("session_duration", sa.Integer(), nullable=True),
+        sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True)
+    )
+    op.create_index("ix_usage_logs_id", "usage_logs", ["id"])
+
+    op.create_table(
+        "audit_logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("child_id", sa.Integer(), nullable=True),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("resource", sa.String(), nullable=False),
+        sa.Column("details", sa.JSON(), nullable=True),
+        sa.Column("ip_address", sa.String(), nullable=True),
+        sa.Column("user_agent", sa.String(), nullable=True),
+        sa.Column("success", sa.Boolean(), nullable=False),
+        sa.Column("timestamp", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True)
+    )
+    op.create_index("ix_audit_logs_id", "audit_logs", ["id"])
+
+
+def downgrade() -> None:
+    for table in (
+        "audit_logs", "usage_logs", "messages", "conversations",
+        "consent_records", "sessions", "children", "users"
+    ):
+        op.drop_table(table)
+    sa.Enum(name="consenttype").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="userrole").drop(op.get_bind(), checkfirst=True)
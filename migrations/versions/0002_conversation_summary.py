@@ -0,0 +1,37 @@
+"""Rolling context summary columns on conversations
+
+Revision ID: 0002_conversation_summary
+Revises: 0001_baseline
+Create Date: 2026-10-17 09:05:00
+
+Databases built by create_all after the columns were added to models.py
+already have them, so each one is only added when missing.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_conversation_summary"
+down_revision: Union[str, None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("conversations")}
+    with op.batch_alter_table("conversations") as batch:
+        if "summary" not in existing:
+            batch.add_column(sa.Column("summary", sa.Text(), nullable=True))
+        if "summary_message_count" not in existing:
+            batch.add_column(
+                sa.Column("summary_message_count", sa.Integer(), server_default="0", nullable=False)
+            )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("conversations") as batch:
+        batch.drop_column("summary_message_count")
+        batch.drop_column("summary")
@@ -0,0 +1,63 @@
+"""Indexes for the dashboard, stats and conversation queries
+
+Revision ID: 0003_query_indexes
+Revises: 0002_conversation_summary
+Create Date: 2026-10-17 09:10:00
+
+Every parent-facing query walks children -> conversations -> messages by
+foreign key and filters on role and time; none of those columns had an
+index, so each page load scanned messages. On PostgreSQL the indexes are
+built CONCURRENTLY so a large messages table stays writable meanwhile.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_query_indexes"
+down_revision: Union[str, None] = "0002_conversation_summary"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+QUESTIONS_ONLY = sa.text("role = 'child'")
+
+# (name, table, columns, partial-index condition) - kept in step with models.py
+INDEXES = [
+    # Child.parent_id == current user on every dashboard request
+    ("ix_children_parent_id", "children", ["parent_id"], None),
+    # Logout / session listing by user
+    ("ix_sessions_user_id", "sessions", ["user_id"], None),
+    # Conversation lists (newest first) and per-child counts
+    ("ix_conversations_child_updated", "conversations", ["child_id", "updated_at", "id"], None),
+    # Date-range filters and exports in creation order
+    ("ix_conversations_child_created", "conversations", ["child_id", "created_at"], None),
+    # Transcripts and context windows in (created_at, id) order
+    ("ix_messages_conversation_created", "messages", ["conversation_id", "created_at", "id"], None),
+    # Question counts and recent questions - about half the rows of the full index
+    ("ix_messages_questions", "messages", ["conversation_id", "created_at", "id"], QUESTIONS_ONLY),
+    # Time-window scans across all conversations (prewarm mining, retention)
+    ("ix_messages_created_at", "messages", ["created_at"], None),
+    # Last-7-days activity
+    ("ix_usage_logs_child_timestamp", "usage_logs", ["child_id", "timestamp"], None),
+    # Safety report: one child's flags, newest first
+    ("ix_audit_logs_child_action_timestamp", "audit_logs", ["child_id", "action", "timestamp"], None)
+]
+
+
+def upgrade() -> None:
+    postgres = op.get_bind().dialect.name == "postgresql"
+    for name, table, columns, where in INDEXES:
+        kwargs = {"postgresql_where": where, "sqlite_where": where} if where is not None else {}
+        if postgres:
+            # CONCURRENTLY cannot run inside the migration transaction
+            with op.get_context().autocommit_block():
+                op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True, **kwargs)
+        else:
+            op.create_index(name, table, columns, if_not_exists=True, **kwargs)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,38 @@
+"""Per-child daily rollup of messages for the dashboards
+
+Revision ID: 0004_child_daily_stats
+Revises: 0003_query_indexes
+Create Date: 2026-10-17 10:00:00
+
+The table starts empty; fill it from existing messages with
+`python rebuild_daily_stats.py`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_child_daily_stats"
+down_revision: Union[str, None] = "0003_query_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "child_daily_stats",
+        sa.Column("child_id", sa.Integer(), sa.ForeignKey("children.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("questions", sa.Integer(), nullable=False),
+        sa.Column("answers", sa.Integer(), nullable=False),
+        sa.Column("depth_sum", sa.Integer(), nullable=False),
+        sa.Column("source_counts", sa.JSON(), nullable=True),
+        sa.Column("topic_counts", sa.JSON(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("child_daily_stats")
@@ -0,0 +1,33 @@
+"""Give every conversation an updated_at
+
+Revision ID: 0005_conversation_updated_at
+Revises: 0004_child_daily_stats
+Create Date: 2026-10-17 11:00:00
+
+updated_at was only set on UPDATE, so a conversation that was never touched
+after its insert had NULL there. Conversation lists are now keyset-paginated
+on (updated_at, id), and NULL keys would drop out of every page after the
+first; backfill them from created_at and default new rows to now().
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_conversation_updated_at"
+down_revision: Union[str, None] = "0004_child_daily_stats"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("UPDATE conversations SET updated_at = created_at WHERE updated_at IS NULL")
+    with op.batch_alter_table("conversations") as batch:
+        batch.alter_column("updated_at", existing_type=sa.DateTime(timezone=True), server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("conversations") as batch:
+        batch.alter_column("updated_at", existing_type=sa.DateTime(timezone=True), server_default=None)
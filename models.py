@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, JSON, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, ForeignKey, Text, JSON, Enum as SQLEnum, Index, literal_column, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -44,6 +44,9 @@ class User(Base):
 class Child(Base):
     """Child profiles (COPPA compliant - no email required)"""
     __tablename__ = "children"
+    __table_args__ = (
+        Index("ix_children_parent_id", "parent_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     parent_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -75,10 +78,14 @@ class Child(Base):
     parent = relationship("User", back_populates="children")
     conversations = relationship("Conversation", back_populates="child", cascade="all, delete-orphan")
     usage_logs = relationship("UsageLog", back_populates="child", cascade="all, delete-orphan")
+    daily_stats = relationship("ChildDailyStats", back_populates="child", cascade="all, delete-orphan")
 
 class Session(Base):
     """User sessions (JWT tokens)"""
     __tablename__ = "sessions"
+    __table_args__ = (
+        Index("ix_sessions_user_id", "user_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -131,6 +138,10 @@ class ConsentRecord(Base):
 class Conversation(Base):
     """Chat conversations between child and Nia"""
     __tablename__ = "conversations"
+    __table_args__ = (
+        Index("ix_conversations_child_updated", "child_id", "updated_at", "id"),
+        Index("ix_conversations_child_created", "child_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     child_id = Column(Integer, ForeignKey("children.id", ondelete="CASCADE"), nullable=False)
@@ -144,9 +155,13 @@ class Conversation(Base):
     message_count = Column(Integer, default=0, nullable=False)
     total_depth_reached = Column(Integer, default=1, nullable=False)
     
+    # Rolling summary of turns older than the context window
+    summary = Column(Text, nullable=True)
+    summary_message_count = Column(Integer, default=0, nullable=False)  # messages folded into summary
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())  # keyset sort key, never NULL
     
     # Relationships
     child = relationship("Child", back_populates="conversations")
@@ -155,6 +170,16 @@ class Conversation(Base):
 class Message(Base):
     """Individual messages in conversations"""
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_conversation_created", "conversation_id", "created_at", "id"),
+        # Partial index: only the child's questions
+        Index(
+            "ix_messages_questions", "conversation_id", "created_at", "id",
+            postgresql_where=text("role = 'child'"),
+            sqlite_where=text("role = 'child'")
+        ),
+        Index("ix_messages_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
@@ -183,9 +208,37 @@ class Message(Base):
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
 
+# "Is a child's question", written as a literal rather than a bound
+# parameter so query planners can match it to the ix_messages_questions
+# partial index
+IS_QUESTION = Message.role == literal_column("'child'")
+
+class ChildDailyStats(Base):
+    """Per-child, per-day message rollup read by the dashboards"""
+    __tablename__ = "child_daily_stats"
+    
+    child_id = Column(Integer, ForeignKey("children.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)  # local date in settings.DEFAULT_TIMEZONE
+    
+    # Counts of the day's messages
+    questions = Column(Integer, default=0, nullable=False)
+    answers = Column(Integer, default=0, nullable=False)
+    depth_sum = Column(Integer, default=0, nullable=False)  # over questions and answers
+    source_counts = Column(JSON, nullable=True)  # {"curated_content": 3, "general_knowledge": 1}
+    topic_counts = Column(JSON, nullable=True)  # {"math": 2, "Fractions": 1} - questions per tag
+    
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    child = relationship("Child", back_populates="daily_stats")
+
 class UsageLog(Base):
     """Detailed usage tracking for analytics and safety"""
     __tablename__ = "usage_logs"
+    __table_args__ = (
+        Index("ix_usage_logs_child_timestamp", "child_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     child_id = Column(Integer, ForeignKey("children.id", ondelete="CASCADE"), nullable=False)
@@ -207,6 +260,9 @@ class UsageLog(Base):
 class AuditLog(Base):
     """Security and compliance audit trail"""
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_child_action_timestamp", "child_id", "action", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     
@@ -0,0 +1,48 @@
+"""
+Pre-generate answers to the most-asked questions
+
+Mines the messages table for the top (question, grade band, depth) tuples,
+answers them through Anthropic's Message Batches API and loads the results
+into the answer cache. Safe to interrupt and re-run: progress is kept in
+PREWARM_STATE_PATH.
+
+    python prewarm_answers.py                 # new run, or resume the last one
+    python prewarm_answers.py --fresh --top-n 500
+    LLM_BACKEND=fake python prewarm_answers.py --poll-seconds 1
+"""
+import argparse
+import asyncio
+import logging
+
+from config import settings
+from database import AsyncSessionLocal, engine
+from services.answer_prewarm_service import AnswerPrewarmJob
+from services.rag_service import close_rag_service, get_rag_service
+from services.answer_cache import close_answer_cache
+
+
+async def run(args):
+    job = AnswerPrewarmJob(get_rag_service(), state_path=args.state, poll_seconds=args.poll_seconds)
+    try:
+        async with AsyncSessionLocal() as db:
+            state = await job.run(db, fresh=args.fresh, top_n=args.top_n)
+        print(state.counts())
+    finally:
+        await close_rag_service()
+        await close_answer_cache()
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-n", type=int, default=settings.PREWARM_TOP_N)
+    parser.add_argument("--state", default=settings.PREWARM_STATE_PATH, help="progress file used to resume")
+    parser.add_argument("--fresh", action="store_true", help="ignore the progress file and mine again")
+    parser.add_argument("--poll-seconds", type=float, default=settings.PREWARM_POLL_SECONDS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Rebuild the per-child daily rollup (child_daily_stats) from messages
+
+New messages update the rollup as they are saved; run this once after the
+0004 migration to cover history, or again after content/ changes the topic
+taxonomy or DEFAULT_TIMEZONE changes. Each batch of children is replaced in
+its own transaction, so re-running is safe.
+
+    python rebuild_daily_stats.py
+    python rebuild_daily_stats.py --child-id 42 --child-id 43
+"""
+import argparse
+import asyncio
+import logging
+
+from database import AsyncSessionLocal, engine
+from services.daily_stats_service import rebuild_daily_stats
+
+
+async def run(args):
+    try:
+        async with AsyncSessionLocal() as db:
+            written = await rebuild_daily_stats(db, child_ids=args.child_id, batch_size=args.batch_size)
+        print(f"{written} daily stats rows written")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--child-id", type=int, action="append", help="only these children (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=50, help="children per transaction")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Re-tag every conversation's topics with the curriculum taxonomy
+
+Conversations saved before the taxonomy classifier (or before content/
+changed) keep stale topics; this recomputes Conversation.topics from each
+conversation's child messages, a few hundred conversations per commit.
+
+    python retag_topics.py
+    python retag_topics.py --batch-size 2000
+"""
+import argparse
+import asyncio
+import logging
+
+from database import AsyncSessionLocal, engine
+from services.topic_classifier import retag_conversations
+
+
+async def run(args):
+    try:
+        async with AsyncSessionLocal() as db:
+            updated = await retag_conversations(db, batch_size=args.batch_size)
+        print(f"{updated} conversations updated")
+    finally:
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -552,8 +552,10 @@ async def get_child_statistics(
     """
     
     from sqlalchemy import func
-    from models import Conversation, Message
+    from models import Conversation
     from datetime import timedelta
+    from services.daily_stats_service import DayTotals, load_daily_stats
+    from services.topic_classifier import get_topic_classifier
     
     # Verify ownership
     result = await db.execute(
@@ -576,40 +578,13 @@ async def get_child_statistics(
     )
     total_conversations = conv_result.scalar() or 0
     
-    # Get message count
-    msg_result = await db.execute(
-        select(func.count(Message.id))
-        .join(Conversation)
-        .where(Conversation.child_id == child_id)
-    )
-    total_messages = msg_result.scalar() or 0
-    
-    # Get questions asked (messages with role='child')
-    question_result = await db.execute(
-        select(func.count(Message.id))
-        .join(Conversation)
-        .where(
-            Conversation.child_id == child_id,
-            Message.role == 'child'
-        )
-    )
-    questions_asked = question_result.scalar() or 0
-    
-    # Get topics explored (unique topics from conversations)
-    topics_result = await db.execute(
-        select(Conversation.topics)
-        .where(
-            Conversation.child_id == child_id,
-            Conversation.topics.isnot(None)
-        )
-    )
-    
-    all_topics = []
-    for row in topics_result:
-        if row[0]:
-            all_topics.extend(row[0])
+    # Message, question and topic counts come from the daily rollup
+    lifetime = DayTotals.total(await load_daily_stats(db, [child_id]))
+    total_messages = lifetime.messages
+    questions_asked = lifetime.questions
     
-    unique_topics = list(set(all_topics))[:10]  # Top 10 topics
+    # Topics explored (most asked about first)
+    unique_topics = [topic for topic, _ in lifetime.topic_counts.most_common(10)]  # Top 10 topics
     
     # Get last 7 days activity
     seven_days_ago = datetime.utcnow() - timedelta(days=7)
@@ -622,12 +597,13 @@ async def get_child_statistics(
     )
     last_7_days_activity = recent_activity_result.scalar() or 0
     
-    # TODO: Implement favorite subjects based on usage patterns
+    # Subjects are tagged alongside topics, so their counts are questions per subject
+    subjects = get_topic_classifier().subjects
     favorite_subjects = [
-        {"subject": "Math", "count": 15},
-        {"subject": "Science", "count": 12},
-        {"subject": "Reading", "count": 8}
-    ]
+        {"subject": tag, "count": count}
+        for tag, count in lifetime.topic_counts.most_common()
+        if tag in subjects
+    ][:3]
     
     return ChildStats(
         total_conversations=total_conversations,
@@ -1,15 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional, List, Dict
+import anyio
+import json
+import math
 import uuid
 import logging
 from datetime import datetime
 
-from database import get_db
+from database import get_db, AsyncSessionLocal
 from models import Conversation as DBConversation, Message as DBMessage, Child
 from services.conversation_service import ConversationService
 from services.rag_service import get_rag_service
+from services.context_service import ChatContext, estimate_tokens, get_context_service
+from services.rate_limiter import LimitDecision, get_rate_limiter
+from services.speculation_service import get_speculation_service
+from services.topic_classifier import get_topic_classifier
+from services.safety_service import SAFETY_FLAG_ACTION
+from services.visual_service import VisualService, get_visual_service
+from services.daily_stats_service import record_exchange
+from routers.children import log_audit
+from utils.pagination import InvalidCursor, keyset_page, page_rows
+from config import settings
 from sqlalchemy import select
 
 router = APIRouter()
@@ -52,6 +66,223 @@ def calculate_age(date_of_birth: datetime) -> int:
         age -= 1
     return age
 
+async def load_chat_context(db: AsyncSession, message: MessageCreate):
+    """Load the child and (optional) existing conversation for a message"""
+    
+    # Verify child exists
+    child_id_int = int(message.child_id)
+    child_result = await db.execute(
+        select(Child).where(Child.id == child_id_int)
+    )
+    child = child_result.scalar_one_or_none()
+    
+    if not child:
+        raise HTTPException(status_code=404, detail="Child not found")
+    
+    # Calculate child's age
+    child_age = calculate_age(child.date_of_birth) if child.date_of_birth else None
+    
+    # Get existing conversation (created after the answer if missing)
+    conversation = None
+    if message.conversation_id:
+        conv_result = await db.execute(
+            select(DBConversation).where(DBConversation.id == int(message.conversation_id))
+        )
+        conversation = conv_result.scalar_one_or_none()
+    
+    return child, conversation, child_age
+
+def raise_if_limited(decision: LimitDecision):
+    """Friendly 429 with Retry-After when a rate limit or daily quota is hit"""
+    if decision.allowed:
+        return
+    
+    retry_after = max(1, math.ceil(decision.retry_after))
+    if decision.reason.endswith("quota"):
+        detail = "You've done so much learning today! 🌙 Let's rest our brains and explore more tomorrow."
+    else:
+        detail = f"Wow, so many great questions! 🐢 Let's take a tiny break - you can ask again in {retry_after} seconds."
+    
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(retry_after)}
+    )
+
+async def enforce_limits(message: MessageCreate, child: Optional[Child] = None):
+    """Per-child bucket before loading anything; per-parent bucket and quotas once the child is known"""
+    limiter = get_rate_limiter()
+    if child is None:
+        raise_if_limited(await limiter.acquire_child(int(message.child_id)))
+        return
+    raise_if_limited(await limiter.acquire_parent(child.parent_id))
+    raise_if_limited(await limiter.check_quota(child.id, child.parent_id))
+
+async def speculate_next_depth(
+    rag,
+    conversation_id: int,
+    message: MessageCreate,
+    result: Dict,
+    child_id: int,
+    parent_id: int,
+    child_age: Optional[int],
+    filter_level: str,
+    context: Optional[ChatContext]
+):
+    """
+    Start answering the likely "Yes, tell me more!" while the child reads this answer
+    
+    Skipped when the tap itself would be rate limited or over quota; the
+    answer's usage is billed by the request that serves it.
+    """
+    if result.get("degraded") or result.get("safety"):
+        return
+    if not await get_rate_limiter().has_headroom(child_id, parent_id):
+        return
+    
+    get_speculation_service().schedule(
+        rag,
+        conversation_id=conversation_id,
+        depth_level=message.current_depth,
+        question=message.text,
+        answer=result["answer"],
+        grade_level=message.grade_level,
+        child_age=child_age,
+        content_filter_level=filter_level,
+        context=context
+    )
+
+def build_response(result: Dict, depth_level: int, question: str = "") -> Dict:
+    """Turn a RAG result into the formatted response envelope"""
+    
+    # Format sources
+    source_citations = []
+    for src in result.get("sources", []):
+        if src.get("type") == "web_search":
+            source_citations.append({
+                "title": "Web Search",
+                "type": "web_search",
+                "query": src.get("query", ""),
+                "verified": True
+            })
+        elif src.get("type") in ("curated_content", "web_page"):
+            source_citations.append(src)
+    
+    # Local diagrams and emoji - none for exchanges the safety screen caught
+    visuals = [] if result.get("safety") else get_visual_service().generate(question, result["answer"], depth_level)
+    
+    # Build response
+    conv_service = ConversationService()
+    response = conv_service.format_response_with_sources(
+        answer=result["answer"],
+        sources=source_citations,
+        depth_level=depth_level,
+        visuals=visuals,
+        related_topics=result.get("related_topics", [])
+    )
+    
+    # Determine source type
+    if result.get("used_web_search"):
+        source_type = "web_search"
+        source_label = "🌐 From the web"
+    elif response["source_type"] == "curated_content":
+        source_type = response["source_type"]
+        source_label = response["source_label"]
+    else:
+        source_type = "general_knowledge"
+        source_label = "ℹ️ From what I know"
+    
+    response["source_type"] = source_type
+    response["source_label"] = source_label
+    response["model_used"] = result["model_used"]
+    
+    return response
+
+async def save_exchange(
+    db: AsyncSession,
+    message: MessageCreate,
+    child: Child,
+    conversation: Optional[DBConversation],
+    response: Dict,
+    context: Optional[ChatContext] = None,
+    safety: Optional[Dict] = None
+) -> DBConversation:
+    """Persist the child's question and Nia's answer, creating the conversation if needed"""
+    
+    if conversation and context:
+        context.apply(conversation)
+    
+    if not conversation:
+        conversation = DBConversation(
+            child_id=child.id,
+            title=message.text[:50] + "..." if len(message.text) > 50 else message.text,
+            folder="General",
+            topics=[],
+            message_count=0,
+            total_depth_reached=message.current_depth
+        )
+        db.add(conversation)
+        await db.flush()
+    
+    # Save user's question
+    user_message = DBMessage(
+        conversation_id=conversation.id,
+        role="child",
+        content=message.text,
+        depth_level=message.current_depth
+    )
+    db.add(user_message)
+    
+    # Tag subjects/topics from the curriculum taxonomy
+    topics = get_topic_classifier().tag(message.text)
+    
+    # Save AI response
+    ai_message = DBMessage(
+        conversation_id=conversation.id,
+        role="assistant",
+        content=response["text"],
+        model_used=response["model_used"],
+        source_type=response["source_type"],
+        sources=response["source_citations"],
+        visual_content=response["generated_visuals"] or None,
+        visual_description=VisualService.describe(response["generated_visuals"]),
+        depth_level=message.current_depth
+    )
+    db.add(ai_message)
+    
+    # Update conversation
+    conversation.message_count += 2
+    conversation.total_depth_reached = max(conversation.total_depth_reached, message.current_depth)
+    if topics:
+        existing = conversation.topics or []
+        conversation.topics = existing + [topic for topic in topics if topic not in existing]
+    
+    child.last_active = user_message.created_at
+    
+    # Keep the dashboards' daily rollup in step, in the same transaction
+    await record_exchange(db, child.id, message.current_depth, response["source_type"], topics)
+    
+    # Flag the exchange for the parent's safety report
+    if safety:
+        await log_audit(
+            db=db,
+            user_id=child.parent_id,
+            child_id=child.id,
+            action=SAFETY_FLAG_ACTION,
+            resource="conversation",
+            details={
+                **safety,
+                "conversation_id": conversation.id,
+                "content_filter_level": child.content_filter_level
+            },
+            success=True
+        )
+    
+    await db.commit()
+    await db.refresh(conversation)
+    
+    return conversation
+
 @router.post("/message", response_model=MessageResponse)
 async def send_message(
     message: MessageCreate,
@@ -60,139 +291,181 @@ async def send_message(
     """Send a message and get AI response with web search"""
     
     try:
-        # Verify child exists
-        child_id_int = int(message.child_id)
-        child_result = await db.execute(
-            select(Child).where(Child.id == child_id_int)
-        )
-        child = child_result.scalar_one_or_none()
-        
-        if not child:
-            raise HTTPException(status_code=404, detail="Child not found")
-        
-        # Calculate child's age
-        child_age = calculate_age(child.date_of_birth) if child.date_of_birth else None
-        
-        # Get or create conversation
-        conversation = None
-        if message.conversation_id:
-            conv_result = await db.execute(
-                select(DBConversation).where(DBConversation.id == int(message.conversation_id))
-            )
-            conversation = conv_result.scalar_one_or_none()
+        await enforce_limits(message)
+        child, conversation, child_age = await load_chat_context(db, message)
+        await enforce_limits(message, child)
+        context = await get_context_service().load(db, conversation)
         
-        if not conversation:
-            conversation = DBConversation(
-                child_id=child_id_int,
-                title=message.text[:50] + "..." if len(message.text) > 50 else message.text,
-                folder="General",
-                topics=[],
-                message_count=0,
-                total_depth_reached=message.current_depth
-            )
-            db.add(conversation)
-            await db.flush()
-        
-        # Save user's question
-        user_message = DBMessage(
-            conversation_id=conversation.id,
-            role="child",
-            content=message.text,
-            depth_level=message.current_depth
-        )
-        db.add(user_message)
+        # End the read transaction so the pooled DB connection is not held
+        # while Claude is generating (loaded objects stay usable)
+        await db.commit()
         
         # Get RAG service response with Claude and web search
         rag = get_rag_service()
         
-        result = rag.query(
-            question=message.text,
-            grade_level=message.grade_level,
-            depth_level=message.current_depth,
-            child_age=child_age
+        # A "Yes, tell me more!" may already have been answered in the background
+        result = await get_speculation_service().take(
+            conversation.id if conversation else None,
+            message.current_depth,
+            message.text,
+            context.last_question
         )
+        if result is None:
+            result = await rag.aquery(
+                question=message.text,
+                grade_level=message.grade_level,
+                depth_level=message.current_depth,
+                child_age=child_age,
+                content_filter_level=child.content_filter_level,
+                context=context
+            )
         
-        # Format sources
-        source_citations = []
-        for src in result.get("sources", []):
-            if src.get("type") == "web_search":
-                source_citations.append({
-                    "title": "Web Search",
-                    "type": "web_search",
-                    "query": src.get("query", ""),
-                    "verified": True
-                })
-        
-        # Build response
-        conv_service = ConversationService()
-        response = conv_service.format_response_with_sources(
-            answer=result["answer"],
-            sources=source_citations,
-            depth_level=message.current_depth,
-            visuals=[],
-            related_topics=[]
-        )
-        
-        # Determine source type
-        if result.get("used_web_search"):
-            source_type = "web_search"
-            source_label = "🌐 From the web"
-        else:
-            source_type = "general_knowledge"
-            source_label = "ℹ️ From what I know"
-        
-        response["source_type"] = source_type
-        response["source_label"] = source_label
-        
-        # Extract topics
-        topics = []
-        keywords = ["math", "science", "history", "geography", "weather", "travel"]
-        for keyword in keywords:
-            if keyword.lower() in message.text.lower():
-                topics.append(keyword)
-        
-        # Save AI response
-        ai_message = DBMessage(
-            conversation_id=conversation.id,
-            role="assistant",
-            content=result["answer"],
-            model_used=result["model_used"],
-            source_type=source_type,
-            sources=source_citations,
-            depth_level=message.current_depth
-        )
-        db.add(ai_message)
-        
-        # Update conversation
-        conversation.message_count += 2
-        conversation.total_depth_reached = max(conversation.total_depth_reached, message.current_depth)
-        if topics:
-            conversation.topics = list(set((conversation.topics or []) + topics))
+        await get_rate_limiter().record_usage(child.id, child.parent_id, result)
         
-        child.last_active = user_message.created_at
-        
-        await db.commit()
-        await db.refresh(conversation)
+        response = build_response(result, message.current_depth, message.text)
+        conversation = await save_exchange(db, message, child, conversation, response, context, result.get("safety"))
         
         response["message_id"] = str(uuid.uuid4())
         response["conversation_id"] = conversation.id
-        response["model_used"] = result["model_used"]
         
-        logger.info(f"✅ Message saved: Child {child_id_int}, Web search: {result.get('used_web_search', False)}")
+        await speculate_next_depth(
+            rag, conversation.id, message, result,
+            child.id, child.parent_id, child_age, child.content_filter_level, context
+        )
+        
+        logger.info(f"✅ Message saved: Child {child.id}, Web search: {result.get('used_web_search', False)} (offered: {result.get('web_search_offered', False)})")
         
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         await db.rollback()
         logger.error(f"Error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+def sse_event(event: str, data: Dict) -> str:
+    """Encode one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/message/stream")
+async def stream_message(
+    message: MessageCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Send a message and stream the AI response as Server-Sent Events
+    
+    Events:
+    - delta: {"text": ...} for each chunk of the answer as Claude writes it
+    - done: the same envelope as POST /message
+    - error: {"detail": ...} if generation fails
+    
+    If the client disconnects, the upstream Claude stream is closed and the
+    partial answer is still saved to the conversation.
+    """
+    
+    await enforce_limits(message)
+    child, conversation, child_age = await load_chat_context(db, message)
+    await enforce_limits(message, child)
+    context = await get_context_service().load(db, conversation)
+    child_id, conversation_id = child.id, conversation.id if conversation else None
+    parent_id = child.parent_id
+    filter_level = child.content_filter_level
+    await db.commit()
+    
+    rag = get_rag_service()
+    
+    async def persist(result: Dict) -> Dict:
+        # Use a fresh session - the request-scoped one may already be closed
+        async with AsyncSessionLocal() as session:
+            stream_child = await session.get(Child, child_id)
+            stream_conversation = await session.get(DBConversation, conversation_id) if conversation_id else None
+            response = build_response(result, message.current_depth, message.text)
+            saved = await save_exchange(session, message, stream_child, stream_conversation, response, context, result.get("safety"))
+            response["message_id"] = str(uuid.uuid4())
+            response["conversation_id"] = saved.id
+            return response
+    
+    async def replay(result: Dict):
+        yield {"type": "delta", "text": result["answer"]}
+        yield {"type": "done", "result": result}
+    
+    async def event_stream():
+        speculative = await get_speculation_service().take(conversation_id, message.current_depth, message.text, context.last_question)
+        if speculative is not None:
+            upstream = replay(speculative)
+        else:
+            upstream = rag.astream(
+                question=message.text,
+                grade_level=message.grade_level,
+                depth_level=message.current_depth,
+                child_age=child_age,
+                content_filter_level=filter_level,
+                context=context
+            )
+        parts = []
+        saved = False
+        model_used = settings.MODEL_STANDARD_LABEL
+        input_tokens = None  # set once Claude is actually called
+        
+        try:
+            async for event in upstream:
+                if event["type"] == "start":
+                    model_used = event["model_used"]
+                    input_tokens = event["input_tokens"]
+                elif event["type"] == "delta":
+                    parts.append(event["text"])
+                    yield sse_event("delta", {"text": event["text"]})
+                else:
+                    await get_rate_limiter().record_usage(child_id, parent_id, event["result"])
+                    response = await persist(event["result"])
+                    saved = True
+                    logger.info(f"✅ Streamed message saved: Child {child_id}")
+                    await speculate_next_depth(
+                        rag, response["conversation_id"], message, event["result"],
+                        child_id, parent_id, child_age, filter_level, context
+                    )
+                    yield sse_event("done", response)
+        except Exception as e:
+            logger.error(f"Error while streaming: {e}", exc_info=True)
+            yield sse_event("error", {"detail": f"Error: {str(e)}"})
+        finally:
+            # Runs on normal exit, errors and client disconnects (cancellation)
+            with anyio.CancelScope(shield=True):
+                await upstream.aclose()
+                if not saved:
+                    partial = {
+                        "answer": "".join(parts),
+                        "sources": [],
+                        "model_used": model_used,
+                        "used_web_search": False
+                    }
+                    if input_tokens is not None:
+                        # Claude billed the prompt and whatever it wrote before the cut
+                        partial["usage"] = {"input_tokens": input_tokens, "output_tokens": estimate_tokens(partial["answer"])}
+                    try:
+                        await get_rate_limiter().record_usage(child_id, parent_id, partial)
+                        if parts:
+                            await persist(partial)
+                            logger.info(f"💾 Partial answer saved after disconnect: Child {child_id}")
+                    except Exception as e:
+                        logger.error(f"Could not save partial answer: {e}", exc_info=True)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/conversation/{conversation_id}")
 async def get_conversation(
     conversation_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous window"),
+    limit: int = Query(100, ge=1, le=500, description="Messages per window"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get conversation with messages"""
+    """Get conversation with a window of its messages (oldest first; follow next_cursor for more)"""
     
     conv_result = await db.execute(
         select(DBConversation).where(DBConversation.id == conversation_id)
@@ -202,14 +475,19 @@ async def get_conversation(
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    messages_result = await db.execute(
-        select(DBMessage)
-        .where(DBMessage.conversation_id == conversation_id)
-        .order_by(DBMessage.created_at)
-    )
+    try:
+        query = keyset_page(
+            select(DBMessage).where(DBMessage.conversation_id == conversation_id),
+            (DBMessage.created_at, DBMessage.id), cursor, limit, db.get_bind().dialect.name
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    messages_result = await db.execute(query)
+    window, next_cursor = page_rows(list(messages_result.scalars()), limit, key=lambda msg: (msg.created_at, msg.id))
     
     messages = []
-    for msg in messages_result.scalars():
+    for msg in window:
         messages.append({
             "id": msg.id,
             "role": msg.role,
@@ -224,5 +502,6 @@ async def get_conversation(
         "title": conversation.title,
         "topics": conversation.topics,
         "message_count": conversation.message_count,
-        "messages": messages
+        "messages": messages,
+        "next_cursor": next_cursor
     }
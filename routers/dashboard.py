@@ -1,15 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_, desc
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 from datetime import datetime, timedelta, date
 import logging
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 from database import get_db
-from models import User, Child, Conversation, Message, UsageLog, AuditLog
+from models import User, Child, Conversation, Message, UsageLog, AuditLog, IS_QUESTION
 from auth import get_current_active_parent
+from services.safety_service import SAFETY_FLAG_ACTION
+from services.daily_stats_service import DayTotals, days_ago, load_daily_stats, local_day
+from services.export_service import EXPORT_MEDIA_TYPES, stream_export
+from utils.pagination import NEXT_CURSOR_HEADER, InvalidCursor, keyset_page, page_rows
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -47,6 +52,7 @@ class ConversationDetail(BaseModel):
     created_at: datetime
     updated_at: datetime
     messages: Optional[List[Dict]] = None
+    next_cursor: Optional[str] = None  # next window of messages, if any
     
 class LearningAnalytics(BaseModel):
     date_range: Dict
@@ -83,11 +89,33 @@ async def get_dashboard_overview(
     - Recent activity
     """
     
-    # Get all children
+    # Every child with its conversation and question counts in one grouped
+    # query (was one COUNT per child), then the recent questions: two round
+    # trips however many children there are
+    parent_children = select(Child.id).where(Child.parent_id == current_user.id)
+    counts = (
+        select(
+            Conversation.child_id.label("child_id"),
+            func.count(func.distinct(Conversation.id)).label("conversations"),
+            func.count(Message.id).label("questions")
+        )
+        .outerjoin(Message, and_(Message.conversation_id == Conversation.id, IS_QUESTION))
+        .where(Conversation.child_id.in_(parent_children))
+        .group_by(Conversation.child_id)
+        .subquery()
+    )
     children_result = await db.execute(
-        select(Child).where(Child.parent_id == current_user.id)
+        select(
+            Child,
+            func.coalesce(counts.c.conversations, 0),
+            func.coalesce(counts.c.questions, 0)
+        )
+        .outerjoin(counts, counts.c.child_id == Child.id)
+        .where(Child.parent_id == current_user.id)
+        .order_by(Child.id)
     )
-    children = children_result.scalars().all()
+    rows = children_result.all()
+    children = [child for child, _, _ in rows]
     
     total_children = len(children)
     active_children = len([c for c in children if c.is_active])
@@ -105,23 +133,10 @@ async def get_dashboard_overview(
     
     child_ids = [c.id for c in children]
     
-    # Get total conversations
-    conv_result = await db.execute(
-        select(func.count(Conversation.id))
-        .where(Conversation.child_id.in_(child_ids))
-    )
-    total_conversations = conv_result.scalar() or 0
+    total_conversations = sum(conversations for _, conversations, _ in rows)
     
-    # Get total questions (messages with role='child')
-    msg_result = await db.execute(
-        select(func.count(Message.id))
-        .join(Conversation)
-        .where(
-            Conversation.child_id.in_(child_ids),
-            Message.role == 'child'
-        )
-    )
-    total_questions = msg_result.scalar() or 0
+    # Total questions (messages with role='child')
+    total_questions = sum(questions for _, _, questions in rows)
     
     # Calculate learning hours (estimate: 2 min per question)
     hours_learning = round((total_questions * 2) / 60, 1)
@@ -130,17 +145,7 @@ async def get_dashboard_overview(
     most_active = None
     max_questions = 0
     
-    for child in children:
-        child_questions = await db.execute(
-            select(func.count(Message.id))
-            .join(Conversation)
-            .where(
-                Conversation.child_id == child.id,
-                Message.role == 'child'
-            )
-        )
-        count = child_questions.scalar() or 0
-        
+    for child, _, count in rows:
         if count > max_questions:
             max_questions = count
             most_active = {
@@ -156,7 +161,7 @@ async def get_dashboard_overview(
         .join(Child, Conversation.child_id == Child.id)
         .where(
             Conversation.child_id.in_(child_ids),
-            Message.role == 'child'
+            IS_QUESTION
         )
         .order_by(Message.created_at.desc())
         .limit(5)
@@ -220,63 +225,35 @@ async def get_child_progress(
         (today.month, today.day) < (child.date_of_birth.month, child.date_of_birth.day)
     )
     
-    # Get total questions
-    questions_result = await db.execute(
-        select(func.count(Message.id))
-        .join(Conversation)
-        .where(
-            Conversation.child_id == child_id,
-            Message.role == 'child'
-        )
-    )
-    total_questions = questions_result.scalar() or 0
+    # Questions and active days come from the daily rollup
+    daily_rows = await load_daily_stats(db, [child_id])
+    lifetime = DayTotals.total(daily_rows)
+    total_questions = lifetime.questions
     
-    # Get conversation count
-    conv_result = await db.execute(
-        select(func.count(Conversation.id))
-        .where(Conversation.child_id == child_id)
-    )
-    conversations_count = conv_result.scalar() or 0
-    
-    # Get favorite subjects from topics
+    # Conversation count and favorite subjects (conversations per topic)
     topics_result = await db.execute(
         select(Conversation.topics)
-        .where(
-            Conversation.child_id == child_id,
-            Conversation.topics.isnot(None)
-        )
+        .where(Conversation.child_id == child_id)
     )
-    
-    topic_counts = defaultdict(int)
-    for row in topics_result:
-        if row[0]:
-            for topic in row[0]:
-                topic_counts[topic] += 1
+    conversation_topics = topics_result.scalars().all()
+    conversations_count = len(conversation_topics)
+    topic_counts = Counter(topic for topics in conversation_topics if topics for topic in topics)
     
     favorite_subjects = [
         {"subject": topic, "count": count}
-        for topic, count in sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)[:5]
+        for topic, count in topic_counts.most_common(5)
     ]
     
-    # Calculate learning streak (days with activity)
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
-    streak_result = await db.execute(
-        select(func.date(Message.created_at))
-        .join(Conversation)
-        .where(
-            Conversation.child_id == child_id,
-            Message.created_at >= cutoff_date
-        )
-        .distinct()
-    )
-    
-    active_dates = [row[0] for row in streak_result]
-    learning_streak_days = len(active_dates)
+    # Calculate learning streak (days with activity in the last `days` days)
+    cutoff_day = days_ago(days)
+    learning_streak_days = sum(1 for row in daily_rows if row.day >= cutoff_day)
+    week_start = days_ago(7)
+    questions_this_week = sum(row.questions for row in daily_rows if row.day >= week_start)
     
     # Progress summary
     progress_summary = {
         "total_time_minutes": total_questions * 2,  # Estimate
-        "questions_this_week": 0,  # TODO: Calculate
+        "questions_this_week": questions_this_week,
         "improvement_trend": "steady",  # TODO: Calculate
         "engagement_level": "high" if total_questions > 50 else "moderate" if total_questions > 10 else "low"
     }
@@ -300,18 +277,21 @@ async def get_child_progress(
 
 @router.get("/conversations", response_model=List[ConversationDetail])
 async def get_all_conversations(
+    response: Response,
     child_id: Optional[int] = Query(None, description="Filter by child"),
     start_date: Optional[date] = Query(None, description="Filter from date"),
     end_date: Optional[date] = Query(None, description="Filter to date"),
     topic: Optional[str] = Query(None, description="Filter by topic"),
-    limit: int = Query(50, le=100, description="Maximum number of results"),
+    limit: int = Query(50, ge=1, le=100, description="Maximum number of results"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
     current_user: User = Depends(get_current_active_parent),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Get all conversations with optional filters
+    Get all conversations with optional filters, most recently active first
     
-    Parents can view all their children's conversations
+    Parents can view all their children's conversations. When more remain,
+    the X-Next-Cursor response header holds the cursor for the next page.
     """
     
     # Get all child IDs for this parent
@@ -344,12 +324,21 @@ async def get_all_conversations(
         # PostgreSQL JSON contains operation
         query = query.where(Conversation.topics.contains([topic]))
     
-    query = query.order_by(Conversation.updated_at.desc()).limit(limit)
+    try:
+        query = keyset_page(
+            query, (Conversation.updated_at, Conversation.id), cursor, limit,
+            db.get_bind().dialect.name, descending=True
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     result = await db.execute(query)
+    rows, next_cursor = page_rows(result.all(), limit, key=lambda row: (row[0].updated_at, row[0].id))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     conversations = []
-    for conv, child in result:
+    for conv, child in rows:
         conversations.append(ConversationDetail(
             id=conv.id,
             child_id=conv.child_id,
@@ -368,11 +357,16 @@ async def get_all_conversations(
 @router.get("/conversations/{conversation_id}", response_model=ConversationDetail)
 async def get_conversation_detail(
     conversation_id: int,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous window"),
+    limit: int = Query(100, ge=1, le=500, description="Messages per window"),
     current_user: User = Depends(get_current_active_parent),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Get full conversation with all messages
+    Get a conversation with a window of its messages, oldest first
+    
+    Long transcripts come back `limit` messages at a time; pass
+    next_cursor back to read the following window.
     """
     
     # Verify access
@@ -391,15 +385,20 @@ async def get_conversation_detail(
     
     conv, child = conv_data
     
-    # Get all messages
-    messages_result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == conversation_id)
-        .order_by(Message.created_at)
-    )
+    # Get one window of messages
+    try:
+        query = keyset_page(
+            select(Message).where(Message.conversation_id == conversation_id),
+            (Message.created_at, Message.id), cursor, limit, db.get_bind().dialect.name
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    messages_result = await db.execute(query)
+    window, next_cursor = page_rows(list(messages_result.scalars()), limit, key=lambda msg: (msg.created_at, msg.id))
     
     messages = []
-    for msg in messages_result.scalars():
+    for msg in window:
         messages.append({
             "id": msg.id,
             "role": msg.role,
@@ -418,7 +417,8 @@ async def get_conversation_detail(
         topics=conv.topics,
         created_at=conv.created_at,
         updated_at=conv.updated_at,
-        messages=messages
+        messages=messages,
+        next_cursor=next_cursor
     )
 
 # ==================== ANALYTICS ====================
@@ -466,74 +466,33 @@ async def get_learning_analytics(
     
     start_date = datetime.utcnow() - timedelta(days=days)
     
-    # Questions by subject (from topics)
-    topics_result = await db.execute(
-        select(Conversation.topics)
-        .where(
-            Conversation.child_id.in_(child_ids),
-            Conversation.created_at >= start_date
-        )
-    )
+    # Everything below is summed from the daily rollup
+    daily_rows = await load_daily_stats(db, child_ids, since=local_day(start_date))
+    totals = DayTotals.total(daily_rows)
     
-    subject_counts = defaultdict(int)
-    for row in topics_result:
-        if row[0]:
-            for topic in row[0]:
-                subject_counts[topic] += 1
+    # Questions by subject (from topics)
+    subject_counts = totals.topic_counts
     
     # Questions by day
-    daily_result = await db.execute(
-        select(
-            func.date(Message.created_at).label('date'),
-            func.count(Message.id).label('count')
-        )
-        .join(Conversation)
-        .where(
-            Conversation.child_id.in_(child_ids),
-            Message.role == 'child',
-            Message.created_at >= start_date
-        )
-        .group_by(func.date(Message.created_at))
-        .order_by('date')
-    )
-    
+    questions_per_day = defaultdict(int)
+    for row in daily_rows:
+        questions_per_day[row.day] += row.questions
     questions_by_day = [
-        {"date": str(row[0]), "count": row[1]}
-        for row in daily_result
+        {"date": str(day), "count": count}
+        for day, count in questions_per_day.items()
+        if count
     ]
     
     # Source breakdown
-    source_result = await db.execute(
-        select(
-            Message.source_type,
-            func.count(Message.id)
-        )
-        .join(Conversation)
-        .where(
-            Conversation.child_id.in_(child_ids),
-            Message.role == 'assistant',
-            Message.created_at >= start_date
-        )
-        .group_by(Message.source_type)
-    )
-    
-    source_breakdown = {row[0]: row[1] for row in source_result if row[0]}
+    source_breakdown = dict(totals.source_counts)
     
     # Average depth
-    depth_result = await db.execute(
-        select(func.avg(Message.depth_level))
-        .join(Conversation)
-        .where(
-            Conversation.child_id.in_(child_ids),
-            Message.created_at >= start_date
-        )
-    )
-    average_depth = float(depth_result.scalar() or 0.0)
+    average_depth = totals.average_depth
     
     # Popular topics
     popular_topics = [
         {"topic": topic, "count": count}
-        for topic, count in sorted(subject_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+        for topic, count in subject_counts.most_common(10)
     ]
     
     logger.info(f"📊 Analytics generated for {days} days")
@@ -556,14 +515,16 @@ async def get_learning_analytics(
 @router.get("/export/conversations")
 async def export_conversations(
     child_id: Optional[int] = Query(None),
-    format: str = Query("json", regex="^(json|csv)$"),
+    format: str = Query("json", regex="^(json|ndjson|csv)$"),
+    gzip: bool = Query(False, description="Compress the download (.gz)"),
     current_user: User = Depends(get_current_active_parent),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Export conversation history
     
-    Formats: JSON or CSV
+    Formats: JSON, NDJSON (one message per line) or CSV, streamed as rows
+    are read so large histories download in constant memory
     """
     
     # Get child IDs
@@ -583,53 +544,12 @@ async def export_conversations(
         )
         child_ids = [row[0] for row in children_result]
     
-    # Get all conversations and messages
-    result = await db.execute(
-        select(Conversation, Child, Message)
-        .join(Child, Conversation.child_id == Child.id)
-        .join(Message, Message.conversation_id == Conversation.id)
-        .where(Conversation.child_id.in_(child_ids))
-        .order_by(Conversation.created_at, Message.created_at)
+    filename = f"conversations.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream_export(child_ids, format, compress=gzip),
+        media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
-    
-    data = []
-    for conv, child, msg in result:
-        data.append({
-            "conversation_id": conv.id,
-            "child_name": child.nickname or child.first_name,
-            "child_grade": child.grade_level,
-            "message_role": msg.role,
-            "message_content": msg.content,
-            "source_type": msg.source_type,
-            "timestamp": msg.created_at.isoformat(),
-            "topics": conv.topics
-        })
-    
-    if format == "json":
-        from fastapi.responses import JSONResponse
-        return JSONResponse(content={
-            "export_date": datetime.utcnow().isoformat(),
-            "total_messages": len(data),
-            "data": data
-        })
-    
-    elif format == "csv":
-        import csv
-        import io
-        from fastapi.responses import StreamingResponse
-        
-        output = io.StringIO()
-        if data:
-            writer = csv.DictWriter(output, fieldnames=data[0].keys())
-            writer.writeheader()
-            writer.writerows(data)
-        
-        output.seek(0)
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": "attachment; filename=conversations.csv"}
-        )
 
 # ==================== SAFETY CONTROLS ====================
 
@@ -655,11 +575,32 @@ async def get_safety_report(
     if not child:
         raise HTTPException(status_code=404, detail="Child not found")
     
-    # TODO: Implement flagging system
-    flagged_conversations = 0
-    recent_concerns = []
+    # Exchanges the safety screen redirected or filtered in the last 30 days
+    flags_result = await db.execute(
+        select(AuditLog.details, AuditLog.timestamp)
+        .where(
+            AuditLog.child_id == child.id,
+            AuditLog.action == SAFETY_FLAG_ACTION,
+            AuditLog.timestamp >= datetime.utcnow() - timedelta(days=30)
+        )
+        .order_by(AuditLog.timestamp.desc())
+    )
+    flags = flags_result.all()
+    flagged_conversations = len({details.get("conversation_id") for details, _ in flags if details})
+    recent_concerns = [
+        {
+            "category": details.get("category"),
+            "stage": details.get("stage"),
+            "action": details.get("action"),
+            "conversation_id": details.get("conversation_id"),
+            "timestamp": timestamp
+        }
+        for details, timestamp in flags[:10] if details
+    ]
     
     recommendations = []
+    if any(concern["category"] == "self_harm" for concern in recent_concerns):
+        recommendations.append("Nia redirected a question about self-harm - please check in with your child")
     if child.content_filter_level == "relaxed":
         recommendations.append("Consider using 'moderate' or 'strict' filtering for better safety")
     
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "nia:answer:v1:"
+PUNCTUATION_RE = re.compile(r"[^\w\s]")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# Age bands share answers between children at a similar reading level
+AGE_BANDS = ((6, "<=6"), (8, "7-8"), (10, "9-10"), (13, "11-13"))
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, drop punctuation/emoji and collapse whitespace"""
+    text = PUNCTUATION_RE.sub(" ", text.lower())
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def age_band(child_age: Optional[int]) -> str:
+    if child_age is None:
+        return "any"
+    for upper, band in AGE_BANDS:
+        if child_age <= upper:
+            return band
+    return "14+"
+
+
+def cache_key(
+    question: str,
+    grade_level: str,
+    depth_level: int,
+    child_age: Optional[int] = None,
+    context: str = ""
+) -> str:
+    """Cache key for a question asked at a given grade, depth and age band (and conversation context)"""
+    raw = f"{normalize_question(question)}|{grade_level}|{depth_level}|{age_band(child_age)}"
+    if context:
+        raw += f"|{context}"
+    return KEY_PREFIX + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """In-process LRU with a per-entry TTL"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Dict, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: str) -> Optional[Dict]:
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class AnswerCache:
+    """
+    Two-tier cache for RAG answers
+
+    L1 is a per-worker LRU; L2 is Redis (REDIS_URL) shared by every worker.
+    Redis errors are logged and treated as misses - the cache must never
+    fail a child's request.
+    """
+
+    def __init__(self):
+        self.local = LRUCache(settings.ANSWER_CACHE_MAX_ENTRIES)
+        self.redis = None
+        self.hits = 0
+        self.misses = 0
+        self.l2_hits = 0
+        self.l2_errors = 0
+
+        if settings.REDIS_URL:
+            try:
+                import redis.asyncio as aioredis
+                self.redis = aioredis.from_url(
+                    settings.REDIS_URL,
+                    decode_responses=True,
+                    socket_connect_timeout=0.5,
+                    socket_timeout=0.5
+                )
+            except ImportError:
+                logger.warning("⚠️ REDIS_URL is set but the redis package is not installed - using in-process cache only")
+
+        logger.info(f"✅ Answer cache initialized (L2: {'redis' if self.redis else 'disabled'})")
+
+    @staticmethod
+    def ttl_for(result: Dict) -> int:
+        """Web answers go stale quickly; general knowledge does not"""
+        if result.get("used_web_search"):
+            return settings.ANSWER_CACHE_WEB_TTL_SECONDS
+        return settings.ANSWER_CACHE_TTL_SECONDS
+
+    async def get(self, key: str) -> Optional[Dict]:
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return dict(value)
+
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(key)
+                if raw is not None:
+                    value = json.loads(raw)
+                    ttl = await self.redis.ttl(key)
+                    self.local.set(key, value, ttl if ttl and ttl > 0 else self.ttl_for(value))
+                    self.hits += 1
+                    self.l2_hits += 1
+                    return dict(value)
+            except Exception as e:
+                self.l2_errors += 1
+                logger.warning(f"⚠️ Answer cache L2 read failed: {e}")
+
+        self.misses += 1
+        return None
+
+    async def peek(self, key: str) -> Optional[Dict]:
+        """Look up a key without touching the hit/miss counters"""
+        value = self.local.get(key)
+        if value is not None:
+            return dict(value)
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(key)
+                if raw is not None:
+                    return json.loads(raw)
+            except Exception as e:
+                self.l2_errors += 1
+                logger.warning(f"⚠️ Answer cache L2 read failed: {e}")
+        return None
+
+    async def set(self, key: str, result: Dict, ttl: Optional[int] = None):
+        ttl = ttl or self.ttl_for(result)
+        self.local.set(key, result, ttl)
+
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, json.dumps(result), ex=ttl)
+            except Exception as e:
+                self.l2_errors += 1
+                logger.warning(f"⚠️ Answer cache L2 write failed: {e}")
+
+    async def pop(self, key: str) -> Optional[Dict]:
+        """
+        Remove a key and return its value, without touching the hit/miss counters
+
+        With Redis, GETDEL is the authority: the read and delete are one step,
+        so when two workers race for the same entry only one of them gets it.
+        """
+        value = self.local.pop(key)
+        if self.redis is not None:
+            try:
+                raw = await self.redis.getdel(key)
+                value = json.loads(raw) if raw is not None else None
+            except Exception as e:
+                self.l2_errors += 1
+                logger.warning(f"⚠️ Answer cache L2 delete failed: {e}")
+        return dict(value) if value is not None else None
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "l2_hits": self.l2_hits,
+            "l2_errors": self.l2_errors,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+            "entries": len(self.local),
+            "l2_enabled": self.redis is not None
+        }
+
+    async def aclose(self):
+        if self.redis is not None:
+            await self.redis.aclose()
+
+
+# Global answer cache instance
+_answer_cache = None
+
+def get_answer_cache() -> AnswerCache:
+    """Get or create the global answer cache instance"""
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = AnswerCache()
+    return _answer_cache
+
+async def close_answer_cache():
+    """Close the Redis connection pool on shutdown"""
+    global _answer_cache
+    if _answer_cache is not None:
+        await _answer_cache.aclose()
+        _answer_cache = None
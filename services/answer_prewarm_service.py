@@ -0,0 +1,285 @@
+import asyncio
+import json
+import logging
+import os
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import anthropic
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import Child, Conversation, Message, IS_QUESTION
+from services.answer_cache import cache_key, get_answer_cache, normalize_question
+from services.model_router import LoadSnapshot
+from services.prompt_service import normalize_grade_band
+from services.speculation_service import is_follow_up
+
+logger = logging.getLogger(__name__)
+
+# Items per Message Batches request (the API allows up to 100,000)
+BATCH_SIZE = 10_000
+
+PENDING = "pending"
+SUBMITTED = "submitted"
+LOADED = "loaded"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+@dataclass
+class PrewarmItem:
+    """One popular (question, grade band, depth, age band) to pre-generate"""
+    custom_id: str
+    question: str
+    grade_level: str
+    depth_level: int
+    child_age: Optional[int]
+    count: int
+    status: str = PENDING
+    attempts: int = 0
+    result: Optional[Dict] = None
+
+
+@dataclass
+class PrewarmState:
+    """Everything needed to pick the job up again after an interruption"""
+    created_at: str
+    items: Dict[str, PrewarmItem] = field(default_factory=dict)
+    batch_id: Optional[str] = None
+    batches_submitted: int = 0
+
+    def save(self, path: str):
+        # Write-then-rename so an interrupted save never leaves a torn file
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["PrewarmState"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+        raw["items"] = {custom_id: PrewarmItem(**item) for custom_id, item in raw["items"].items()}
+        return cls(**raw)
+
+    def with_status(self, *statuses: str) -> List[PrewarmItem]:
+        return [item for item in self.items.values() if item.status in statuses]
+
+    def counts(self) -> Dict[str, int]:
+        return dict(Counter(item.status for item in self.items.values()))
+
+
+def age_on_today(date_of_birth: Optional[datetime]) -> Optional[int]:
+    if date_of_birth is None:
+        return None
+    today = datetime.now()
+    age = today.year - date_of_birth.year
+    if (today.month, today.day) < (date_of_birth.month, date_of_birth.day):
+        age -= 1
+    return age
+
+
+async def mine_popular_questions(
+    db: AsyncSession,
+    top_n: int = None,
+    lookback_days: int = None,
+    min_count: int = None
+) -> List[PrewarmItem]:
+    """
+    Most-asked (question, grade band, depth, age band) tuples in recent messages
+
+    Questions are grouped by their answer-cache key, so each item is exactly
+    one cache entry. "Yes, tell me more!" follow-ups are left out - their
+    answers depend on the conversation, not the question.
+    """
+    top_n = top_n or settings.PREWARM_TOP_N
+    lookback_days = lookback_days or settings.PREWARM_LOOKBACK_DAYS
+    min_count = min_count or settings.PREWARM_MIN_COUNT
+    since = datetime.now(timezone.utc) - timedelta(days=lookback_days)
+
+    stmt = (
+        select(Message.content, Message.depth_level, Child.grade_level, Child.date_of_birth)
+        .join(Conversation, Message.conversation_id == Conversation.id)
+        .join(Child, Conversation.child_id == Child.id)
+        .where(IS_QUESTION, Message.created_at >= since)
+        .execution_options(yield_per=2000)
+    )
+
+    counts: Counter = Counter()
+    examples: Dict[str, PrewarmItem] = {}
+    result = await db.stream(stmt)
+    async for content, depth_level, grade_level, date_of_birth in result:
+        if is_follow_up(content) or len(normalize_question(content)) < 3:
+            continue
+        child_age = age_on_today(date_of_birth)
+        key = cache_key(content, normalize_grade_band(grade_level), depth_level, child_age)
+        counts[key] += 1
+        if key not in examples:
+            examples[key] = PrewarmItem(
+                custom_id=key.rsplit(":", 1)[-1][:64],
+                question=content,
+                grade_level=grade_level,
+                depth_level=depth_level,
+                child_age=child_age,
+                count=0
+            )
+
+    items = []
+    for key, count in counts.most_common(top_n):
+        if count < min_count:
+            break
+        examples[key].count = count
+        items.append(examples[key])
+    logger.info(f"📚 Found {len(items)} popular questions (of {len(counts)} distinct) in the last {lookback_days} days")
+    return items
+
+
+class AnswerPrewarmJob:
+    """
+    Pre-generates popular answers through the Message Batches API
+
+    Batches are processed asynchronously by Anthropic at a lower price and
+    off the request path; finished answers go into the answer cache under
+    the same keys live requests use. Progress is written to a state file
+    after every step, so an interrupted run picks up where it stopped:
+    a submitted batch is polled rather than re-sent, and loaded answers
+    are not generated again.
+    """
+
+    def __init__(self, rag, state_path: str = None, poll_seconds: float = None):
+        self.rag = rag
+        self.backend = rag.backend
+        self.cache = rag.cache
+        self.state_path = state_path or settings.PREWARM_STATE_PATH
+        self.poll_seconds = poll_seconds if poll_seconds is not None else settings.PREWARM_POLL_SECONDS
+
+    def _key(self, item: PrewarmItem) -> str:
+        return cache_key(item.question, normalize_grade_band(item.grade_level), item.depth_level, item.child_age)
+
+    def _plan(self, item: PrewarmItem):
+        """Retrieval hits and model choice for an item, as a live request would make them"""
+        band = normalize_grade_band(item.grade_level)
+        hits = self.rag.retrieval.search(item.question)
+        # Batches are off the request path - route as if the API were idle
+        choice = self.rag.model_router.policy.choose(band, item.depth_level, "strict", LoadSnapshot(0, {}))
+        return hits, choice
+
+    async def _filter(self, state: PrewarmState):
+        """Skip items the curated fast path, the web or the cache already cover"""
+        for item in state.with_status(PENDING):
+            if self.rag.curated.try_answer(item.question, item.grade_level, item.depth_level) is not None:
+                item.status = SKIPPED
+            elif self.rag.web_search.decide(item.question, self._plan(item)[0]).attach:
+                item.status = SKIPPED  # needs fresh information - not worth caching for a week
+            elif await self.cache.peek(self._key(item)) is not None:
+                item.status = SKIPPED
+
+    async def _submit(self, state: PrewarmState, items: List[PrewarmItem]):
+        requests = []
+        for item in items:
+            hits, choice = self._plan(item)
+            params = self.rag._build_request(
+                item.question, item.grade_level, item.depth_level, item.child_age,
+                hits, choice, web_search=False
+            )
+            requests.append({"custom_id": item.custom_id, "params": params})
+
+        state.batch_id = await self.backend.create_batch(requests)
+        state.batches_submitted += 1
+        for item in items:
+            item.status = SUBMITTED
+            item.attempts += 1
+        state.save(self.state_path)
+        logger.info(f"⚡ Submitted batch {state.batch_id} with {len(items)} questions")
+
+    async def _wait(self, state: PrewarmState) -> bool:
+        """Poll until the batch ends; False if Anthropic no longer has it"""
+        while True:
+            try:
+                status = await self.backend.batch_status(state.batch_id)
+            except anthropic.NotFoundError:
+                logger.warning(f"⚠️ Batch {state.batch_id} not found - resubmitting its questions")
+                return False
+            if status == "ended":
+                return True
+            logger.info(f"🔍 Batch {state.batch_id} {status}, checking again in {self.poll_seconds:g}s")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def _collect(self, state: PrewarmState):
+        batch_id, loaded = state.batch_id, 0
+        async for custom_id, message in self.backend.batch_results(batch_id):
+            item = state.items.get(custom_id)
+            if item is None or item.status != SUBMITTED:
+                continue
+            if message is None:
+                continue  # errored or expired - retried below
+            hits, choice = self._plan(item)
+            result = self.rag._parse_response(message, hits, choice)
+            result["web_search_offered"] = False
+            await self.cache.set(self._key(item), result)
+            item.result = result
+            item.status = LOADED
+            loaded += 1
+        self._settle(state)
+        logger.info(f"✅ Loaded {loaded} answers from batch {batch_id} into the answer cache")
+
+    def _settle(self, state: PrewarmState):
+        for item in state.with_status(SUBMITTED):
+            item.status = FAILED if item.attempts >= settings.PREWARM_MAX_ATTEMPTS else PENDING
+        state.batch_id = None
+        state.save(self.state_path)
+
+    async def run(self, db: Optional[AsyncSession] = None, fresh: bool = False, top_n: int = None) -> PrewarmState:
+        state = None if fresh else PrewarmState.load(self.state_path)
+        if state is not None:
+            logger.info(f"📚 Resuming prewarm job from {self.state_path}: {state.counts()}")
+        else:
+            state = PrewarmState(created_at=datetime.now(timezone.utc).isoformat())
+            for item in await mine_popular_questions(db, top_n=top_n):
+                state.items[item.custom_id] = item
+            await self._filter(state)
+            state.save(self.state_path)
+
+        if not self.cache.redis:
+            logger.warning("⚠️ REDIS_URL is not set - workers will only see these answers via load_prewarmed_answers()")
+
+        while True:
+            if state.batch_id is not None:
+                if await self._wait(state):
+                    await self._collect(state)
+                else:
+                    self._settle(state)
+                continue
+
+            pending = state.with_status(PENDING)
+            if not pending:
+                break
+            await self._submit(state, pending[:BATCH_SIZE])
+
+        logger.info(f"✅ Prewarm job finished: {state.counts()}")
+        return state
+
+
+async def load_prewarmed_answers(path: str = None) -> int:
+    """Copy answers from the last prewarm run into this worker's cache (skipped once they are stale)"""
+    state = PrewarmState.load(path or settings.PREWARM_STATE_PATH)
+    if state is None:
+        return 0
+    age = datetime.now(timezone.utc) - datetime.fromisoformat(state.created_at)
+    if age.total_seconds() > settings.ANSWER_CACHE_TTL_SECONDS:
+        logger.warning(f"⚠️ Prewarm state {path or settings.PREWARM_STATE_PATH} is {age.days} days old - not loading it")
+        return 0
+    cache = get_answer_cache()
+    loaded = 0
+    for item in state.with_status(LOADED):
+        key = cache_key(item.question, normalize_grade_band(item.grade_level), item.depth_level, item.child_age)
+        await cache.set(key, item.result)
+        loaded += 1
+    logger.info(f"✅ Loaded {loaded} prewarmed answers into the answer cache")
+    return loaded
@@ -0,0 +1,187 @@
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import Conversation, Message
+from services.retrieval_service import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing the API adds around the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SOURCE_PREFIX_RE = re.compile(r"^\s*(📚|🌐|ℹ️)[^:\n]*:\s*", re.UNICODE)
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+# Words that point back at the conversation ("tell me more", "why do they...")
+CONTEXT_DEPENDENT_RE = re.compile(
+    r"\b(it|its|they|them|their|he|him|his|she|her|that|this|those|these|there|then|"
+    r"more|else|again|another|other|also|too|next|same|instead|example|examples|"
+    r"what about|how about)\b",
+    re.IGNORECASE
+)
+
+# Words that carry no topic of their own ("Yes please", "What happened?")
+FOLLOW_UP_WORDS = frozenset("""
+yes yeah yep yup ok okay sure no nope more next example give show happen happened
+mean say said really cool wow thank thanks go deeper keep going why how what
+""".split())
+
+ROLES = {"child": "user", "assistant": "assistant"}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough Claude token count without a network call - about four UTF-8
+    bytes per token for English, and emoji cost about one token each
+    """
+    if not text:
+        return 0
+    return len(text.encode("utf-8")) // 4 + 1
+
+
+def summarize_turn(role: str, content: str) -> str:
+    """One summary line for a message: the question, or the answer's first sentence"""
+    text = SOURCE_PREFIX_RE.sub("", content).strip()
+    if role == "child":
+        return f"- Child asked: {text[:160]}"
+    first = SENTENCE_END_RE.split(text.replace("\n", " "), maxsplit=1)[0]
+    return f"- Nia explained: {first[:200]}"
+
+
+def is_standalone(question: str) -> bool:
+    """Whether a question makes sense without the conversation before it"""
+    if CONTEXT_DEPENDENT_RE.search(question):
+        return False
+    return any(token not in FOLLOW_UP_WORDS for token in tokenize(question))
+
+
+@dataclass
+class ChatContext:
+    """Earlier turns to send with a question, and the conversation's summary state"""
+    history: List[Dict] = field(default_factory=list)
+    summary: str = ""
+    summary_message_count: int = 0
+    summary_changed: bool = False
+
+    @property
+    def last_question(self) -> Optional[str]:
+        for turn in reversed(self.history):
+            if turn["role"] == "user":
+                return turn["content"]
+        return None
+
+    def digest(self) -> str:
+        """Stable fingerprint for cache keys - empty for a fresh conversation"""
+        if not self.history and not self.summary:
+            return ""
+        raw = self.summary + "".join(f"|{turn['role']}:{turn['content']}" for turn in self.history)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    def cache_digest(self, question: str) -> str:
+        """
+        Context part of the answer cache key - the conversation digest unless
+        the question clearly stands alone (a topic word of its own and nothing
+        pointing back), so "What is a numerator?" shares one entry everywhere
+        but "Why?" is keyed to the conversation it was asked in
+        """
+        return "" if is_standalone(question) else self.digest()
+
+    def apply(self, conversation: Conversation):
+        """Store an updated rolling summary on the conversation"""
+        if self.summary_changed:
+            conversation.summary = self.summary
+            conversation.summary_message_count = self.summary_message_count
+
+
+class ContextService:
+    """
+    Builds bounded multi-turn context for a conversation
+
+    Recent turns are sent verbatim, newest first, until the history token
+    budget is used up. Turns that fall out of the window are folded into a
+    rolling summary on the Conversation row, so each request only reads
+    messages newer than the summary.
+    """
+
+    async def load(self, db: AsyncSession, conversation: Optional[Conversation]) -> ChatContext:
+        if conversation is None or not settings.CONTEXT_ENABLED:
+            return ChatContext()
+
+        summarized = conversation.summary_message_count or 0
+        rows = (await db.execute(
+            select(Message.role, Message.content)
+            .where(Message.conversation_id == conversation.id)
+            .order_by(Message.created_at, Message.id)
+            .offset(summarized)
+        )).all()
+
+        # Newest turns first until the budget is spent
+        budget = settings.CONTEXT_HISTORY_TOKEN_BUDGET
+        keep_from = len(rows)
+        for i in range(len(rows) - 1, -1, -1):
+            cost = estimate_tokens(rows[i].content) + MESSAGE_OVERHEAD_TOKENS
+            if cost > budget:
+                break
+            budget -= cost
+            keep_from = i
+
+        # Start the window on a child turn so roles alternate from "user"
+        while keep_from < len(rows) and rows[keep_from].role != "child":
+            keep_from += 1
+
+        context = ChatContext(
+            summary=conversation.summary or "",
+            summary_message_count=summarized
+        )
+        if keep_from:
+            context.summary = self._fold(context.summary, rows[:keep_from])
+            context.summary_message_count = summarized + keep_from
+            context.summary_changed = True
+
+        context.history = self._alternate(rows[keep_from:])
+        return context
+
+    @staticmethod
+    def _fold(summary: str, rows) -> str:
+        """Append aged-out turns to the summary, dropping its oldest lines past the budget"""
+        lines = summary.splitlines() if summary else []
+        lines.extend(summarize_turn(row.role, row.content) for row in rows)
+
+        # Keep the opening question - it says what the conversation is about
+        while len(lines) > 2 and estimate_tokens("\n".join(lines)) > settings.CONTEXT_SUMMARY_TOKEN_BUDGET:
+            del lines[1]
+        return "\n".join(lines)
+
+    @staticmethod
+    def _alternate(rows) -> List[Dict]:
+        """Messages API turns: user/assistant alternating, ending on assistant"""
+        turns: List[Dict] = []
+        for row in rows:
+            role = ROLES.get(row.role)
+            if role is None:
+                continue
+            if turns and turns[-1]["role"] == role:
+                turns[-1]["content"] += "\n\n" + row.content
+            else:
+                turns.append({"role": role, "content": row.content})
+        if turns and turns[-1]["role"] == "user":
+            turns.pop()
+        return turns
+
+
+# Global context service instance
+_context_service = None
+
+def get_context_service() -> ContextService:
+    """Get or create the global context service instance"""
+    global _context_service
+    if _context_service is None:
+        _context_service = ContextService()
+    return _context_service
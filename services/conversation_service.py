@@ -3,6 +3,32 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Follow-up prompts based on depth
+FOLLOW_UP_PROMPTS = {
+    1: {
+        "text": "Would you like to learn more about this? 🤔",
+        "options": [
+            {"id": "yes", "text": "Yes, tell me more! 🐠"},
+            {"id": "done", "text": "I'm all done for now ✅"}
+        ]
+    },
+    2: {
+        "text": "Want to dive even deeper into this topic? 🌊",
+        "options": [
+            {"id": "yes", "text": "Yes, go deeper! 🔍"},
+            {"id": "done", "text": "That's enough for now ✅"}
+        ]
+    },
+    3: {
+        "text": "Would you like to explore related topics? 🗺️",
+        "options": [
+            {"id": "yes", "text": "Yes, show me more! 🌟"},
+            {"id": "done", "text": "I'm done learning for now ✅"}
+        ]
+    }
+}
+
+
 class ConversationService:
     
     @staticmethod
@@ -33,31 +59,6 @@ class ConversationService:
             source_type = "hybrid"
             source_label = "📚 From Nia's Materials"
         
-        # Follow-up prompts based on depth
-        follow_up_prompts = {
-            1: {
-                "text": "Would you like to learn more about this? 🤔",
-                "options": [
-                    {"id": "yes", "text": "Yes, tell me more! 🐠"},
-                    {"id": "done", "text": "I'm all done for now ✅"}
-                ]
-            },
-            2: {
-                "text": "Want to dive even deeper into this topic? 🌊",
-                "options": [
-                    {"id": "yes", "text": "Yes, go deeper! 🔍"},
-                    {"id": "done", "text": "That's enough for now ✅"}
-                ]
-            },
-            3: {
-                "text": "Would you like to explore related topics? 🗺️",
-                "options": [
-                    {"id": "yes", "text": "Yes, show me more! 🌟"},
-                    {"id": "done", "text": "I'm done learning for now ✅"}
-                ]
-            }
-        }
-        
         return {
             "text": answer,
             "tutoring_depth_level": depth_level,
@@ -67,7 +68,7 @@ class ConversationService:
             "source_label": source_label,
             "generated_visuals": visuals or [],
             "related_topics": related_topics or [],
-            "follow_up_prompt": follow_up_prompts.get(depth_level, follow_up_prompts[1])
+            "follow_up_prompt": FOLLOW_UP_PROMPTS.get(depth_level, FOLLOW_UP_PROMPTS[1])
         }
     
     @staticmethod
@@ -0,0 +1,206 @@
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Dict, Optional
+
+from config import settings
+from services.prompt_service import normalize_grade_band
+from services.retrieval_service import RetrievalService, SearchHit, get_retrieval_service, index_tokens, tokenize
+
+logger = logging.getLogger(__name__)
+
+CURATED_MODEL_LABEL = "nia-curated-content"
+DEGRADED_MODEL_LABEL = "nia-degraded"
+
+UNAVAILABLE_ANSWER = (
+    "ℹ️ From what I know:\n\n"
+    "My thinking cap needs a little rest right now! 🧢 "
+    "Please ask me again in a minute, and we'll explore your question together. 🌟"
+)
+
+# Questions about "now" need fresh information, never a stored lesson
+TIME_SENSITIVE_RE = re.compile(
+    r"\b(today|tonight|tomorrow|yesterday|now|current|currently|latest|news|this (week|month|year)|what time)\b",
+    re.IGNORECASE
+)
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Numbers mean something to work out ("7 times 8"), not a lesson to quote
+DIGIT_RE = re.compile(r"\d")
+
+# Question wording that carries no topic ("how many bones...")
+QUESTION_FILLER = frozenset({"many", "much", "mean", "meaning", "called", "happen", "thing"})
+
+# How much of a section each grade band gets (bullets or sentences)
+EXCERPT_ITEMS = {
+    "K-1st": 2,
+    "2nd-3rd": 3,
+    "4th-5th": 4,
+    "6th-8th": 6,
+    "9th-12th": 6
+}
+
+
+def grade_excerpt(text: str, grade_level: str) -> str:
+    """The first few bullets/sentences of a section, sized for the grade band"""
+    limit = EXCERPT_ITEMS[normalize_grade_band(grade_level)]
+    items: List[str] = []
+    in_code = False
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("```"):
+            in_code = not in_code
+            continue
+        if in_code or not line:
+            continue
+        line = line.replace("**", "")
+        if line.startswith(("- ", "* ")):
+            items.append("- " + line[2:].strip())
+        else:
+            items.extend(sentence for sentence in SENTENCE_RE.split(line) if sentence)
+        if len(items) >= limit:
+            break
+
+    return "\n".join(items[:limit])
+
+
+@dataclass
+class FastPathMatch:
+    """The best candidate section for a question and how well it covers it"""
+    hit: SearchHit  # score is the question's cosine similarity to the section
+    coverage: float  # IDF-weighted share of the question's words found in the section
+    heading_match: bool  # a question word is in the section's title or headings
+
+
+class CuratedAnswerService:
+    """
+    Answers depth-1 questions straight from content/ when one curriculum
+    section matches very strongly - no LLM call, no cost, milliseconds.
+
+    A section must contain every topic word of the question (by IDF-weighted
+    coverage) and be about it: a question word in its headings, or a high
+    cosine similarity on the hashed TF-IDF index. Subjects opt in via
+    settings; benchmarks/curated_fast_path.py checks the calibration.
+    """
+
+    def __init__(self, retrieval: Optional[RetrievalService] = None):
+        self.retrieval = retrieval or get_retrieval_service()
+        self.served = 0
+        self.declined = 0
+        self.degraded = 0
+
+        # Per-chunk lookups built once, not per question
+        chunks = self.retrieval.chunks
+        self._positions = {chunk.chunk_id: i for i, chunk in enumerate(chunks)}
+        self._terms = [set(index_tokens(chunk)) for chunk in chunks]
+        self._heading_terms = [set(tokenize(f"{chunk.title} {chunk.section} {chunk.heading}")) for chunk in chunks]
+        # Sections that are only a diagram or code block have nothing to quote
+        self._quotable = [bool(grade_excerpt(chunk.text, "K")) for chunk in chunks]
+        document_frequency = Counter(term for terms in self._terms for term in terms)
+        self._idf = {
+            term: math.log(1 + (len(chunks) - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+        self._unseen_idf = math.log(1 + (len(chunks) + 0.5) / 0.5)
+
+    def best_match(self, question: str) -> Optional[FastPathMatch]:
+        """The strongly-matching section that best covers the question's words"""
+        candidates = self.retrieval.search(question, top_k=5, min_score=settings.CURATED_FAST_PATH_MIN_SCORE)
+        terms = set(tokenize(question)) - QUESTION_FILLER
+        if not candidates or not terms:
+            return None
+
+        similarities = self.retrieval.vectors.score([question])[0]
+        weights = {term: self._idf.get(term, self._unseen_idf) for term in terms}
+        total = sum(weights.values())
+        matches = []
+        for hit in candidates:
+            position = self._positions[hit.chunk.chunk_id]
+            if not self._quotable[position]:
+                continue
+            matches.append(FastPathMatch(
+                hit=SearchHit(hit.chunk, float(similarities[position])),
+                coverage=sum(weight for term, weight in weights.items() if term in self._terms[position]) / total,
+                heading_match=bool(terms & self._heading_terms[position])
+            ))
+        return max(matches, key=lambda match: (match.coverage, match.heading_match, match.hit.score), default=None)
+
+    def is_confident(self, match: Optional[FastPathMatch]) -> bool:
+        return (
+            match is not None
+            and match.coverage >= settings.CURATED_FAST_PATH_MIN_COVERAGE - 1e-9
+            and (match.heading_match or match.hit.score >= settings.CURATED_FAST_PATH_MIN_SIMILARITY)
+            and match.hit.chunk.subject in settings.CURATED_FAST_PATH_SUBJECTS
+        )
+
+    def try_answer(self, question: str, grade_level: str, depth_level: int) -> Optional[Dict]:
+        """A RAG-shaped result built from the curriculum, or None to ask Claude"""
+        if not settings.CURATED_FAST_PATH_ENABLED or depth_level != 1:
+            return None
+        if TIME_SENSITIVE_RE.search(question) or DIGIT_RE.search(question):
+            return None
+
+        fast_path = self.best_match(question)
+        if not self.is_confident(fast_path):
+            self.declined += 1
+            return None
+        match = fast_path.hit
+
+        excerpt = grade_excerpt(match.chunk.text, grade_level)
+        if not excerpt:
+            self.declined += 1
+            return None
+
+        self.served += 1
+        logger.info(f"📚 Curated fast path: {match.chunk.chunk_id} (similarity {match.score:.2f})")
+
+        return {
+            "answer": f"📚 From my learning materials:\n\n{match.chunk.heading}\n{excerpt}",
+            "sources": [match.chunk.citation(match.score)],
+            "model_used": CURATED_MODEL_LABEL,
+            "used_web_search": False
+        }
+
+    def fallback_answer(self, question: str, grade_level: str) -> Dict:
+        """
+        Best-effort answer while Claude is unavailable: the top curriculum
+        section for any subject at the normal retrieval threshold, or a
+        friendly ask-again-soon message. Never cached.
+        """
+        self.degraded += 1
+        hits = self.retrieval.search(question, top_k=1)
+        excerpt = grade_excerpt(hits[0].chunk.text, grade_level) if hits else ""
+        if not excerpt:
+            return {
+                "answer": UNAVAILABLE_ANSWER,
+                "sources": [],
+                "model_used": DEGRADED_MODEL_LABEL,
+                "used_web_search": False,
+                "degraded": True
+            }
+
+        chunk = hits[0].chunk
+        return {
+            "answer": f"📚 From my learning materials:\n\n{chunk.heading}\n{excerpt}",
+            "sources": [chunk.citation(hits[0].score)],
+            "model_used": DEGRADED_MODEL_LABEL,
+            "used_web_search": False,
+            "degraded": True
+        }
+
+    def stats(self) -> Dict:
+        return {"served": self.served, "declined": self.declined, "degraded": self.degraded}
+
+
+# Global curated answer service instance
+_curated_answer_service = None
+
+def get_curated_answer_service() -> CuratedAnswerService:
+    """Get or create the global curated answer service instance"""
+    global _curated_answer_service
+    if _curated_answer_service is None:
+        _curated_answer_service = CuratedAnswerService()
+    return _curated_answer_service
@@ -0,0 +1,227 @@
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import Child, ChildDailyStats, Conversation, Message
+from services.topic_classifier import get_topic_classifier
+
+logger = logging.getLogger(__name__)
+
+# First key of the per-child advisory locks taken by rollup writers
+ROLLUP_LOCK_NAMESPACE = 0x6E696164  # "niad"
+
+
+def local_day(timestamp: Optional[datetime] = None) -> date:
+    """Calendar day of a timestamp (naive means UTC; default now) in DEFAULT_TIMEZONE"""
+    if timestamp is None:
+        timestamp = datetime.now(timezone.utc)
+    elif timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(ZoneInfo(settings.DEFAULT_TIMEZONE)).date()
+
+
+def days_ago(days: int) -> date:
+    """First local day of a `days`-long window ending today (days=1 is just today)"""
+    return local_day() - timedelta(days=days - 1)
+
+
+@dataclass
+class DayTotals:
+    """Message counts for one child-day, or summed over many"""
+    questions: int = 0
+    answers: int = 0
+    depth_sum: int = 0
+    source_counts: Counter = field(default_factory=Counter)
+    topic_counts: Counter = field(default_factory=Counter)
+
+    @property
+    def messages(self) -> int:
+        return self.questions + self.answers
+
+    @property
+    def average_depth(self) -> float:
+        return self.depth_sum / self.messages if self.messages else 0.0
+
+    def add_message(self, role: str, depth_level: Optional[int], source_type: Optional[str] = None, topics: Iterable[str] = ()):
+        if role == "child":
+            self.questions += 1
+            self.topic_counts.update(set(topics))
+        else:
+            self.answers += 1
+            if source_type:
+                self.source_counts[source_type] += 1
+        self.depth_sum += depth_level or 0
+
+    def add_row(self, row: ChildDailyStats):
+        self.questions += row.questions
+        self.answers += row.answers
+        self.depth_sum += row.depth_sum
+        self.source_counts.update(row.source_counts or {})
+        self.topic_counts.update(row.topic_counts or {})
+
+    @classmethod
+    def total(cls, rows: Iterable[ChildDailyStats]) -> "DayTotals":
+        totals = cls()
+        for row in rows:
+            totals.add_row(row)
+        return totals
+
+
+async def lock_daily_stats(db: AsyncSession, child_ids: Iterable[int]):
+    """
+    Hold the children's rollup lock until the transaction ends
+
+    Live upserts and rebuild_daily_stats both take it, so a rebuild can't
+    delete an increment made after it read the messages. Postgres only;
+    SQLite already serialises every write transaction.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for child_id in sorted(set(child_ids)):  # one order everywhere, so no deadlocks
+        await db.execute(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_NAMESPACE, child_id)))
+
+
+def _merge_counts(stored: Optional[Dict], added: Counter) -> Dict:
+    merged = Counter(stored or {})
+    merged.update(added)
+    return dict(merged)
+
+
+async def add_to_daily_stats(db: AsyncSession, child_id: int, day: date, totals: DayTotals):
+    """
+    Add totals to a child's row for the day, creating it if needed
+
+    The counters are bumped in a single INSERT ... ON CONFLICT DO UPDATE, so
+    concurrent writers never lose an increment; that upsert also holds the
+    row lock until commit, which keeps the follow-up JSON merge safe.
+    """
+    await lock_daily_stats(db, [child_id])
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = insert(ChildDailyStats).values(
+        child_id=child_id,
+        day=day,
+        questions=totals.questions,
+        answers=totals.answers,
+        depth_sum=totals.depth_sum
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ChildDailyStats.child_id, ChildDailyStats.day],
+        set_={
+            "questions": ChildDailyStats.questions + stmt.excluded.questions,
+            "answers": ChildDailyStats.answers + stmt.excluded.answers,
+            "depth_sum": ChildDailyStats.depth_sum + stmt.excluded.depth_sum,
+            "updated_at": func.now()
+        }
+    )
+    await db.execute(stmt)
+
+    if not totals.source_counts and not totals.topic_counts:
+        return
+    key = (ChildDailyStats.child_id == child_id, ChildDailyStats.day == day)
+    stored = (await db.execute(
+        select(ChildDailyStats.source_counts, ChildDailyStats.topic_counts).where(*key)
+    )).one()
+    await db.execute(
+        update(ChildDailyStats).where(*key).values(
+            source_counts=_merge_counts(stored.source_counts, totals.source_counts),
+            topic_counts=_merge_counts(stored.topic_counts, totals.topic_counts)
+        )
+    )
+
+
+async def record_exchange(
+    db: AsyncSession,
+    child_id: int,
+    depth_level: int,
+    source_type: Optional[str],
+    topics: Sequence[str],
+    when: Optional[datetime] = None
+):
+    """Count one question and its answer in today's row (same transaction as the messages)"""
+    totals = DayTotals()
+    totals.add_message("child", depth_level, topics=topics)
+    totals.add_message("assistant", depth_level, source_type)
+    await add_to_daily_stats(db, child_id, local_day(when), totals)
+
+
+async def load_daily_stats(
+    db: AsyncSession,
+    child_ids: Sequence[int],
+    since: Optional[date] = None
+) -> List[ChildDailyStats]:
+    """Rollup rows for the children, oldest day first (one indexed range read)"""
+    stmt = select(ChildDailyStats).where(ChildDailyStats.child_id.in_(child_ids))
+    if since is not None:
+        stmt = stmt.where(ChildDailyStats.day >= since)
+    return list((await db.execute(stmt.order_by(ChildDailyStats.day))).scalars())
+
+
+async def rebuild_daily_stats(
+    db: AsyncSession,
+    child_ids: Optional[Sequence[int]] = None,
+    batch_size: int = 50
+) -> int:
+    """
+    Recompute the rollup from messages; returns rows written
+
+    Children are processed batch_size at a time: their messages are
+    streamed (yield_per, so memory stays flat), summed per local day, and
+    their rows replaced in one short transaction that holds the batch's
+    rollup locks from before the read until commit, so messages saved
+    meanwhile are counted exactly once. Re-running is safe.
+    """
+    classifier = get_topic_classifier()
+    written = 0
+    last_id = 0
+
+    while True:
+        stmt = select(Child.id).where(Child.id > last_id).order_by(Child.id).limit(batch_size)
+        if child_ids is not None:
+            stmt = stmt.where(Child.id.in_(child_ids))
+        batch = list((await db.execute(stmt)).scalars())
+        if not batch:
+            break
+        last_id = batch[-1]
+        await lock_daily_stats(db, batch)
+
+        days: Dict[tuple, DayTotals] = defaultdict(DayTotals)
+        result = await db.stream(
+            select(
+                Conversation.child_id, Message.role, Message.content,
+                Message.depth_level, Message.source_type, Message.created_at
+            )
+            .join(Conversation, Message.conversation_id == Conversation.id)
+            .where(Conversation.child_id.in_(batch))
+            .execution_options(yield_per=2000)
+        )
+        async for child_id, role, content, depth_level, source_type, created_at in result:
+            topics = classifier.tag(content) if role == "child" else ()
+            days[(child_id, local_day(created_at))].add_message(role, depth_level, source_type, topics)
+
+        await db.execute(delete(ChildDailyStats).where(ChildDailyStats.child_id.in_(batch)))
+        db.add_all(
+            ChildDailyStats(
+                child_id=child_id,
+                day=day,
+                questions=totals.questions,
+                answers=totals.answers,
+                depth_sum=totals.depth_sum,
+                source_counts=dict(totals.source_counts),
+                topic_counts=dict(totals.topic_counts)
+            )
+            for (child_id, day), totals in days.items()
+        )
+        await db.commit()
+        written += len(days)
+
+    logger.info(f"✅ Rebuilt {written} daily stats rows")
+    return written
@@ -0,0 +1,132 @@
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Optional, Sequence
+
+from sqlalchemy import select
+
+from config import settings
+from database import AsyncSessionLocal
+from models import Child, Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = [
+    "conversation_id", "child_name", "child_grade", "message_role",
+    "message_content", "source_type", "timestamp", "topics"
+]
+EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+
+def export_query(child_ids: Sequence[int]):
+    """Plain columns, not ORM entities - nothing accumulates in the identity map"""
+    return (
+        select(
+            Conversation.id, Child.nickname, Child.first_name, Child.grade_level,
+            Message.role, Message.content, Message.source_type, Message.created_at, Conversation.topics
+        )
+        .join(Child, Conversation.child_id == Child.id)
+        .join(Message, Message.conversation_id == Conversation.id)
+        .where(Conversation.child_id.in_(child_ids))
+        .order_by(Conversation.created_at, Conversation.id, Message.created_at, Message.id)
+    )
+
+
+def export_record(row) -> dict:
+    conversation_id, nickname, first_name, grade, role, content, source_type, created_at, topics = row
+    return {
+        "conversation_id": conversation_id,
+        "child_name": nickname or first_name,
+        "child_grade": grade,
+        "message_role": role,
+        "message_content": content,
+        "source_type": source_type,
+        "timestamp": created_at.isoformat(),
+        "topics": topics
+    }
+
+
+class ExportEncoder:
+    """Turns batches of export records into text chunks for one format"""
+
+    def __init__(self, format: str):
+        self.format = format
+        self.count = 0
+        self._buffer = io.StringIO()
+        self._csv = csv.DictWriter(self._buffer, fieldnames=EXPORT_FIELDS)
+
+    def _drain(self) -> str:
+        chunk = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return chunk
+
+    def header(self) -> str:
+        if self.format == "csv":
+            self._csv.writeheader()
+            return self._drain()
+        if self.format == "json":
+            return f'{{"export_date": {json.dumps(datetime.utcnow().isoformat())}, "data": ['
+        return ""
+
+    def batch(self, records: Iterable[dict]) -> str:
+        for record in records:
+            if self.format == "csv":
+                self._csv.writerow(record)
+            elif self.format == "json":
+                self._buffer.write(("" if self.count == 0 else ", ") + json.dumps(record))
+            else:
+                self._buffer.write(json.dumps(record) + "\n")
+            self.count += 1
+        return self._drain()
+
+    def footer(self) -> str:
+        if self.format == "json":
+            return f'], "total_messages": {self.count}}}'
+        return ""
+
+
+async def stream_export(
+    child_ids: List[int],
+    format: str = "csv",
+    compress: bool = False,
+    batch_size: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    Yield the children's conversation history as encoded bytes
+
+    Rows come off a server-side cursor batch_size at a time (yield_per) and
+    each batch is encoded, optionally gzipped, and handed to the client
+    before the next is fetched, so memory does not grow with the history.
+    Uses its own session: the response body outlives the request handler.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    encoder = ExportEncoder(format)
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode()
+        return gzip.compress(data) if gzip else data
+
+    head = encode(encoder.header())
+    if head:
+        yield head
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(export_query(child_ids).execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            chunk = encode(encoder.batch(export_record(row) for row in rows))
+            if chunk:
+                yield chunk
+    tail = encode(encoder.footer())
+    if gzip:
+        tail += gzip.flush()
+    yield tail
+
+    logger.info(f"💾 Exported {encoder.count} messages as {format}{' (gzip)' if compress else ''}")
@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import random
+import re
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import anthropic
+import httpx
+from anthropic.types import (
+    Message, ServerToolUseBlock, TextBlock, Usage, WebSearchResultBlock, WebSearchToolResultBlock
+)
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Connection pool shared by every request on this worker
+HTTP_TIMEOUT_SECONDS = 60.0
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+
+class AnthropicBackend:
+    """Claude over the Anthropic API"""
+
+    name = "anthropic"
+
+    def __init__(self):
+        # Get API key
+        self.api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not self.api_key:
+            raise ValueError("ANTHROPIC_API_KEY not found in environment")
+
+        # Async client used by the API routes - one pooled httpx.AsyncClient
+        # so a slow Claude call never blocks the event loop.
+        # Retries are ours (jittered, deadline-bound) - the SDK's are off
+        self.async_http_client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=HTTP_LIMITS
+        )
+        self.async_client = anthropic.AsyncAnthropic(
+            api_key=self.api_key,
+            http_client=self.async_http_client,
+            max_retries=0
+        )
+
+    async def create(self, request: Dict) -> Message:
+        return await self.async_client.messages.create(**request)
+
+    def stream(self, request: Dict):
+        """Async context manager with .text_stream and .get_final_message()"""
+        return self.async_client.messages.stream(**request)
+
+    # -- Message Batches API (offline jobs) --------------------------------
+
+    async def create_batch(self, requests: List[Dict]) -> str:
+        """Submit [{"custom_id": ..., "params": <create() arguments>}]; returns the batch id"""
+        batch = await self.async_client.beta.messages.batches.create(requests=requests)
+        return batch.id
+
+    async def batch_status(self, batch_id: str) -> str:
+        """in_progress, canceling or ended - raises anthropic.NotFoundError once a batch is gone"""
+        batch = await self.async_client.beta.messages.batches.retrieve(batch_id)
+        return batch.processing_status
+
+    async def batch_results(self, batch_id: str) -> AsyncIterator[Tuple[str, Optional[Message]]]:
+        """(custom_id, message) per request; message is None if it errored, expired or was cancelled"""
+        async for entry in await self.async_client.beta.messages.batches.results(batch_id):
+            yield entry.custom_id, entry.result.message if entry.result.type == "succeeded" else None
+
+    async def aclose(self):
+        """Release pooled HTTP connections"""
+        await self.async_http_client.aclose()
+        self.client.close()
+
+
+FAKE_SENTENCES = [
+    "That's a wonderful question to be curious about! 🌟",
+    "Scientists and teachers have been exploring this for a long time.",
+    "Here is a simple way to think about it: imagine you are building with blocks. 🧱",
+    "Every big idea is made of smaller ideas that fit together.",
+    "You can see examples of this all around you, at home and at school! 🏡",
+    "The more questions you ask, the more you discover. 🔍",
+    "People all over the world use this idea every day.",
+    "Try noticing it the next time you are on the playground! 🛝"
+]
+DEPTH_RE = re.compile(r"RESPONSE DEPTH: Level (\d)")
+MATERIAL_RE = re.compile(r"<learning_materials>\n\[1\] ([^\n]+)")
+FAKE_API_URL = "https://fake.local/v1/messages"
+
+
+class FakeBackend:
+    """
+    Deterministic local stand-in for Claude, for load tests and CI
+
+    Answers are canned and depend only on the request content. Latency,
+    streaming rate and injected errors are drawn from a seeded RNG, so a
+    run with the same call order is reproducible.
+    """
+
+    name = "fake"
+
+    def __init__(self):
+        self.rng = random.Random(settings.FAKE_LLM_SEED)
+        self.calls = 0
+        self.batches: Dict[str, Tuple[float, List]] = {}
+
+    # -- response building -------------------------------------------------
+
+    @staticmethod
+    def _text(blocks) -> str:
+        if isinstance(blocks, str):
+            return blocks
+        return "".join(block.get("text", "") for block in blocks)
+
+    def _answer(self, request: Dict) -> Message:
+        system = self._text(request.get("system", ""))
+        question = self._text(request["messages"][-1]["content"])
+        digest = int(hashlib.sha256(question.encode("utf-8")).hexdigest(), 16)
+
+        depth_match = DEPTH_RE.search(system)
+        depth = int(depth_match.group(1)) if depth_match else 1
+        count = {1: 2, 2: 5, 3: 8}.get(depth, 2)
+        body = " ".join(FAKE_SENTENCES[(digest + i) % len(FAKE_SENTENCES)] for i in range(count))
+
+        material = MATERIAL_RE.search(question)
+        searched = bool(request.get("tools"))
+        if material:
+            prefix = f"📚 From my learning materials:\n\n{material.group(1)}: "
+        elif searched:
+            prefix = "🌐 From the web:\n\n"
+        else:
+            prefix = "ℹ️ From what I know:\n\n"
+
+        # Local import - context_service pulls in the ORM models
+        from services.context_service import estimate_tokens
+
+        text = prefix + body
+        output_tokens = min(estimate_tokens(text), request.get("max_tokens", 1500))
+        content: List = []
+        if searched and not material:
+            # Same block pair the API returns for the server-side web_search tool
+            tool_use_id = f"srvtoolu_fake_{digest % 10**8}"
+            content.append(ServerToolUseBlock(type="server_tool_use", id=tool_use_id, name="web_search", input={"query": question[-120:]}))
+            content.append(WebSearchToolResultBlock(
+                type="web_search_tool_result",
+                tool_use_id=tool_use_id,
+                content=[WebSearchResultBlock(
+                    type="web_search_result",
+                    title="Fake search result",
+                    url=f"https://example.com/search/{digest % 10**8}",
+                    encrypted_content=""
+                )]
+            ))
+        content.append(TextBlock(type="text", text=text))
+
+        return Message(
+            id=f"msg_fake_{digest % 10**12}",
+            type="message",
+            role="assistant",
+            model=request.get("model", "fake"),
+            content=content,
+            stop_reason="end_turn",
+            stop_sequence=None,
+            usage=Usage(
+                input_tokens=estimate_tokens(system) + sum(estimate_tokens(self._text(m["content"])) for m in request["messages"]),
+                output_tokens=output_tokens
+            )
+        )
+
+    # -- latency and errors ------------------------------------------------
+
+    def _latency(self) -> float:
+        median = settings.FAKE_LLM_LATENCY_MEDIAN_SECONDS
+        spread = settings.FAKE_LLM_LATENCY_SPREAD
+        distribution = settings.FAKE_LLM_LATENCY_DISTRIBUTION
+        if distribution == "fixed":
+            return median
+        if distribution == "uniform":
+            return self.rng.uniform(median * (1 - spread), median * (1 + spread))
+        return median * math.exp(self.rng.gauss(0, spread))  # lognormal
+
+    def _injected_error(self) -> Optional[Exception]:
+        """An upstream error to raise for this call, or None"""
+        roll = self.rng.random()
+        request = httpx.Request("POST", FAKE_API_URL)
+        if roll < settings.FAKE_LLM_ERROR_RATE:
+            return anthropic.InternalServerError(
+                "Overloaded (injected by fake backend)",
+                response=httpx.Response(529, request=request),
+                body=None
+            )
+        if roll < settings.FAKE_LLM_ERROR_RATE + settings.FAKE_LLM_TIMEOUT_RATE:
+            return anthropic.APITimeoutError(request=request)
+        return None
+
+    def _plan(self, request: Dict):
+        self.calls += 1
+        return self._latency(), self._injected_error(), self._answer(request)
+
+    # -- backend interface -------------------------------------------------
+
+    async def create(self, request: Dict) -> Message:
+        latency, error, message = self._plan(request)
+        await asyncio.sleep(latency)
+        if error is not None:
+            raise error
+        return message
+
+    def stream(self, request: Dict) -> "FakeStream":
+        return FakeStream(*self._plan(request))
+
+    async def create_batch(self, requests: List[Dict]) -> str:
+        # The whole batch ends after one latency draw; batches live in memory only
+        batch_id = f"msgbatch_fake_{len(self.batches) + 1}"
+        planned = [(request["custom_id"], self._plan(request["params"])) for request in requests]
+        self.batches[batch_id] = (time.monotonic() + self._latency(), planned)
+        return batch_id
+
+    async def batch_status(self, batch_id: str) -> str:
+        if batch_id not in self.batches:
+            raise anthropic.NotFoundError(
+                f"Batch {batch_id} not found (fake backend)",
+                response=httpx.Response(404, request=httpx.Request("GET", FAKE_API_URL)),
+                body=None
+            )
+        ends_at, _ = self.batches[batch_id]
+        return "ended" if time.monotonic() >= ends_at else "in_progress"
+
+    async def batch_results(self, batch_id: str) -> AsyncIterator[Tuple[str, Optional[Message]]]:
+        _, planned = self.batches[batch_id]
+        for custom_id, (_, error, message) in planned:
+            yield custom_id, message if error is None else None
+
+    async def aclose(self):
+        pass
+
+
+class FakeStream:
+    """messages.stream() look-alike: time to first token, then a steady token rate"""
+
+    def __init__(self, latency: float, error: Optional[Exception], message: Message):
+        self.latency = latency
+        self.error = error
+        self.message = message
+
+    async def __aenter__(self) -> "FakeStream":
+        await asyncio.sleep(self.latency)
+        if self.error is not None:
+            raise self.error
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    @property
+    async def text_stream(self) -> AsyncIterator[str]:
+        text = "".join(block.text for block in self.message.content if block.type == "text")
+        delay = 1.0 / settings.FAKE_LLM_TOKENS_PER_SECOND
+        # ~4 characters per token
+        for start in range(0, len(text), 4):
+            await asyncio.sleep(delay)
+            yield text[start:start + 4]
+
+    async def get_final_message(self) -> Message:
+        return self.message
+
+
+LLM_BACKENDS = {
+    "anthropic": AnthropicBackend,
+    "fake": FakeBackend
+}
+
+
+def create_llm_backend(name: Optional[str] = None):
+    """Build the backend named by LLM_BACKEND"""
+    name = name or settings.LLM_BACKEND
+    if name not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND '{name}' (expected one of {', '.join(LLM_BACKENDS)})")
+    if name != "anthropic":
+        logger.warning(f"⚠️ Using the '{name}' LLM backend - answers are canned, not from Claude")
+    return LLM_BACKENDS[name]()
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import anthropic
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Timeouts, throttling and upstream overload - worth another attempt
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class LLMUnavailableError(Exception):
+    """Claude could not answer in time - the breaker is open, the deadline passed or retries ran out"""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, anthropic.APIConnectionError)):
+        return True  # APITimeoutError is a subclass of APIConnectionError
+    if isinstance(exc, anthropic.APIStatusError):
+        return exc.status_code in RETRYABLE_STATUS
+    return False
+
+
+def backoff_delay(attempt: int, exc: Optional[BaseException] = None) -> float:
+    """Full-jitter exponential backoff, honouring Retry-After when Anthropic sends one"""
+    if isinstance(exc, anthropic.APIStatusError):
+        retry_after = exc.response.headers.get("retry-after")
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), settings.LLM_RETRY_MAX_SECONDS)
+        except ValueError:
+            pass
+    ceiling = min(settings.LLM_RETRY_MAX_SECONDS, settings.LLM_RETRY_BASE_SECONDS * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Trips when recent Claude calls keep failing or running slow
+
+    Opens after BREAKER_CONSECUTIVE_FAILURES failures in a row, or when at
+    least BREAKER_FAILURE_RATIO of the last BREAKER_WINDOW calls were
+    failures or slower than BREAKER_SLOW_CALL_SECONDS. After
+    BREAKER_COOLDOWN_SECONDS one probe call is let through (half-open);
+    its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self):
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.outcomes = deque(maxlen=settings.BREAKER_WINDOW)  # True = bad call
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        self.transitions = deque(maxlen=20)
+        self.counts = {"successes": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    def _transition(self, state: str, reason: str):
+        if state == self.state:
+            return
+        logger.warning(f"⚠️ Claude circuit breaker {self.state} -> {state} ({reason})")
+        self.transitions.append({"at": time.time(), "from": self.state, "to": state, "reason": reason})
+        self.state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.counts["opened"] += 1
+        elif state == CLOSED:
+            self.outcomes.clear()
+            self.consecutive_failures = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= settings.BREAKER_COOLDOWN_SECONDS:
+            self._transition(HALF_OPEN, "cooldown elapsed")
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.counts["rejected"] += 1
+        return False
+
+    def release_probe(self):
+        """A half-open probe ended without telling us anything (caller cancelled)"""
+        self.probe_in_flight = False
+
+    def record_success(self, seconds: float):
+        slow = seconds > settings.BREAKER_SLOW_CALL_SECONDS
+        self.counts["successes"] += 1
+        self.counts["slow_calls"] += slow
+        self.consecutive_failures = 0
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = False
+            if slow:
+                self._transition(OPEN, f"probe took {seconds:.1f}s")
+            else:
+                self._transition(CLOSED, "probe succeeded")
+            return
+        self.outcomes.append(slow)
+        self._check()
+
+    def record_failure(self, reason: str):
+        self.counts["failures"] += 1
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = False
+            self._transition(OPEN, f"probe failed: {reason}")
+            return
+        self.outcomes.append(True)
+        self._check(reason)
+
+    def _check(self, reason: str = "slow calls"):
+        if self.state != CLOSED:
+            return
+        if self.consecutive_failures >= settings.BREAKER_CONSECUTIVE_FAILURES:
+            self._transition(OPEN, f"{self.consecutive_failures} consecutive failures ({reason})")
+        elif (
+            len(self.outcomes) >= settings.BREAKER_MIN_CALLS
+            and sum(self.outcomes) / len(self.outcomes) >= settings.BREAKER_FAILURE_RATIO
+        ):
+            self._transition(OPEN, f"{sum(self.outcomes)}/{len(self.outcomes)} recent calls failed or slow")
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "recent_bad_calls": sum(self.outcomes),
+            "recent_calls": len(self.outcomes),
+            **self.counts,
+            "transitions": list(self.transitions)
+        }
+
+
+class ResilientCaller:
+    """Runs an upstream call under a deadline, with jittered retries and the breaker"""
+
+    def __init__(self, breaker: Optional[CircuitBreaker] = None):
+        self.breaker = breaker or get_circuit_breaker()
+        self.retries = 0
+        self.deadline_exceeded = 0
+
+    async def call(self, fn: Callable[[], Awaitable[T]], deadline_seconds: Optional[float] = None) -> T:
+        deadline = time.monotonic() + (deadline_seconds or settings.LLM_DEADLINE_SECONDS)
+        attempt = 0
+
+        while True:
+            if not self.breaker.allow():
+                raise LLMUnavailableError("circuit breaker open")
+
+            remaining = deadline - time.monotonic()
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(fn(), timeout=remaining)
+            except asyncio.CancelledError:
+                self.breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # Claude answered - our request was bad, upstream is healthy
+                    self.breaker.record_success(time.monotonic() - started)
+                    raise
+                self.breaker.record_failure(type(e).__name__)
+
+                delay = backoff_delay(attempt, e)
+                if attempt >= settings.LLM_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                    if isinstance(e, asyncio.TimeoutError):
+                        self.deadline_exceeded += 1
+                    raise LLMUnavailableError(f"Claude unavailable after {attempt + 1} attempt(s): {type(e).__name__}") from e
+
+                attempt += 1
+                self.retries += 1
+                logger.warning(f"⚠️ Claude call failed ({type(e).__name__}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success(time.monotonic() - started)
+            return result
+
+    async def enter(
+        self,
+        open_manager: Callable[[], AsyncContextManager],
+        deadline_seconds: Optional[float] = None
+    ) -> Tuple[AsyncContextManager, Any]:
+        """
+        Enter an async context manager (a stream) under call()'s deadline and retries
+
+        Returns (manager, value); the caller must __aexit__ the manager. A
+        manager whose __aenter__ fails or is cancelled part-way is exited here,
+        and so is one that finished entering just as wait_for gave up on it -
+        its result never reaches the caller, but its connection is open.
+        """
+        entered: List[AsyncContextManager] = []
+
+        async def attempt():
+            manager = open_manager()
+            try:
+                value = await manager.__aenter__()
+            except BaseException as e:
+                await self._exit(manager, e)
+                raise
+            entered.append(manager)
+            return manager, value
+
+        try:
+            manager, value = await self.call(attempt, deadline_seconds)
+        except BaseException:
+            for orphan in entered:
+                await self._exit(orphan)
+            raise
+        for orphan in entered:
+            if orphan is not manager:
+                await self._exit(orphan)
+        return manager, value
+
+    @staticmethod
+    async def _exit(manager: AsyncContextManager, exc: Optional[BaseException] = None):
+        try:
+            await manager.__aexit__(type(exc) if exc else None, exc, exc.__traceback__ if exc else None)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not close abandoned Claude stream: {e}")
+
+    def stats(self) -> Dict:
+        return {
+            **self.breaker.stats(),
+            "retries": self.retries,
+            "deadline_exceeded": self.deadline_exceeded
+        }
+
+
+# Global circuit breaker instance (one per worker)
+_circuit_breaker = None
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Get or create the global circuit breaker instance"""
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        _circuit_breaker = CircuitBreaker()
+    return _circuit_breaker
+
+
+# Global resilient caller instance
+_resilient_caller = None
+
+def get_resilient_caller() -> ResilientCaller:
+    """Get or create the global resilient caller instance"""
+    global _resilient_caller
+    if _resilient_caller is None:
+        _resilient_caller = ResilientCaller()
+    return _resilient_caller
@@ -0,0 +1,171 @@
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+FAST_TIER = "fast"
+STANDARD_TIER = "standard"
+
+# Output budget by depth and grade band - a 2-sentence K-1st answer does
+# not need the same 1500 tokens as a high-school deep dive
+TOKEN_BUDGETS = {
+    1: {"K-1st": 200, "2nd-3rd": 250, "4th-5th": 300, "6th-8th": 350, "9th-12th": 400},
+    2: {"K-1st": 450, "2nd-3rd": 550, "4th-5th": 650, "6th-8th": 750, "9th-12th": 850},
+    3: {"K-1st": 800, "2nd-3rd": 950, "4th-5th": 1100, "6th-8th": 1300, "9th-12th": 1500}
+}
+
+# Stricter filtering -> more conservative sampling
+FILTER_TEMPERATURES = {"strict": 0.5, "moderate": 0.6, "relaxed": 0.7}
+
+
+@dataclass(frozen=True)
+class ModelChoice:
+    tier: str
+    model: str        # Anthropic API model id
+    label: str        # stored in Message.model_used
+    max_tokens: int
+    temperature: float
+
+
+@dataclass
+class LoadSnapshot:
+    in_flight: int
+    p95_seconds: Dict[str, float]
+
+
+def tier_model(tier: str) -> Dict[str, str]:
+    if tier == FAST_TIER:
+        return {"model": settings.MODEL_FAST, "label": settings.MODEL_FAST_LABEL}
+    return {"model": settings.MODEL_STANDARD, "label": settings.MODEL_STANDARD_LABEL}
+
+
+class FixedPolicy:
+    """Every request on the standard model with the original 1500-token budget"""
+
+    def choose(self, grade_band: str, depth_level: int, filter_level: str, load: LoadSnapshot) -> ModelChoice:
+        return ModelChoice(tier=STANDARD_TIER, max_tokens=1500, temperature=0.7, **tier_model(STANDARD_TIER))
+
+
+class TieredPolicy:
+    """
+    Depth-1 answers and young children's depth-2 answers go to the fast tier;
+    everything else to the standard tier. When the standard tier's p95 is
+    over MODEL_LATENCY_TARGET_P95_SECONDS, depth 1-2 shifts to the fast tier,
+    and past twice the target all traffic does.
+    """
+
+    def choose(self, grade_band: str, depth_level: int, filter_level: str, load: LoadSnapshot) -> ModelChoice:
+        depth = depth_level if depth_level in TOKEN_BUDGETS else 1
+
+        tier = STANDARD_TIER
+        if depth == 1 or (depth == 2 and grade_band in ("K-1st", "2nd-3rd")):
+            tier = FAST_TIER
+
+        target = settings.MODEL_LATENCY_TARGET_P95_SECONDS
+        standard_p95 = load.p95_seconds.get(STANDARD_TIER, 0.0)
+        if target and standard_p95 > target and (depth < 3 or standard_p95 > 2 * target):
+            tier = FAST_TIER
+
+        return ModelChoice(
+            tier=tier,
+            max_tokens=TOKEN_BUDGETS[depth].get(grade_band, TOKEN_BUDGETS[depth]["4th-5th"]),
+            temperature=FILTER_TEMPERATURES.get(filter_level, FILTER_TEMPERATURES["strict"]),
+            **tier_model(tier)
+        )
+
+
+ROUTING_POLICIES = {
+    "fixed": FixedPolicy,
+    "tiered": TieredPolicy
+}
+
+
+class LatencyWindow:
+    """
+    Rolling window of recent call latencies with a cached p95. Samples age
+    out after max_age seconds, so a tier that traffic was shifted away
+    from recovers instead of keeping its last bad p95 forever.
+    """
+
+    def __init__(self, size: int = 200, max_age: float = 300.0):
+        self.samples = deque(maxlen=size)  # (monotonic time, seconds)
+        self.max_age = max_age
+        self._p95 = 0.0
+        self._dirty = 0
+
+    def record(self, seconds: float):
+        self.samples.append((time.monotonic(), seconds))
+        self._dirty += 1
+
+    def p95(self) -> float:
+        cutoff = time.monotonic() - self.max_age
+        while self.samples and self.samples[0][0] < cutoff:
+            self.samples.popleft()
+            self._dirty += 1
+
+        # Re-sort at most every 10 samples; the hot path just reads the float
+        if self._dirty >= 10 or (self._dirty and len(self.samples) < 10):
+            ordered = sorted(seconds for _, seconds in self.samples)
+            self._p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)] if ordered else 0.0
+            self._dirty = 0
+        return self._p95
+
+
+class ModelRouter:
+    """Picks a model and token budget per request and tracks per-tier latency"""
+
+    def __init__(self, policy_name: Optional[str] = None):
+        policy_name = policy_name or settings.MODEL_ROUTING_POLICY
+        if policy_name not in ROUTING_POLICIES:
+            raise ValueError(f"Unknown MODEL_ROUTING_POLICY '{policy_name}' (expected one of {', '.join(ROUTING_POLICIES)})")
+        self.policy_name = policy_name
+        self.policy = ROUTING_POLICIES[policy_name]()
+        self.latency = {
+            FAST_TIER: LatencyWindow(max_age=settings.MODEL_LATENCY_WINDOW_SECONDS),
+            STANDARD_TIER: LatencyWindow(max_age=settings.MODEL_LATENCY_WINDOW_SECONDS)
+        }
+        self.in_flight = 0
+        self.choices = {FAST_TIER: 0, STANDARD_TIER: 0}
+
+    def load(self) -> LoadSnapshot:
+        return LoadSnapshot(
+            in_flight=self.in_flight,
+            p95_seconds={tier: window.p95() for tier, window in self.latency.items()}
+        )
+
+    def choose(self, grade_band: str, depth_level: int, filter_level: str = "strict") -> ModelChoice:
+        choice = self.policy.choose(grade_band, depth_level, filter_level, self.load())
+        self.choices[choice.tier] += 1
+        return choice
+
+    def started(self):
+        self.in_flight += 1
+
+    def finished(self, choice: ModelChoice, seconds: float):
+        self.in_flight -= 1
+        self.latency[choice.tier].record(seconds)
+
+    def stats(self) -> Dict:
+        return {
+            "policy": self.policy_name,
+            "in_flight": self.in_flight,
+            "choices": dict(self.choices),
+            "p95_seconds": {tier: round(window.p95(), 3) for tier, window in self.latency.items()},
+            "latency_target_p95_seconds": settings.MODEL_LATENCY_TARGET_P95_SECONDS
+        }
+
+
+# Global model router instance
+_model_router = None
+
+def get_model_router() -> ModelRouter:
+    """Get or create the global model router instance"""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter()
+    return _model_router
@@ -0,0 +1,153 @@
+import re
+from functools import lru_cache
+from typing import List, Dict, Optional
+
+DEFAULT_GRADE_BAND = "4th-5th"
+
+# Base guidelines by grade band
+GRADE_GUIDES = {
+    "K-1st": "Use very simple words (1-2 syllables). Short sentences (5-7 words). Lots of examples from daily life. Use emojis to make it fun! 🌟",
+    "2nd-3rd": "Use simple, clear language. Short paragraphs. Relate to things kids know (playground, pets, family). Be friendly and encouraging! 🎈",
+    "4th-5th": "Use clear explanations. Can include some bigger words but explain them. Give interesting examples. Make learning exciting! 🚀",
+    "6th-8th": "Use more advanced vocabulary. Include deeper concepts. Make connections between ideas. Encourage curiosity! 🔬",
+    "9th-12th": "Use sophisticated vocabulary. Explore complex ideas. Encourage critical thinking and analysis. 📚"
+}
+
+# Depth-based adjustments
+DEPTH_GUIDES = {
+    1: "Give a brief, clear answer (2-3 sentences). Be friendly and encouraging.",
+    2: "Provide more detail (4-6 sentences). Include examples and interesting facts. Use emojis to keep it fun!",
+    3: "Give comprehensive explanation (6-8 sentences). Connect concepts. Include real-world applications. Be thorough but engaging!"
+}
+
+# Child.grade_level values ("Pre-K", "K", "1st" ... "12th", see routers/children.py)
+# plus the free-form strings clients send ("2nd grade", "Kindergarten")
+GRADE_NUMBER_BANDS = {
+    0: "K-1st", 1: "K-1st",
+    2: "2nd-3rd", 3: "2nd-3rd",
+    4: "4th-5th", 5: "4th-5th",
+    6: "6th-8th", 7: "6th-8th", 8: "6th-8th",
+    9: "9th-12th", 10: "9th-12th", 11: "9th-12th", 12: "9th-12th"
+}
+
+GRADE_BAND_ALIASES = {
+    "pre-k": "K-1st",
+    "prek": "K-1st",
+    "pre k": "K-1st",
+    "preschool": "K-1st",
+    "k": "K-1st",
+    "kindergarten": "K-1st",
+    "middle school": "6th-8th",
+    "high school": "9th-12th",
+}
+GRADE_BAND_ALIASES.update({band.lower(): band for band in GRADE_GUIDES})
+
+GRADE_NUMBER_RE = re.compile(r"\d+")
+
+
+@lru_cache(maxsize=256)
+def normalize_grade_band(grade_level: Optional[str]) -> str:
+    """Map a grade label ("K", "3rd", "2nd grade", "4th-5th") onto a prompt band"""
+    if not grade_level:
+        return DEFAULT_GRADE_BAND
+
+    label = grade_level.strip().lower()
+    label = re.sub(r"\s*grade\s*$", "", label).strip()
+
+    if label in GRADE_BAND_ALIASES:
+        return GRADE_BAND_ALIASES[label]
+
+    # "3rd", "10th", "grade 7" - a range like "3-5" uses its lower bound
+    number = GRADE_NUMBER_RE.search(label)
+    if number:
+        return GRADE_NUMBER_BANDS.get(min(int(number.group()), 12), DEFAULT_GRADE_BAND)
+
+    return DEFAULT_GRADE_BAND
+
+
+STATIC_PROMPT = """You are Nia, a warm, intelligent, and friendly AI learning assistant for children. You help kids learn about anything they're curious about!
+
+COMMUNICATION GUIDELINES:
+- Follow the grade level and response depth given below
+- Always be encouraging and build confidence
+- Use "you" and "your" to make it personal
+- Celebrate their curiosity!
+
+🔍 WEB SEARCH USAGE:
+- For current events, weather, travel info, recent facts: USE WEB SEARCH
+- For timeless educational topics (math, science concepts, history): USE YOUR KNOWLEDGE
+- For homework help with current information: USE WEB SEARCH
+- Always verify information is age-appropriate before sharing
+
+⚠️ CHILD SAFETY (CRITICAL):
+- NEVER share personal contact information
+- NEVER suggest meeting people in person
+- Keep all content educational and appropriate
+- If a question seems inappropriate, gently redirect to learning
+- Focus on educational value
+
+📚 LEARNING MATERIALS:
+- Some questions come with <learning_materials> from Nia's curriculum
+- When they answer the question, base your answer on them
+- Ignore them if they are not about what the child asked
+
+📝 SOURCE TRANSPARENCY:
+- If using the learning materials, start with: "📚 From my learning materials:"
+- If using web search, start with: "🌐 From the web:"
+- If using your knowledge, start with: "ℹ️ From what I know:"
+- Be clear about where information comes from
+
+ANSWER QUALITY:
+- Be factually accurate
+- Use age-appropriate vocabulary
+- Include examples kids can relate to
+- Make learning FUN and engaging!
+- End with an encouraging note or curiosity question when appropriate
+
+Remember: You're here to make learning exciting and accessible for every child! 🌟"""
+
+# Identical for every request, so it is marked for Anthropic prompt caching.
+# Claude caches the tools + system prefix up to this block.
+STATIC_BLOCK = {
+    "type": "text",
+    "text": STATIC_PROMPT,
+    "cache_control": {"type": "ephemeral"}
+}
+
+
+def _band_block(band: str, depth_level: int) -> Dict:
+    return {
+        "type": "text",
+        "text": (
+            f"GRADE LEVEL: {band}\n"
+            f"RESPONSE DEPTH: Level {depth_level}\n\n"
+            f"FOR THIS CHILD:\n"
+            f"- {GRADE_GUIDES[band]}\n"
+            f"- {DEPTH_GUIDES[depth_level]}"
+        )
+    }
+
+
+# Every grade band x depth combination, built once at import
+PROMPT_TABLE = {
+    (band, depth): [STATIC_BLOCK, _band_block(band, depth)]
+    for band in GRADE_GUIDES
+    for depth in DEPTH_GUIDES
+}
+
+
+@lru_cache(maxsize=32)
+def _age_block(child_age: int) -> Dict:
+    return {
+        "type": "text",
+        "text": f"CHILD'S AGE: {child_age} years old - Keep this in mind for vocabulary and examples."
+    }
+
+
+def get_system_prompt(grade_level: str, depth_level: int, child_age: Optional[int] = None) -> List[Dict]:
+    """System prompt blocks for a request - a table lookup, no string building"""
+    band = normalize_grade_band(grade_level)
+    blocks = PROMPT_TABLE[(band, depth_level if depth_level in DEPTH_GUIDES else 1)]
+    if child_age:
+        return blocks + [_age_block(child_age)]
+    return blocks
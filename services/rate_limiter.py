@@ -0,0 +1,227 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config import settings
+from services.answer_cache import get_answer_cache
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "nia:rl:"
+MAX_LOCAL_BUCKETS = 100_000
+
+# USD per million input/output tokens, keyed by Message.model_used label
+MODEL_PRICES_PER_MTOK = {
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-3-5-haiku": (0.8, 4.0)
+}
+
+# Atomic refill-and-take on a Redis hash; returns seconds until a token is free
+TOKEN_BUCKET_SCRIPT = """
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("PEXPIRE", KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+
+@dataclass
+class LimitDecision:
+    allowed: bool
+    retry_after: float = 0.0
+    reason: str = ""
+
+
+def estimate_cost(model_used: str, usage: Optional[Dict]) -> float:
+    """Claude spend in USD for one response; local answers cost nothing"""
+    if not usage or model_used not in MODEL_PRICES_PER_MTOK:
+        return 0.0
+    input_price, output_price = MODEL_PRICES_PER_MTOK[model_used]
+    return (usage.get("input_tokens", 0) * input_price + usage.get("output_tokens", 0) * output_price) / 1_000_000
+
+
+def quota_day() -> Tuple[str, float]:
+    """Today's date in DEFAULT_TIMEZONE and seconds until it rolls over"""
+    now = datetime.now(ZoneInfo(settings.DEFAULT_TIMEZONE))
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return now.date().isoformat(), (midnight - now).total_seconds()
+
+
+class RateLimiter:
+    """
+    Token buckets per child and per parent, plus daily token/spend quotas
+
+    Every decision is an O(1) dict update in this worker, or a single
+    Redis round trip when REDIS_URL is set so limits hold across nodes.
+    If Redis fails the in-process state is used instead.
+    """
+
+    def __init__(self):
+        self.redis = get_answer_cache().redis
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._usage: Dict[str, Tuple[int, float]] = {}
+        self._usage_day = ""
+        self.limited = {"child": 0, "parent": 0, "quota": 0}
+
+    def _take_local(self, key: str, rate: float, capacity: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > MAX_LOCAL_BUCKETS:
+            self._buckets.popitem(last=False)  # least recently used
+        return retry_after
+
+    async def _take(self, key: str, per_minute: float, burst: int) -> float:
+        rate = per_minute / 60.0
+        if self.redis is not None:
+            try:
+                return float(await self.redis.eval(TOKEN_BUCKET_SCRIPT, 1, KEY_PREFIX + key, rate, burst))
+            except Exception as e:
+                logger.warning(f"⚠️ Rate limiter Redis error, using in-process buckets: {e}")
+        return self._take_local(key, rate, burst)
+
+    async def acquire_child(self, child_id: int) -> LimitDecision:
+        if not settings.RATE_LIMIT_ENABLED:
+            return LimitDecision(True)
+        retry_after = await self._take(f"child:{child_id}", settings.RATE_LIMIT_CHILD_PER_MINUTE, settings.RATE_LIMIT_CHILD_BURST)
+        if retry_after:
+            self.limited["child"] += 1
+            return LimitDecision(False, retry_after, "child")
+        return LimitDecision(True)
+
+    async def acquire_parent(self, parent_id: int) -> LimitDecision:
+        if not settings.RATE_LIMIT_ENABLED:
+            return LimitDecision(True)
+        retry_after = await self._take(f"parent:{parent_id}", settings.RATE_LIMIT_PARENT_PER_MINUTE, settings.RATE_LIMIT_PARENT_BURST)
+        if retry_after:
+            self.limited["parent"] += 1
+            return LimitDecision(False, retry_after, "parent")
+        return LimitDecision(True)
+
+    def _local_usage(self, day: str) -> Dict[str, Tuple[int, float]]:
+        if self._usage_day != day:
+            self._usage, self._usage_day = {}, day
+        return self._usage
+
+    async def _get_usage(self, day: str, scope: str) -> Tuple[int, float]:
+        if self.redis is not None:
+            try:
+                tokens, spend = await self.redis.hmget(f"{KEY_PREFIX}quota:{day}:{scope}", "tokens", "spend")
+                return int(tokens or 0), float(spend or 0.0)
+            except Exception as e:
+                logger.warning(f"⚠️ Rate limiter Redis error, using in-process quotas: {e}")
+        return self._local_usage(day).get(scope, (0, 0.0))
+
+    async def _bucket_tokens(self, key: str, per_minute: float, burst: int) -> float:
+        """Tokens left in a bucket right now, without taking one"""
+        rate = per_minute / 60.0
+        if self.redis is not None:
+            try:
+                tokens, ts = await self.redis.hmget(KEY_PREFIX + key, "tokens", "ts")
+                if tokens is None:
+                    return float(burst)
+                return min(burst, float(tokens) + max(0.0, time.time() - float(ts)) * rate)
+            except Exception as e:
+                logger.warning(f"⚠️ Rate limiter Redis error, using in-process buckets: {e}")
+        tokens, updated = self._buckets.get(key, (burst, time.monotonic()))
+        return min(burst, tokens + (time.monotonic() - updated) * rate)
+
+    async def _over_quota(self, child_id: int, parent_id: int) -> Optional[str]:
+        day, _ = quota_day()
+        child_tokens, _ = await self._get_usage(day, f"child:{child_id}")
+        if settings.QUOTA_CHILD_DAILY_TOKENS and child_tokens >= settings.QUOTA_CHILD_DAILY_TOKENS:
+            return "child_quota"
+        _, parent_spend = await self._get_usage(day, f"parent:{parent_id}")
+        if settings.QUOTA_PARENT_DAILY_SPEND_USD and parent_spend >= settings.QUOTA_PARENT_DAILY_SPEND_USD:
+            return "parent_quota"
+        return None
+
+    async def check_quota(self, child_id: int, parent_id: int) -> LimitDecision:
+        """Whether today's Claude usage still has room for another question"""
+        if not settings.RATE_LIMIT_ENABLED:
+            return LimitDecision(True)
+        reason = await self._over_quota(child_id, parent_id)
+        if reason is not None:
+            self.limited["quota"] += 1
+            return LimitDecision(False, quota_day()[1], reason)
+        return LimitDecision(True)
+
+    async def has_headroom(self, child_id: int, parent_id: int) -> bool:
+        """
+        Whether the child's next question would get through - both buckets
+        have a token and neither quota is used up. Takes nothing and counts
+        nothing, for background work done on the child's behalf.
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return True
+        if await self._bucket_tokens(f"child:{child_id}", settings.RATE_LIMIT_CHILD_PER_MINUTE, settings.RATE_LIMIT_CHILD_BURST) < 1:
+            return False
+        if await self._bucket_tokens(f"parent:{parent_id}", settings.RATE_LIMIT_PARENT_PER_MINUTE, settings.RATE_LIMIT_PARENT_BURST) < 1:
+            return False
+        return await self._over_quota(child_id, parent_id) is None
+
+    async def record_usage(self, child_id: int, parent_id: int, result: Dict):
+        """Add a response's Claude tokens and spend to today's quotas"""
+        usage = result.get("usage")
+        if not usage:
+            return  # curated, cached or degraded answer - no Claude call
+        tokens = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        spend = estimate_cost(result.get("model_used", ""), usage)
+        day, _ = quota_day()
+
+        for scope in (f"child:{child_id}", f"parent:{parent_id}"):
+            if self.redis is not None:
+                try:
+                    key = f"{KEY_PREFIX}quota:{day}:{scope}"
+                    async with self.redis.pipeline(transaction=False) as pipe:
+                        pipe.hincrby(key, "tokens", tokens)
+                        pipe.hincrbyfloat(key, "spend", spend)
+                        pipe.expire(key, 2 * 24 * 3600)
+                        await pipe.execute()
+                    continue
+                except Exception as e:
+                    logger.warning(f"⚠️ Rate limiter Redis error, using in-process quotas: {e}")
+            usage_today = self._local_usage(day)
+            current_tokens, current_spend = usage_today.get(scope, (0, 0.0))
+            usage_today[scope] = (current_tokens + tokens, current_spend + spend)
+
+    def stats(self) -> Dict:
+        return {
+            "limited": dict(self.limited),
+            "local_buckets": len(self._buckets),
+            "backend": "redis" if self.redis is not None else "in-process"
+        }
+
+
+# Global rate limiter instance
+_rate_limiter = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the global rate limiter instance"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
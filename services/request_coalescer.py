@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from config import settings
+from services.answer_cache import AnswerCache, get_answer_cache
+
+logger = logging.getLogger(__name__)
+
+LEASE_PREFIX = "nia:flight:"
+
+# Delete the lease only if we still own it
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class AbandonedFlight(Exception):
+    """A streaming leader stopped before its answer was complete"""
+
+
+class RequestCoalescer:
+    """
+    Single-flight for identical LLM requests
+
+    Within a worker, concurrent callers with the same key await one shared
+    asyncio task. Across workers, the first caller takes a Redis lease
+    (SET NX PX) and runs the upstream call; the others poll the answer
+    cache until the leader's result lands there, or take over if the lease
+    is released without one. Without Redis only the in-process tier applies.
+
+    Streaming callers produce the answer themselves, so they register with
+    lead() instead of run(): later arrivals wait on the returned future,
+    and if the stream is abandoned they answer the question themselves.
+    Streams lead only within their worker; other workers still find the
+    finished answer in the cache.
+    """
+
+    def __init__(self, cache: Optional[AnswerCache] = None):
+        self.cache = cache or get_answer_cache()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.leader_calls = 0
+        self.coalesced = 0
+        self.remote_coalesced = 0
+        self.lease_timeouts = 0
+
+    def in_flight(self, key: str) -> Optional[asyncio.Future]:
+        """The pending call for a key in this worker, if any"""
+        task = self._in_flight.get(key)
+        return task if task is not None and not task.done() else None
+
+    def lead(self, key: str) -> Optional[asyncio.Future]:
+        """
+        Register a streaming caller as the key's leader
+
+        Returns None if a call is already in flight - join() it instead.
+        Otherwise the caller must settle the returned future: set_result()
+        with the finished answer, or set_exception(AbandonedFlight()) if
+        it stops early.
+        """
+        if self.in_flight(key) is not None:
+            return None
+        flight = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = flight
+        flight.add_done_callback(lambda done: self._finish(key, done))
+        self.leader_calls += 1
+        return flight
+
+    async def join(self, key: str) -> Optional[Dict]:
+        """Wait for a call already in flight in this worker; None if its leader gave up"""
+        self.coalesced += 1
+        try:
+            return self._shared(await asyncio.shield(self._in_flight[key]))
+        except AbandonedFlight:
+            return None
+
+    async def run(self, key: str, loader: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Return loader()'s result, running it at most once per key at a time
+
+        Only the caller that started the call gets its "usage"; the others
+        get the answer without it, so one Claude call is charged to one
+        child's quota, not to every child that was waiting on it.
+        """
+        while True:
+            task = self.in_flight(key)
+            if task is None:
+                # Runs as its own task so one caller disconnecting doesn't
+                # cancel the answer every other waiter is counting on
+                task = asyncio.create_task(self._run_across_workers(key, loader))
+                self._in_flight[key] = task
+                task.add_done_callback(lambda done: self._finish(key, done))
+                return dict(await asyncio.shield(task))
+
+            self.coalesced += 1
+            try:
+                return self._shared(await asyncio.shield(task))
+            except AbandonedFlight:
+                continue  # the stream leading it went away - take over
+
+    @staticmethod
+    def _shared(result: Dict) -> Dict:
+        """A waiter's copy of a result - without the leader's billed usage"""
+        shared = dict(result)
+        shared.pop("usage", None)
+        return shared
+
+    def _finish(self, key: str, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    async def _run_across_workers(self, key: str, loader: Callable[[], Awaitable[Dict]]) -> Dict:
+        redis = self.cache.redis
+        if redis is None:
+            self.leader_calls += 1
+            return await loader()
+
+        lease_key = LEASE_PREFIX + key
+        lease_ms = int(settings.SINGLE_FLIGHT_LEASE_SECONDS * 1000)
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_LEASE_SECONDS
+        token = uuid.uuid4().hex
+
+        while True:
+            try:
+                acquired = await redis.set(lease_key, token, nx=True, px=lease_ms)
+            except Exception as e:
+                logger.warning(f"⚠️ Single-flight lease unavailable, calling upstream directly: {e}")
+                self.leader_calls += 1
+                return await loader()
+
+            if acquired:
+                self.leader_calls += 1
+                try:
+                    return await loader()
+                finally:
+                    try:
+                        await redis.eval(RELEASE_SCRIPT, 1, lease_key, token)
+                    except Exception as e:
+                        logger.warning(f"⚠️ Could not release single-flight lease: {e}")
+
+            # Another worker is answering - wait for its result to be cached
+            while time.monotonic() < deadline:
+                await asyncio.sleep(settings.SINGLE_FLIGHT_POLL_SECONDS)
+                result = await self.cache.peek(key)
+                if result is not None:
+                    self.remote_coalesced += 1
+                    return result
+                try:
+                    if not await redis.exists(lease_key):
+                        break  # leader gave up without a result - try to take over
+                except Exception:
+                    break
+
+            if time.monotonic() >= deadline:
+                self.lease_timeouts += 1
+                self.leader_calls += 1
+                return await loader()
+
+    def stats(self) -> Dict:
+        return {
+            "leader_calls": self.leader_calls,
+            "coalesced": self.coalesced,
+            "remote_coalesced": self.remote_coalesced,
+            "lease_timeouts": self.lease_timeouts,
+            "in_flight": len(self._in_flight)
+        }
+
+
+# Global coalescer instance
+_request_coalescer = None
+
+def get_request_coalescer() -> RequestCoalescer:
+    """Get or create the global request coalescer instance"""
+    global _request_coalescer
+    if _request_coalescer is None:
+        _request_coalescer = RequestCoalescer()
+    return _request_coalescer
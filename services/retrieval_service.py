@@ -0,0 +1,233 @@
+import heapq
+import logging
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+SUBHEADING_RE = re.compile(r"^\*\*([^*]+?):?\*\*:?\s*$")
+METADATA_RE = re.compile(r"^\*\*(Grade Level|Topics|Source):\*\*\s*(.*)$")
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does did for from had has have how i if in
+into is it its me my of on or our so than that the their them then there these
+they this to was we were what when where which who why will with you your tell
+about please know explain work
+""".split())
+
+# Words ending in "s" that are not plurals: "3 times 4" is not about time
+UNFOLDED = frozenset("times news species series always perhaps".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed and plurals folded"""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")) and token not in UNFOLDED:
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@dataclass
+class ContentChunk:
+    """One section of a curriculum file"""
+    chunk_id: str
+    source_file: str
+    subject: str
+    title: str
+    section: str
+    heading: str
+    text: str
+    grade_range: str = ""
+    topics: List[str] = field(default_factory=list)
+
+    def citation(self, score: float) -> Dict:
+        """Source citation in the shape stored on Message.sources"""
+        return {
+            "type": "curated_content",
+            "title": f"{self.title} - {self.heading}",
+            "file": self.source_file,
+            "chunk_id": self.chunk_id,
+            "grade_range": self.grade_range,
+            "score": round(score, 3)
+        }
+
+
+@dataclass
+class SearchHit:
+    chunk: ContentChunk
+    score: float
+
+
+def load_content_chunks(content_dir: str) -> List[ContentChunk]:
+    """
+    Split every content/*.md file into chunks
+
+    Files are split on "##" headings and, within a section, on the standalone
+    bold subheadings ("**Key Facts:**") the curriculum uses, so a chunk is one
+    teachable piece rather than a whole 200-line lesson.
+    """
+    chunks = []
+
+    for filename in sorted(os.listdir(content_dir)):
+        if not filename.endswith(".md"):
+            continue
+
+        with open(os.path.join(content_dir, filename), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+
+        stem = filename[:-3]
+        subject = stem.split("_", 1)[0]
+        title = stem
+        section = ""
+        heading = ""
+        metadata = {}
+        pieces: List[Tuple[str, str, List[str]]] = []
+        body: List[str] = []
+
+        def flush():
+            if any(line.strip() for line in body):
+                pieces.append((section, heading or section, list(body)))
+            body.clear()
+
+        for line in lines:
+            meta = METADATA_RE.match(line)
+            if meta:
+                metadata[meta.group(1)] = meta.group(2).strip()
+                continue
+            if line.startswith("# "):
+                title = line[2:].strip()
+            elif line.startswith("## "):
+                flush()
+                section = line[3:].strip()
+                heading = ""
+            elif SUBHEADING_RE.match(line):
+                flush()
+                heading = SUBHEADING_RE.match(line).group(1).strip()
+            else:
+                body.append(line)
+        flush()
+
+        topics = [t.strip() for t in metadata.get("Topics", "").split(",") if t.strip()]
+        grade_range = metadata.get("Grade Level", "").replace(" grade", "")
+
+        for i, (piece_section, piece_heading, piece_body) in enumerate(pieces):
+            chunks.append(ContentChunk(
+                chunk_id=f"{stem}#{i}",
+                source_file=filename,
+                subject=subject,
+                title=title,
+                section=piece_section,
+                heading=piece_heading,
+                text="\n".join(piece_body).strip(),
+                grade_range=grade_range,
+                topics=topics
+            ))
+
+    return chunks
+
+
+def index_tokens(chunk: ContentChunk) -> List[str]:
+    """Tokens indexed for a chunk - headings and topic tags weigh above body text"""
+    heading_text = f"{chunk.title} {chunk.section} {chunk.heading}"
+    return (
+        tokenize(chunk.text)
+        + tokenize(heading_text) * 2
+        + tokenize(" ".join(chunk.topics))
+    )
+
+
+class BM25Index:
+    """
+    Inverted BM25 index over content chunks
+
+    Per-posting BM25 weights are computed once at build time, so a lookup is
+    just a sum over the query terms' posting lists plus a top-k heap.
+    """
+
+    def __init__(self, chunks: List[ContentChunk], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+
+        doc_terms = [Counter(index_tokens(chunk)) for chunk in chunks]
+        lengths = [sum(terms.values()) for terms in doc_terms]
+        avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+        document_frequency = defaultdict(int)
+        for terms in doc_terms:
+            for term in terms:
+                document_frequency[term] += 1
+
+        n_docs = len(chunks)
+        for doc_id, terms in enumerate(doc_terms):
+            norm = k1 * (1 - b + b * lengths[doc_id] / avg_length) if avg_length else k1
+            for term, tf in terms.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                weight = idf * tf * (k1 + 1) / (tf + norm)
+                self.postings.setdefault(term, []).append((doc_id, weight))
+
+    def search(self, query: str, top_k: int = 3) -> List[SearchHit]:
+        """Return the top_k chunks by BM25 score"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            for doc_id, weight in self.postings.get(term, ()):
+                scores[doc_id] += weight
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [SearchHit(self.chunks[doc_id], score) for doc_id, score in best]
+
+
+class RetrievalService:
+    def __init__(self, content_dir: Optional[str] = None):
+        """Load the curriculum and build the keyword index"""
+        self.content_dir = content_dir or settings.CONTENT_DIR
+        self.chunks = load_content_chunks(self.content_dir)
+        self.index = BM25Index(self.chunks)
+
+        logger.info(f"✅ Retrieval index built: {len(self.chunks)} chunks, {len(self.index.postings)} terms")
+
+        # Local import - vector_index builds on the chunk types defined here
+        from services.vector_index import VectorIndex
+        self.vectors = VectorIndex.load_or_build(
+            self.chunks,
+            self.content_dir,
+            settings.VECTOR_INDEX_PATH,
+            settings.VECTOR_DIM
+        )
+
+    def search(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None
+    ) -> List[SearchHit]:
+        """Top curriculum chunks for a question, dropping weak matches"""
+        top_k = top_k or settings.RETRIEVAL_TOP_K
+        min_score = settings.RETRIEVAL_MIN_SCORE if min_score is None else min_score
+        return [hit for hit in self.index.search(query, top_k) if hit.score >= min_score]
+
+    def similar(self, queries: List[str], top_k: Optional[int] = None) -> List[List[SearchHit]]:
+        """Cosine-similarity hits for a batch of questions (one matrix multiply)"""
+        return self.vectors.search_batch(queries, top_k or settings.RETRIEVAL_TOP_K)
+
+
+# Global retrieval service instance
+_retrieval_service = None
+
+def get_retrieval_service() -> RetrievalService:
+    """Get or create the global retrieval service instance"""
+    global _retrieval_service
+    if _retrieval_service is None:
+        _retrieval_service = RetrievalService()
+    return _retrieval_service
@@ -0,0 +1,270 @@
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SAFETY_MODEL_LABEL = "nia-safety"
+SAFETY_FLAG_ACTION = "SAFETY_FLAG"  # AuditLog.action for screened exchanges
+FILTER_LEVELS = ("strict", "moderate", "relaxed")
+ALL_LEVELS = FILTER_LEVELS
+STRICT_MODERATE = ("strict", "moderate")
+STRICT_ONLY = ("strict",)
+
+# Every pattern is anchored at a word start by compile_levels. Terms with an
+# everyday meaning ("naked eye", "weed the garden", "what sex is a bee")
+# only count inside a phrase; benchmarks/safety_lexicon.py keeps examples
+# of both sides.
+PHONE = r"\d{3}\)?[-.\s]\d{3}[-.\s]\d{4}\b(?!\s*(?:[-+*/×÷=]|x\b|plus\b|minus\b|times\b|divided\b|multiplied\b))"
+EMAIL = r"[\w.+-]+@[\w-]+\.[\w.]+\b"
+PROFANITY = r"(?:fuck\w*|shit\w*|bitch\w*|asshole\w*|bastard\w*|dickhead\w*|motherfuck\w*|bullshit)\b"
+NUDE_MEDIA = r"(?:pictures?|photos?|pics|selfies?|videos?)"
+
+# Question categories: (levels that block it, patterns)
+INPUT_LEXICON: Dict[str, Tuple[Tuple[str, ...], List[str]]] = {
+    "self_harm": (ALL_LEVELS, [
+        r"(?:kill|hurt|cut|harm)\s+my\s*self\b",
+        r"suicid\w*",
+        r"(?:want|wanna)\s+(?:to\s+)?die\b",
+        r"end\s+my\s+life\b"
+    ]),
+    "personal_info": (ALL_LEVELS, [
+        r"my\s+(?:home\s+|house\s+)?address\s+is\b",
+        r"my\s+(?:phone|cell)(?:\s+number)?\s+is\b",
+        r"my\s+password\s+is\b",
+        r"meet\s+(?:me|up)\s+(?:at|in|after)\b",
+        PHONE,
+        EMAIL
+    ]),
+    "sexual": (ALL_LEVELS, [
+        r"porn\w*",
+        r"nudes\b",
+        rf"(?:naked|nude)\s+{NUDE_MEDIA}\b",
+        rf"{NUDE_MEDIA}\s+of\s+(?:\w+\s+)?(?:naked|nude)\b"
+    ]),
+    "sexual_mild": (STRICT_MODERATE, [
+        r"sexy\b",
+        r"(?:have|having|had|has)\s+sex\b",
+        r"sex\s+(?:videos?|movies?|scenes?|positions?|toys?)\b",
+        r"(?:make|making)\s+out\b"
+    ]),
+    "weapons": (ALL_LEVELS, [
+        r"how\s+(?:do\s+(?:i|you)|to|can\s+i)\s+(?:make|build)\s+(?:a\s+)?(?:bomb|gun|explosive|weapon|molotov)s?\b"
+    ]),
+    "drugs": (STRICT_MODERATE, [
+        r"(?:cocaine|heroin|meth|marijuana|vap(?:e|es|ing))\b",
+        r"(?:smok(?:e|es|ing)|buy(?:ing)?|sell(?:ing)?)\s+(?:some\s+)?weed\b",
+        r"weed\s+(?:pens?|gummies|brownies|vapes?)\b",
+        r"get(?:ting)?\s+(?:drunk|stoned)\b",
+        r"get(?:ting)?\s+high\s+(?:on|off)\b"
+    ]),
+    "profanity": (STRICT_MODERATE, [PROFANITY]),
+    "violence": (STRICT_ONLY, [
+        r"(?:gore|gory|torture\w*|behead\w*)\b",
+        r"(?:horror\s+movie|serial\s+killer|jump\s*scare)s?\b"
+    ])
+}
+
+# Answer categories: (levels that filter it, action, patterns)
+OUTPUT_LEXICON: Dict[str, Tuple[Tuple[str, ...], str, List[str]]] = {
+    "profanity": (ALL_LEVELS, "mask", [PROFANITY]),
+    "personal_info": (ALL_LEVELS, "mask", [PHONE, EMAIL]),
+    "sexual": (ALL_LEVELS, "cut", [r"porn\w*", r"nudes\b", r"sexy\b"])
+}
+
+REDIRECTS = {
+    "self_harm": (
+        "It sounds like you might be going through something really hard, and I'm glad you said something. 💙 "
+        "Please talk to a grown-up you trust right now - a parent, teacher or school counselor. "
+        "You can also call or text 988 any time to talk with someone kind who can help."
+    ),
+    "personal_info": (
+        "Let's keep personal things like addresses, phone numbers, emails and passwords private - even from me! 🔒 "
+        "What would you like to learn about instead?"
+    ),
+    "default": (
+        "That's not something I can help with, but a grown-up you trust is a great person to ask. 😊 "
+        "How about we explore something fun instead - like animals, space or how things work?"
+    )
+}
+CUT_NOTE = "\n\n😊 Let's stop there and explore something else - what would you like to learn about?"
+MASK = "•••"
+
+# Longest text a match can span before the streaming filter must decide
+HOLDBACK_CHARS = 64
+
+
+@dataclass
+class SafetyVerdict:
+    category: str
+    stage: str      # "input" or "output"
+    action: str     # "redirect", "mask" or "cut"
+
+    def as_dict(self) -> Dict:
+        return {"stage": self.stage, "category": self.category, "action": self.action}
+
+
+def compile_levels(lexicon: Dict, flags: int = 0) -> Dict[str, Optional[re.Pattern]]:
+    """
+    One combined regex per filter level, a named group per category
+
+    The word-boundary check is factored out in front of the alternation,
+    so positions inside words are rejected before any term is tried.
+    """
+    patterns = {}
+    for level in FILTER_LEVELS:
+        groups = []
+        for category, entry in lexicon.items():
+            levels, terms = entry[0], entry[-1]
+            if level in levels:
+                groups.append(f"(?P<{category}>{'|'.join(terms)})")
+        patterns[level] = re.compile(rf"\b(?:{'|'.join(groups)})", flags) if groups else None
+    return patterns
+
+
+class OutputFilter:
+    """
+    Incremental answer filter for one response
+
+    feed() takes each streamed chunk and returns the text that is safe to
+    show; the last HOLDBACK_CHARS (back to a word boundary) are held until
+    more text arrives, so a term split across chunks is still caught.
+    Masked terms are replaced; a "cut" hit ends the answer with a gentle
+    note and drops everything after it.
+    """
+
+    def __init__(self, pattern: Optional[re.Pattern], on_hit=None):
+        self.pattern = pattern
+        self.on_hit = on_hit
+        self.pending = ""
+        self.stopped = False
+        self.verdicts: List[SafetyVerdict] = []
+
+    def feed(self, text: str) -> str:
+        if self.stopped:
+            return ""
+        self.pending += text
+        return self._drain(final=False)
+
+    def finish(self) -> str:
+        if self.stopped:
+            return ""
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> str:
+        text = self.pending
+        if self.pattern is None:
+            self.pending = ""
+            return text
+
+        limit = len(text)
+        if not final:
+            limit = max(0, len(text) - HOLDBACK_CHARS)
+            boundary = max(text.rfind(" ", 0, limit), text.rfind("\n", 0, limit))
+            limit = boundary + 1 if boundary >= 0 else 0
+
+        out, pos = [], 0
+        for match in self.pattern.finditer(text):
+            if match.start() >= limit or (not final and match.end() >= len(text)):
+                limit = min(limit, match.start())
+                break
+            category = match.lastgroup
+            action = OUTPUT_LEXICON[category][1]
+            verdict = SafetyVerdict(category, "output", action)
+            self.verdicts.append(verdict)
+            if self.on_hit is not None:
+                self.on_hit(verdict)
+            out.append(text[pos:match.start()])
+            if action == "cut":
+                out.append(CUT_NOTE)
+                self.stopped = True
+                self.pending = ""
+                return "".join(out)
+            out.append(MASK)
+            pos = match.end()
+
+        limit = max(limit, pos)
+        out.append(text[pos:limit])
+        self.pending = text[limit:]
+        return "".join(out)
+
+
+class SafetyService:
+    """
+    Local safety screen around every Claude call
+
+    Questions are matched against a compiled lexicon for the child's
+    content_filter_level before anything else runs; a hit returns a gentle
+    redirect without retrieval, cache or Claude. Answers pass through an
+    OutputFilter (also incrementally, while streaming). Both stages report
+    what they caught on result["safety"] so the exchange can be flagged.
+    """
+
+    def __init__(self):
+        # Questions are lowercased before matching; answers keep their case
+        # (and character offsets) because the output filter edits them
+        self.input_patterns = compile_levels(INPUT_LEXICON)
+        self.output_patterns = compile_levels(OUTPUT_LEXICON, re.IGNORECASE)
+        self.hits: Counter = Counter()
+        logger.info("✅ Safety screen compiled")
+
+    @staticmethod
+    def _level(content_filter_level: str) -> str:
+        return content_filter_level if content_filter_level in FILTER_LEVELS else "strict"
+
+    def screen_question(self, question: str, content_filter_level: str = "strict") -> Optional[Dict]:
+        """A redirect result if the question should not go to Claude, else None"""
+        if not settings.SAFETY_SCREEN_ENABLED:
+            return None
+        pattern = self.input_patterns[self._level(content_filter_level)]
+        match = pattern.search(question.lower()) if pattern is not None else None
+        if match is None:
+            return None
+
+        verdict = SafetyVerdict(match.lastgroup, "input", "redirect")
+        self._record(verdict)
+        logger.warning(f"⚠️ Safety screen redirected a question ({verdict.category}, {content_filter_level})")
+        return {
+            "answer": REDIRECTS.get(verdict.category, REDIRECTS["default"]),
+            "sources": [],
+            "model_used": SAFETY_MODEL_LABEL,
+            "used_web_search": False,
+            "safety": verdict.as_dict()
+        }
+
+    def output_filter(self, content_filter_level: str = "strict", record: bool = True) -> OutputFilter:
+        pattern = self.output_patterns[self._level(content_filter_level)] if settings.SAFETY_SCREEN_ENABLED else None
+        return OutputFilter(pattern, on_hit=self._record if record else None)
+
+    def filter_result(self, result: Dict, content_filter_level: str = "strict", record: bool = True) -> Dict:
+        """
+        Copy of a complete result with its answer filtered (and flagged if
+        anything was caught). record=False when a streaming filter already
+        counted the same hits.
+        """
+        answer_filter = self.output_filter(content_filter_level, record)
+        answer = answer_filter.feed(result["answer"]) + answer_filter.finish()
+        if not answer_filter.verdicts:
+            return result
+        return {**result, "answer": answer, "safety": answer_filter.verdicts[0].as_dict()}
+
+    def _record(self, verdict: SafetyVerdict):
+        self.hits[f"{verdict.stage}:{verdict.category}"] += 1
+
+    def stats(self) -> Dict:
+        return {"enabled": settings.SAFETY_SCREEN_ENABLED, "hits": dict(self.hits)}
+
+
+# Global safety service instance
+_safety_service = None
+
+def get_safety_service() -> SafetyService:
+    """Get or create the global safety service instance"""
+    global _safety_service
+    if _safety_service is None:
+        _safety_service = SafetyService()
+    return _safety_service
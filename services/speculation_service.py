@@ -0,0 +1,235 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from config import settings
+from services.answer_cache import AnswerCache, get_answer_cache, normalize_question
+from services.context_service import ChatContext
+from services.conversation_service import FOLLOW_UP_PROMPTS
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "nia:spec:v1:"
+
+# Stored with each speculated answer: the question it goes deeper on
+SOURCE_FIELD = "speculated_from"
+
+# The "yes" option offered after each depth, plus what kids type instead of tapping it
+FOLLOW_UP_TEXTS = frozenset(
+    [normalize_question(option["text"]) for prompt in FOLLOW_UP_PROMPTS.values() for option in prompt["options"] if option["id"] == "yes"]
+    + ["yes", "yes please", "tell me more", "more", "go deeper", "show me more", "keep going"]
+)
+
+
+def is_follow_up(text: str) -> bool:
+    return normalize_question(text) in FOLLOW_UP_TEXTS
+
+
+@dataclass
+class Speculation:
+    created_at: float
+    task: Optional[asyncio.Task] = None
+
+
+class SpeculationService:
+    """
+    Pre-generates the depth N+1 answer while the child reads depth N
+
+    After a depth-1 or depth-2 answer, the "Yes, tell me more!" follow-up
+    is answered in the background (at most SPECULATION_MAX_CONCURRENCY at a
+    time, never queued) and cached against the conversation. When the tap
+    arrives it is taken (read and deleted) from there, but only if the
+    conversation's last question is still the one it was generated from.
+    The stored answer keeps its Claude usage, so the child's quota is
+    charged by the request that serves it - never for one nobody asked for.
+    Speculations that expire or are
+    followed by a different question count as waste; if the recent waste
+    ratio passes SPECULATION_MAX_WASTE_RATIO, speculation pauses for
+    SPECULATION_COOLDOWN_SECONDS.
+    """
+
+    def __init__(self, cache: Optional[AnswerCache] = None):
+        self.cache = cache or get_answer_cache()
+        self.running = 0
+        self.pending: Dict[str, Speculation] = {}
+        self.outcomes = deque(maxlen=100)  # True = wasted
+        self.disabled_until = 0.0
+        self.counts = {"scheduled": 0, "generated": 0, "skipped_busy": 0, "hits": 0, "wasted": 0, "failed": 0, "auto_disabled": 0}
+
+    @staticmethod
+    def key(conversation_id: int, depth_level: int) -> str:
+        return f"{KEY_PREFIX}{conversation_id}:{depth_level}"
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SPECULATION_ENABLED and time.monotonic() >= self.disabled_until
+
+    async def _settle(self, key: str, wasted: bool):
+        speculation = self.pending.pop(key, None)
+        if wasted:
+            if speculation is not None and speculation.task is not None and not speculation.task.done():
+                speculation.task.cancel()
+            # Another worker may have generated it - drop it either way
+            await self.cache.pop(key)
+        if speculation is None:
+            return
+        self.counts["wasted" if wasted else "hits"] += 1
+        self.outcomes.append(wasted)
+
+        if (
+            len(self.outcomes) >= settings.SPECULATION_MIN_SAMPLES
+            and sum(self.outcomes) / len(self.outcomes) > settings.SPECULATION_MAX_WASTE_RATIO
+        ):
+            self.disabled_until = time.monotonic() + settings.SPECULATION_COOLDOWN_SECONDS
+            self.counts["auto_disabled"] += 1
+            self.outcomes.clear()
+            logger.warning(f"⚠️ Speculative answers paused for {settings.SPECULATION_COOLDOWN_SECONDS:.0f}s - too many went unused")
+
+    async def _expire(self):
+        cutoff = time.monotonic() - settings.SPECULATION_TTL_SECONDS
+        for key in [key for key, speculation in self.pending.items() if speculation.created_at < cutoff]:
+            await self._settle(key, wasted=True)
+
+    async def take(
+        self,
+        conversation_id: Optional[int],
+        depth_level: int,
+        text: str,
+        previous_question: Optional[str] = None
+    ) -> Optional[Dict]:
+        """The pre-generated answer for this follow-up to previous_question, if there is one"""
+        await self._expire()
+        if conversation_id is None:
+            return None
+
+        key = self.key(conversation_id, depth_level)
+        if not is_follow_up(text):
+            # A new question - anything speculated for this conversation is wasted
+            for depth in (2, 3):
+                await self._settle(self.key(conversation_id, depth), wasted=True)
+            return None
+
+        speculation = self.pending.get(key)
+        if speculation is not None and speculation.task is not None and not speculation.task.done():
+            # Still generating - waiting is cheaper than starting over
+            try:
+                await asyncio.shield(speculation.task)
+            except Exception:
+                pass
+
+        # Taking deletes it, so a repeated tap can't be served (or counted) twice
+        result = await self.cache.pop(key)
+        if result is None:
+            return None
+        if result.pop(SOURCE_FIELD, None) != normalize_question(previous_question or ""):
+            # Generated for an earlier question in this conversation
+            await self._settle(key, wasted=True)
+            return None
+        if key in self.pending:
+            await self._settle(key, wasted=False)
+        else:
+            self.counts["hits"] += 1  # speculated by another worker
+        logger.info(f"⚡ Served speculative depth-{depth_level} answer: conversation {conversation_id}")
+        return result
+
+    def schedule(
+        self,
+        rag,
+        conversation_id: int,
+        depth_level: int,
+        question: str,
+        answer: str,
+        grade_level: str,
+        child_age: Optional[int],
+        content_filter_level: str,
+        context: Optional[ChatContext] = None
+    ):
+        """Start generating the next depth's answer in the background, if there is capacity"""
+        next_depth = depth_level + 1
+        if not self.enabled or next_depth not in FOLLOW_UP_PROMPTS or rag.resilience.breaker.state != "closed":
+            return
+        if self.running >= settings.SPECULATION_MAX_CONCURRENCY:
+            self.counts["skipped_busy"] += 1
+            return
+
+        context = context or ChatContext()
+        follow_up = next(option["text"] for option in FOLLOW_UP_PROMPTS[depth_level]["options"] if option["id"] == "yes")
+        next_context = ChatContext(
+            history=context.history + [
+                {"role": "user", "content": question},
+                {"role": "assistant", "content": answer}
+            ],
+            summary=context.summary
+        )
+        key = self.key(conversation_id, next_depth)
+
+        async def generate():
+            try:
+                result = await rag.aquery(
+                    question=follow_up,
+                    grade_level=grade_level,
+                    depth_level=next_depth,
+                    child_age=child_age,
+                    content_filter_level=content_filter_level,
+                    context=next_context
+                )
+                if result.get("degraded"):
+                    return
+                result[SOURCE_FIELD] = normalize_question(question)
+                await self.cache.set(key, result, ttl=int(settings.SPECULATION_TTL_SECONDS))
+                self.counts["generated"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.counts["failed"] += 1
+                logger.warning(f"⚠️ Speculative answer failed: {e}")
+
+        speculation = Speculation(created_at=time.monotonic())
+        self.pending[key] = speculation
+        self.running += 1
+        speculation.task = asyncio.create_task(generate())
+        speculation.task.add_done_callback(self._finished)
+        self.counts["scheduled"] += 1
+
+    def _finished(self, task: asyncio.Task):
+        # Done callbacks also run for tasks cancelled before they started
+        self.running -= 1
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict:
+        settled = self.counts["hits"] + self.counts["wasted"]
+        return {
+            **self.counts,
+            "hit_rate": round(self.counts["hits"] / settled, 4) if settled else None,
+            "pending": len(self.pending),
+            "running": self.running,
+            "enabled": self.enabled
+        }
+
+    async def aclose(self):
+        for speculation in self.pending.values():
+            if speculation.task is not None:
+                speculation.task.cancel()
+        self.pending.clear()
+
+
+# Global speculation service instance
+_speculation_service = None
+
+def get_speculation_service() -> SpeculationService:
+    """Get or create the global speculation service instance"""
+    global _speculation_service
+    if _speculation_service is None:
+        _speculation_service = SpeculationService()
+    return _speculation_service
+
+async def close_speculation_service():
+    """Cancel background generations on shutdown"""
+    global _speculation_service
+    if _speculation_service is not None:
+        await _speculation_service.aclose()
+        _speculation_service = None
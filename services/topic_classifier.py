@@ -0,0 +1,214 @@
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Conversation, Message, IS_QUESTION
+from services.retrieval_service import ContentChunk, get_retrieval_service
+
+logger = logging.getLogger(__name__)
+
+# Subjects the old keyword list tagged that have no content/ files yet
+EXTRA_SUBJECTS = ["geography", "travel"]
+
+# Topic tags that are everyday words in questions ("a long time ago")
+AMBIGUOUS_TERMS = frozenset(["time", "union"])
+
+LIST_NUMBER_RE = re.compile(r"^\d+\.\s*")
+PARENTHETICAL_RE = re.compile(r"\s*\([^)]*\)")
+WHITESPACE_RE = re.compile(r"\s+")
+MIN_TERM_LENGTH = 4
+
+
+def normalize_term(text: str) -> str:
+    return WHITESPACE_RE.sub(" ", text.lower()).strip()
+
+
+def term_variants(term: str) -> List[str]:
+    """The term plus simple singular/plural forms ("fraction" / "fractions")"""
+    variants = {term}
+    if term.endswith("es") and len(term) > MIN_TERM_LENGTH + 1:
+        variants.add(term[:-2])
+    if term.endswith("s") and not term.endswith("ss") and len(term) > MIN_TERM_LENGTH:
+        variants.add(term[:-1])
+    else:
+        variants.update((term + "s", term + "es"))
+    return list(variants)
+
+
+def heading_term(heading: str) -> str:
+    """ "1. Battle of Gettysburg (July 1863)" -> "battle of gettysburg" """
+    heading = PARENTHETICAL_RE.sub("", LIST_NUMBER_RE.sub("", heading))
+    return normalize_term(heading.split(" - ")[0].split(":")[0])
+
+
+def build_taxonomy(chunks: List[ContentChunk]) -> Dict[str, Tuple[str, Optional[str]]]:
+    """
+    Term -> (subject, topic) from the curriculum's own structure
+
+    Subjects come from the file prefixes (math_*, science_*, history_*),
+    topics from each lesson's **Topics:** line, and section headings that
+    belong to a single lesson ("Battle of Gettysburg") tag that lesson's
+    lead topic - its first tag no other lesson uses.
+    """
+    lessons: Dict[str, List[ContentChunk]] = defaultdict(list)
+    for chunk in chunks:
+        lessons[chunk.source_file].append(chunk)
+    subjects = {chunk.subject for chunk in chunks} | set(EXTRA_SUBJECTS)
+
+    lessons_per_topic = defaultdict(set)
+    lessons_per_heading = defaultdict(set)
+    for filename, sections in lessons.items():
+        for topic in sections[0].topics:
+            lessons_per_topic[normalize_term(topic)].add(filename)
+        for section in sections:
+            lessons_per_heading[heading_term(section.heading)].add(filename)
+
+    taxonomy: Dict[str, Tuple[str, Optional[str]]] = {}
+
+    def add(term: str, subject: str, topic: Optional[str]):
+        if (len(term) < MIN_TERM_LENGTH and term not in subjects) or term in AMBIGUOUS_TERMS:
+            return
+        for variant in term_variants(term):
+            taxonomy.setdefault(variant, (subject, topic))
+
+    # Topic tags first so they win over headings spelled the same way
+    lead_topics = {}
+    for filename, sections in lessons.items():
+        subject = sections[0].subject
+        for topic in sections[0].topics:
+            term = normalize_term(topic)
+            if term in subjects:
+                continue
+            add(term, subject, topic)
+            if filename not in lead_topics and len(lessons_per_topic[term]) == 1:
+                lead_topics[filename] = topic
+
+    for filename, sections in lessons.items():
+        lead = lead_topics.get(filename)
+        if lead is None:
+            continue
+        for section in sections:
+            term = heading_term(section.heading)
+            if len(lessons_per_heading[term]) == 1 and " " in term:
+                add(term, section.subject, lead)
+
+    for subject in subjects:
+        taxonomy.setdefault(subject, (subject, None))
+    return taxonomy
+
+
+def trie_pattern(terms: Iterable[str]) -> str:
+    """
+    Regex for a set of terms with shared prefixes factored out
+
+    "fraction|fractions|france" becomes "fr(?:action(?:s)?|ance)", so the
+    engine walks a prefix tree instead of retrying every alternative at
+    every position. Longer terms win because each optional suffix is tried
+    before stopping.
+    """
+    trie: Dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def render(node: Dict) -> str:
+        ends = "" in node
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if ends:
+            return f"(?:{body})?"
+        return body
+
+    return render(trie)
+
+
+class TopicClassifier:
+    """
+    Tags questions with curriculum subjects and topics in one regex pass
+
+    Every taxonomy term is compiled into a single prefix-tree regex over
+    lowercased text (longest match wins, so "civil rights movement" beats
+    "civil rights"); tagging is one finditer plus dictionary lookups,
+    cheap enough for every message and for re-tagging the whole history.
+    """
+
+    def __init__(self, chunks: Optional[List[ContentChunk]] = None):
+        chunks = chunks if chunks is not None else get_retrieval_service().chunks
+        self.taxonomy = build_taxonomy(chunks)
+        self.subjects = frozenset(subject for subject, _ in self.taxonomy.values())
+        self.pattern = re.compile(rf"\b{trie_pattern(self.taxonomy)}\b")
+        logger.info(f"✅ Topic classifier compiled: {len(self.taxonomy)} terms")
+
+    def tag(self, text: str) -> List[str]:
+        """Subjects then topics found in the text, in order of first mention"""
+        subjects, topics = [], []
+        for match in self.pattern.finditer(normalize_term(text)):
+            subject, topic = self.taxonomy[match.group(0)]
+            if subject not in subjects:
+                subjects.append(subject)
+            if topic is not None and topic not in topics:
+                topics.append(topic)
+        return subjects + topics
+
+    def tag_many(self, texts: Iterable[str]) -> List[List[str]]:
+        return [self.tag(text) for text in texts]
+
+
+async def retag_conversations(db: AsyncSession, batch_size: int = 500) -> int:
+    """Recompute Conversation.topics from every child message; returns conversations updated"""
+    classifier = get_topic_classifier()
+    updated = 0
+    last_id = 0
+
+    while True:
+        conversations = (await db.execute(
+            select(Conversation)
+            .where(Conversation.id > last_id)
+            .order_by(Conversation.id)
+            .limit(batch_size)
+        )).scalars().all()
+        if not conversations:
+            break
+        last_id = conversations[-1].id
+
+        topics_by_conversation = defaultdict(list)
+        rows = await db.execute(
+            select(Message.conversation_id, Message.content)
+            .where(
+                Message.conversation_id.in_([conversation.id for conversation in conversations]),
+                IS_QUESTION
+            )
+            .order_by(Message.id)
+        )
+        for conversation_id, content in rows:
+            topics = topics_by_conversation[conversation_id]
+            topics.extend(tag for tag in classifier.tag(content) if tag not in topics)
+
+        for conversation in conversations:
+            topics = topics_by_conversation.get(conversation.id, [])
+            if topics != (conversation.topics or []):
+                conversation.topics = topics
+                updated += 1
+        await db.commit()
+
+    logger.info(f"✅ Re-tagged topics on {updated} conversations")
+    return updated
+
+
+# Global topic classifier instance
+_topic_classifier = None
+
+def get_topic_classifier() -> TopicClassifier:
+    """Get or create the global topic classifier instance"""
+    global _topic_classifier
+    if _topic_classifier is None:
+        _topic_classifier = TopicClassifier()
+    return _topic_classifier
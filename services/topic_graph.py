@@ -0,0 +1,208 @@
+import logging
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config import settings
+from services.retrieval_service import ContentChunk, RetrievalService, get_retrieval_service, tokenize
+from services.vector_index import content_fingerprint
+
+logger = logging.getLogger(__name__)
+
+GRAPH_FORMAT_VERSION = 1
+
+# How much each kind of link adds to an edge's weight
+SIMILARITY_WEIGHT = 1.0     # cosine similarity of the two sections
+SHARED_TERMS_WEIGHT = 0.3   # idf-weighted overlap of the files' topic tags
+REFERENCE_WEIGHT = 0.3      # one section names the other file's topic
+
+# Rows of the similarity matrix computed at a time while building
+BUILD_BLOCK_ROWS = 1024
+
+LIST_NUMBER_RE = re.compile(r"^\d+\.\s*")
+
+
+def node_labels(chunks: List[ContentChunk]) -> List[str]:
+    """
+    Kid-facing name per chunk
+
+    The section heading, unless it only makes sense inside its lesson -
+    shared across files ("Key Facts") or a single word ("Immediate") -
+    in which case the lesson title is used.
+    """
+    files_per_heading = defaultdict(set)
+    for chunk in chunks:
+        files_per_heading[" ".join(tokenize(chunk.heading))].add(chunk.source_file)
+
+    labels = []
+    for chunk in chunks:
+        heading = LIST_NUMBER_RE.sub("", chunk.heading)
+        generic = len(files_per_heading[" ".join(tokenize(chunk.heading))]) > 1 or len(tokenize(heading)) < 2
+        labels.append(chunk.title if generic else heading)
+    return labels
+
+
+def tag_weights(chunks: List[ContentChunk], files: List[str]) -> Dict[str, np.ndarray]:
+    """Per-file idf-weighted topic tag vectors (tag -> weight by file)"""
+    tags_by_file = {}
+    for chunk in chunks:
+        tags_by_file.setdefault(chunk.source_file, {" ".join(tokenize(tag)) for tag in chunk.topics} - {""})
+    document_frequency = Counter(tag for tags in tags_by_file.values() for tag in tags)
+    weights = {}
+    for f, filename in enumerate(files):
+        for tag in tags_by_file.get(filename, ()):
+            weights.setdefault(tag, np.zeros(len(files), dtype=np.float32))[f] = math.log(1 + len(files) / document_frequency[tag])
+    return weights
+
+
+def shared_terms_matrix(weights: Dict[str, np.ndarray], n_files: int) -> np.ndarray:
+    """(files, files) weighted Jaccard overlap of topic tags; 0 on the diagonal"""
+    if not weights:
+        return np.zeros((n_files, n_files), dtype=np.float32)
+    tags = np.stack(list(weights.values()), axis=1)  # (files, tags)
+    overlap = np.minimum(tags[:, None, :], tags[None, :, :]).sum(axis=2)
+    union = np.maximum(tags[:, None, :], tags[None, :, :]).sum(axis=2)
+    shared = overlap / np.where(union == 0, 1.0, union)
+    np.fill_diagonal(shared, 0.0)
+    return shared.astype(np.float32)
+
+
+def reference_matrix(chunks: List[ContentChunk], weights: Dict[str, np.ndarray], files: List[str]) -> np.ndarray:
+    """(chunks, files) 1 where a chunk's text names a topic only that other file is tagged with"""
+    distinctive = {}
+    for tag, by_file in weights.items():
+        owners = np.flatnonzero(by_file)
+        if len(owners) == 1 and tag not in {chunk.subject for chunk in chunks}:
+            distinctive[f" {tag} "] = owners[0]
+
+    file_index = {filename: f for f, filename in enumerate(files)}
+    references = np.zeros((len(chunks), len(files)), dtype=np.float32)
+    for i, chunk in enumerate(chunks):
+        text = f" {' '.join(tokenize(chunk.text))} "
+        own = file_index[chunk.source_file]
+        for phrase, f in distinctive.items():
+            if f != own and phrase in text:
+                references[i, f] = 1.0
+    return references
+
+
+class TopicGraph:
+    """
+    Precomputed links between curriculum sections
+
+    Each section keeps its TOPIC_GRAPH_NEIGHBORS strongest links, weighted
+    by text similarity (from the vector index matrix, M @ M.T), topic tags
+    shared between lessons, and explicit mentions of another lesson's
+    topic. Only the (sections x neighbours) index and float16 weight arrays
+    are stored, so related topics are a dictionary lookup plus a few reads.
+    """
+
+    def __init__(self, chunks: List[ContentChunk], neighbors: np.ndarray, weights: np.ndarray):
+        self.chunks = chunks
+        self.neighbors = neighbors
+        self.weights = weights
+        self.labels = node_labels(chunks)
+        self.positions = {chunk.chunk_id: i for i, chunk in enumerate(chunks)}
+
+    @classmethod
+    def build(cls, retrieval: RetrievalService, k: int) -> "TopicGraph":
+        chunks = retrieval.chunks
+        n = len(chunks)
+        k = max(0, min(k, n - 1))
+        files = sorted({chunk.source_file for chunk in chunks})
+        file_of = np.array([files.index(chunk.source_file) for chunk in chunks], dtype=np.int32)
+
+        weights_by_tag = tag_weights(chunks, files)
+        shared = shared_terms_matrix(weights_by_tag, len(files))
+        references = reference_matrix(chunks, weights_by_tag, files)
+
+        neighbors = np.zeros((n, k), dtype=np.int32)
+        weights = np.zeros((n, k), dtype=np.float16)
+        if k == 0:
+            return cls(chunks, neighbors, weights)
+
+        matrix = np.asarray(retrieval.vectors.matrix)
+        matrix_t = np.asarray(retrieval.vectors.matrix_t)
+        for start in range(0, n, BUILD_BLOCK_ROWS):
+            rows = np.arange(start, min(start + BUILD_BLOCK_ROWS, n))
+            scores = SIMILARITY_WEIGHT * (matrix[rows] @ matrix_t)
+            scores += SHARED_TERMS_WEIGHT * shared[file_of[rows]][:, file_of]
+            scores += REFERENCE_WEIGHT * references[rows][:, file_of]
+            scores[np.arange(len(rows)), rows] = -np.inf  # no self-links
+
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            neighbors[rows] = top
+            weights[rows] = np.take_along_axis(scores, top, axis=1)
+
+        return cls(chunks, neighbors, weights)
+
+    @classmethod
+    def load_or_build(cls, retrieval: RetrievalService, path: str, k: int) -> "TopicGraph":
+        """Load the stored graph, rebuilding it if content/ changed"""
+        fingerprint = f"g{GRAPH_FORMAT_VERSION}:{k}:" + content_fingerprint(retrieval.content_dir, retrieval.vectors.dim)
+        chunk_ids = [chunk.chunk_id for chunk in retrieval.chunks]
+
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                if str(stored["fingerprint"]) == fingerprint and stored["chunk_ids"].tolist() == chunk_ids:
+                    graph = cls(retrieval.chunks, stored["neighbors"], stored["weights"])
+                    logger.info(f"✅ Topic graph loaded from {path} {graph.neighbors.shape}")
+                    return graph
+        except (OSError, ValueError, KeyError):
+            pass
+
+        graph = cls.build(retrieval, k)
+        graph.save(path, fingerprint)
+        logger.info(f"✅ Topic graph built and saved to {path} {graph.neighbors.shape}")
+        return graph
+
+    def save(self, path: str, fingerprint: str):
+        """Write atomically so concurrent workers never see a partial file"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(
+            tmp,
+            fingerprint=np.array(fingerprint),
+            chunk_ids=np.array([chunk.chunk_id for chunk in self.chunks]),
+            neighbors=self.neighbors,
+            weights=self.weights
+        )
+        os.replace(tmp, path)
+
+    def related(self, chunk_ids: Sequence[str], limit: Optional[int] = None) -> List[str]:
+        """Names of the sections most strongly linked to the given ones, excluding their own names"""
+        limit = settings.RELATED_TOPICS_MAX if limit is None else limit
+        seeds = [self.positions[chunk_id] for chunk_id in chunk_ids if chunk_id in self.positions]
+        if not seeds or limit <= 0:
+            return []
+
+        exclude = {self.labels[seed] for seed in seeds} | {self.chunks[seed].title for seed in seeds}
+        scores: Dict[str, float] = defaultdict(float)
+        for seed in seeds:
+            for neighbor, weight in zip(self.neighbors[seed], self.weights[seed]):
+                label = self.labels[neighbor]
+                if label not in exclude:
+                    scores[label] += float(weight)
+
+        return [label for label, _ in sorted(scores.items(), key=lambda item: -item[1])[:limit]]
+
+
+# Global topic graph instance
+_topic_graph = None
+
+def get_topic_graph() -> TopicGraph:
+    """Get or create the global topic graph instance"""
+    global _topic_graph
+    if _topic_graph is None:
+        _topic_graph = TopicGraph.load_or_build(
+            get_retrieval_service(),
+            settings.TOPIC_GRAPH_PATH,
+            settings.TOPIC_GRAPH_NEIGHBORS
+        )
+    return _topic_graph
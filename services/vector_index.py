@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import zlib
+from functools import lru_cache
+from typing import List, Dict, Sequence
+
+import numpy as np
+
+from services.retrieval_service import ContentChunk, SearchHit, index_tokens, tokenize
+
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 2  # bump when tokenize() changes
+
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, dim: int):
+    """Stable (bucket, sign) for a feature - crc32 so every worker agrees"""
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dim, (1.0 if (h >> 31) & 1 else -1.0)
+
+
+def hash_counts(tokens: List[str], dim: int) -> np.ndarray:
+    """Signed hashed term counts with sublinear (1 + log tf) scaling"""
+    counts: Dict[str, int] = {}
+    for feature in tokens:
+        counts[feature] = counts.get(feature, 0) + 1
+
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, tf in counts.items():
+        bucket, sign = _bucket(feature, dim)
+        vector[bucket] += sign * (1.0 + math.log(tf))
+    return vector
+
+
+def content_fingerprint(content_dir: str, dim: int) -> str:
+    """Identifies the curriculum + settings a persisted matrix was built from"""
+    digest = hashlib.sha256(f"v{INDEX_FORMAT_VERSION}:{dim}".encode())
+    for filename in sorted(os.listdir(content_dir)):
+        if filename.endswith(".md"):
+            digest.update(filename.encode())
+            with open(os.path.join(content_dir, filename), "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+class VectorIndex:
+    """
+    Hashed TF-IDF similarity index over content chunks
+
+    The chunk matrix is L2-normalised float32 stored in one .npy file and
+    opened with mmap_mode="r", so every uvicorn worker on a host shares the
+    same pages through the OS page cache. A batch of questions is scored
+    with a single queries @ matrix.T.
+
+    The file holds matrix.T (one row per hash bucket). Query vectors only
+    have a handful of non-zero buckets, so scoring multiplies just those
+    rows - the same result as the full product, but it reads kilobytes
+    instead of the whole matrix and stays fast as the curriculum grows.
+    """
+
+    def __init__(self, chunks: List[ContentChunk], matrix_t: np.ndarray, idf: np.ndarray):
+        self.chunks = chunks
+        self.matrix_t = matrix_t
+        self.idf = idf
+        self.dim = matrix_t.shape[0]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """(n_chunks, dim) view of the stored bucket-major matrix"""
+        return self.matrix_t.T
+
+    @classmethod
+    def build(cls, chunks: List[ContentChunk], dim: int) -> "VectorIndex":
+        """Vectorise chunks in memory"""
+        counts = np.stack([hash_counts(index_tokens(chunk), dim) for chunk in chunks]) if chunks \
+            else np.zeros((0, dim), dtype=np.float32)
+
+        # Per-bucket document frequency -> smoothed idf
+        document_frequency = np.count_nonzero(counts, axis=0)
+        idf = (np.log((1 + len(chunks)) / (1 + document_frequency)) + 1.0).astype(np.float32)
+
+        matrix = counts * idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+
+        return cls(chunks, np.ascontiguousarray(matrix.T, dtype=np.float32), idf)
+
+    @classmethod
+    def load_or_build(cls, chunks: List[ContentChunk], content_dir: str, path: str, dim: int) -> "VectorIndex":
+        """Memory-map the persisted matrix, rebuilding it if content/ changed"""
+        fingerprint = content_fingerprint(content_dir, dim)
+        meta_path = path + ".json"
+
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            chunk_ids = [chunk.chunk_id for chunk in chunks]
+            if meta["fingerprint"] == fingerprint and meta["chunk_ids"] == chunk_ids:
+                matrix_t = np.load(path, mmap_mode="r")
+                logger.info(f"✅ Vector index memory-mapped from {path} {matrix_t.shape}")
+                return cls(chunks, matrix_t, np.asarray(meta["idf"], dtype=np.float32))
+        except (OSError, ValueError, KeyError):
+            pass
+
+        index = cls.build(chunks, dim)
+        index.save(path, fingerprint)
+        index.matrix_t = np.load(path, mmap_mode="r")
+        logger.info(f"✅ Vector index built and saved to {path} {index.matrix_t.shape}")
+        return index
+
+    def save(self, path: str, fingerprint: str):
+        """Write matrix + metadata atomically so concurrent workers never see a partial file"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+
+        with open(path + suffix, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.matrix_t, dtype=np.float32))
+        with open(path + ".json" + suffix, "w", encoding="utf-8") as f:
+            json.dump({
+                "fingerprint": fingerprint,
+                "dim": self.dim,
+                "chunk_ids": [chunk.chunk_id for chunk in self.chunks],
+                "idf": self.idf.tolist()
+            }, f)
+
+        os.replace(path + suffix, path)
+        os.replace(path + ".json" + suffix, path + ".json")
+
+    def embed(self, queries: Sequence[str]) -> np.ndarray:
+        """(n_queries, dim) L2-normalised query vectors"""
+        vectors = np.stack([hash_counts(tokenize(q), self.dim) for q in queries]) * self.idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    def score(self, queries: Sequence[str]) -> np.ndarray:
+        """Cosine similarity of every query against every chunk (queries @ matrix.T)"""
+        vectors = self.embed(queries)
+        active = np.flatnonzero(vectors.any(axis=0))
+        return vectors[:, active] @ self.matrix_t[active]
+
+    def search_batch(self, queries: Sequence[str], top_k: int = 3) -> List[List[SearchHit]]:
+        """Top-k chunks for each query from one matrix multiply"""
+        if not queries or not self.chunks:
+            return [[] for _ in queries]
+
+        scores = self.score(queries)
+        k = min(top_k, scores.shape[1])
+        if k == 0:
+            return [[] for _ in queries]
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results.append([
+                SearchHit(self.chunks[i], float(scores[row, i]))
+                for i in ordered if scores[row, i] > 0
+            ])
+        return results
+
+    def search(self, query: str, top_k: int = 3) -> List[SearchHit]:
+        return self.search_batch([query], top_k)[0]
@@ -1,3 +1,525 @@
-# Placeholder - no visual generation for now
-def get_visual_service():
-    return None
+import glob
+import logging
+import os
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from html import escape
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+from services.retrieval_service import ContentChunk, get_retrieval_service
+from services.topic_classifier import get_topic_classifier, trie_pattern
+
+logger = logging.getLogger(__name__)
+
+# Pictographs and symbols as they appear in content/ ("🍕", "➗"), not arrows
+EMOJI_RE = re.compile("[\U0001F300-\U0001FAFF☀-➿]️?")
+
+# Everyday concepts -> emoji, matched as whole words in lowercased text
+EMOJI_LEXICON: Dict[str, List[str]] = {
+    "🍕": ["pizza", "pizzas"],
+    "🍪": ["cookie", "cookies"],
+    "🍎": ["apple", "apples", "fruit", "fruits"],
+    "🎂": ["cake", "cakes", "birthday"],
+    "💰": ["money", "dollar", "dollars", "coin", "coins", "cents"],
+    "⏰": ["clock", "clocks", "hour", "hours", "minute", "minutes"],
+    "📏": ["measure", "measuring", "inch", "inches", "ruler"],
+    "🐶": ["dog", "dogs", "puppy", "puppies"],
+    "🐱": ["cat", "cats", "kitten", "kittens"],
+    "🐻": ["bear", "bears", "grizzly"],
+    "🦅": ["eagle", "eagles"],
+    "🐦": ["bird", "birds"],
+    "🐟": ["fish", "fishes"],
+    "🦈": ["shark", "sharks"],
+    "🐋": ["whale", "whales"],
+    "🐍": ["snake", "snakes", "reptile", "reptiles"],
+    "🐸": ["frog", "frogs", "amphibian", "amphibians", "tadpole", "tadpoles"],
+    "🦋": ["butterfly", "butterflies", "caterpillar", "caterpillars", "metamorphosis"],
+    "🐝": ["bee", "bees", "pollen", "pollinate", "pollination"],
+    "🐜": ["ant", "ants", "insect", "insects", "bug", "bugs"],
+    "🦖": ["dinosaur", "dinosaurs", "fossil", "fossils"],
+    "🌱": ["seed", "seeds", "sprout", "seedling", "germinate", "germination"],
+    "🌳": ["tree", "trees", "forest", "forests"],
+    "🌸": ["flower", "flowers", "bloom", "blossom"],
+    "🍃": ["leaf", "leaves", "photosynthesis"],
+    "☀️": ["sun", "sunny", "sunlight", "sunshine"],
+    "🌙": ["moon", "moons"],
+    "⭐": ["star", "stars"],
+    "🪐": ["planet", "planets", "saturn", "jupiter"],
+    "🌍": ["earth", "world", "globe"],
+    "🚀": ["rocket", "rockets", "astronaut", "astronauts", "space"],
+    "🌧️": ["rain", "rainy", "raindrop", "raindrops"],
+    "❄️": ["snow", "snowy", "snowflake", "snowflakes", "blizzard", "blizzards"],
+    "⛈️": ["thunderstorm", "thunderstorms", "thunder"],
+    "⚡": ["lightning", "electricity", "electric"],
+    "🌪️": ["tornado", "tornadoes", "twister"],
+    "🌀": ["hurricane", "hurricanes"],
+    "🌈": ["rainbow", "rainbows"],
+    "☁️": ["cloud", "clouds", "cloudy"],
+    "🌡️": ["temperature", "thermometer"],
+    "🌋": ["volcano", "volcanoes", "lava"],
+    "🌊": ["ocean", "oceans", "wave", "waves", "sea"],
+    "🏔️": ["mountain", "mountains"],
+    "💧": ["water"],
+    "🚂": ["train", "trains", "railroad", "railroads", "locomotive"],
+    "🚗": ["car", "cars", "automobile", "automobiles"],
+    "✈️": ["airplane", "airplanes", "plane", "planes"],
+    "🚢": ["ship", "ships", "boat", "boats"],
+    "🏭": ["factory", "factories"],
+    "💡": ["invention", "inventions", "inventor", "bulb"],
+    "⚔️": ["battle", "battles", "war", "wars"],
+    "📜": ["declaration", "constitution", "amendment", "amendments"],
+    "🇺🇸": ["america", "american", "united states"],
+    "🗳️": ["vote", "votes", "voting", "election", "elections"],
+    "🏫": ["school", "schools", "teacher", "teachers"],
+    "📚": ["book", "books", "read", "reading"],
+    "🔬": ["microscope", "cell", "cells", "germ", "germs"],
+    "🧲": ["magnet", "magnets", "magnetic"],
+    "➕": ["add", "adding", "addition", "plus", "sum"],
+    "➖": ["subtract", "subtracting", "subtraction", "minus", "difference"],
+    "✖️": ["multiply", "multiplying", "multiplication", "times"],
+    "➗": ["divide", "dividing", "division", "share", "sharing"]
+}
+
+# Emoji for each body system card (content/ has no emoji for them)
+SYSTEM_EMOJI = {
+    "skeletal": "🦴",
+    "muscular": "💪",
+    "circulatory": "❤️",
+    "respiratory": "🫁",
+    "digestive": "🍽️",
+    "nervous": "🧠",
+    "endocrine": "🧪",
+    "urinary": "💧",
+    "immune": "🛡️",
+    "integumentary": "✋",
+    "reproductive": "👶"
+}
+
+SYSTEM_HEADER_RE = re.compile(r"^\*\*\d+\.\s+([A-Z]+) SYSTEM(?:\s+\(([^)]*)\))?\*\*$")
+SECTION_END_RE = re.compile(r"^\*\*[^a-z]+\*\*$")   # next all-caps bold header
+BOLD_BULLET_RE = re.compile(r"^-\s+\*\*([^*]+)\*\*\s+-\s+(.+)$")
+PLAIN_BULLET_RE = re.compile(r"^-\s+(.+)$")
+
+NUMBER_WORDS = {
+    "a": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12
+}
+DENOMINATOR_WORDS = {
+    "half": 2, "halves": 2, "third": 3, "quarter": 4, "fourth": 4, "fifth": 5, "sixth": 6,
+    "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10, "eleventh": 11, "twelfth": 12
+}
+VULGAR_FRACTIONS = {
+    "½": (1, 2), "⅓": (1, 3), "⅔": (2, 3), "¼": (1, 4), "¾": (3, 4), "⅕": (1, 5), "⅖": (2, 5),
+    "⅗": (3, 5), "⅘": (4, 5), "⅙": (1, 6), "⅚": (5, 6), "⅛": (1, 8), "⅜": (3, 8), "⅝": (5, 8), "⅞": (7, 8)
+}
+
+# "3/4" but not dates like 7/4/1776; "three quarters", "a half"; "¾"
+FRACTION_RE = re.compile(
+    r"(?<![\d/])(?P<num>\d{1,2})\s*/\s*(?P<den>\d{1,2})(?![\d/])"
+    rf"|\b(?P<num_word>{'|'.join(NUMBER_WORDS)})[\s-]+(?P<den_word>{'|'.join(sorted(DENOMINATOR_WORDS, key=len, reverse=True))})s?\b"
+    rf"|(?P<vulgar>[{''.join(VULGAR_FRACTIONS)}])"
+)
+# "7 + 5", "12 divided by 3", "6 x 4 = 24"; answers only count with the "= result"
+ARITHMETIC_RE = re.compile(
+    r"(?<![\d.,/])(?P<a>\d{1,3})\s*(?P<op>\+|-|−|x|×|\*|÷|plus|minus|take away|times|divided by)\s*(?P<b>\d{1,3})(?![\d.,/])"
+    r"(?:\s*=\s*(?P<result>\d{1,4}))?"
+)
+OPERATORS = {
+    "+": "+", "plus": "+",
+    "-": "-", "−": "-", "minus": "-", "take away": "-",
+    "x": "×", "×": "×", "*": "×", "times": "×",
+    "÷": "÷", "divided by": "÷"
+}
+
+MAX_FRACTION_DENOMINATOR = 12
+MAX_NUMBER_LINE = 20
+MAX_ARRAY_SIDE = 10
+MAX_DIVIDEND = 40
+MAX_BODY_PARTS = 4
+
+SVG_FONT = "font-family=\"sans-serif\" font-size=\"13\""
+FILL = "#FFB74D"
+STROKE = "#5D4037"
+
+
+@dataclass
+class BodySystem:
+    name: str
+    subtitle: str
+    emoji: str
+    parts: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def title(self) -> str:
+        return f"{self.name.title()} System"
+
+
+def parse_body_systems(content_dir: str) -> List[BodySystem]:
+    """
+    "**3. CIRCULATORY SYSTEM (Heart and Blood)**" sections from content/
+
+    Each system keeps its bold "- **Part** - what it does" bullets (or its
+    first plain bullets when it has none) for the diagram card.
+    """
+    systems: List[BodySystem] = []
+    current: Optional[BodySystem] = None
+    plain: List[str] = []
+
+    def close():
+        if current is not None and not current.parts:
+            current.parts = [(text, "") for text in plain]
+
+    for path in sorted(glob.glob(os.path.join(content_dir, "*.md"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                header = SYSTEM_HEADER_RE.match(line)
+                if header:
+                    close()
+                    name = header.group(1).lower()
+                    current = BodySystem(name, header.group(2) or "", SYSTEM_EMOJI.get(name, "🧍"))
+                    systems.append(current)
+                    plain = []
+                elif current is not None and SECTION_END_RE.match(line):
+                    close()
+                    current = None
+                elif current is not None:
+                    bullet = BOLD_BULLET_RE.match(line)
+                    if bullet and len(current.parts) < MAX_BODY_PARTS:
+                        current.parts.append((bullet.group(1).strip(), bullet.group(2).strip()))
+                    elif not bullet and len(plain) < MAX_BODY_PARTS:
+                        bullet = PLAIN_BULLET_RE.match(line)
+                        if bullet:
+                            plain.append(bullet.group(1).strip())
+        close()
+        current = None
+    return systems
+
+
+def body_system_terms(system: BodySystem) -> List[str]:
+    """Words that point at a system: its name, one-word subtitle pieces ("Bones") and part names"""
+    terms = [f"{system.name} system", system.name]
+    for piece in re.split(r",|\band\b", system.subtitle):
+        if len(piece.split()) == 1:
+            terms.append(piece.strip().lower())
+    for part, description in system.parts:
+        if description:
+            terms.extend(name.strip().lower() for name in part.split("/"))
+    return [term for term in terms if len(term) >= 4]
+
+
+def lesson_emoji(chunks: List[ContentChunk], subjects: set) -> Dict[str, List[str]]:
+    """Topic tag -> the emoji its lesson uses ("Fractions" -> ["🍕"])"""
+    by_file: Dict[str, List[str]] = defaultdict(list)
+    topics_by_file: Dict[str, List[str]] = {}
+    for chunk in chunks:
+        topics_by_file.setdefault(chunk.source_file, chunk.topics)
+        for emoji in EMOJI_RE.findall(chunk.text):
+            if emoji not in by_file[chunk.source_file]:
+                by_file[chunk.source_file].append(emoji)
+
+    by_topic: Dict[str, List[str]] = defaultdict(list)
+    for filename, topics in topics_by_file.items():
+        for topic in topics:
+            if topic.lower() in subjects:
+                continue
+            by_topic[topic].extend(emoji for emoji in by_file[filename] if emoji not in by_topic[topic])
+    return dict(by_topic)
+
+
+def fraction_bar_svg(numerator: int, denominator: int) -> str:
+    width, height = 240, 36
+    part = width / denominator
+    cells = "".join(
+        f'<rect x="{10 + i * part:.1f}" y="6" width="{part:.1f}" height="{height}" '
+        f'fill="{FILL if i < numerator else "#FFFFFF"}" stroke="{STROKE}" stroke-width="2"/>'
+        for i in range(denominator)
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 260 70" role="img" '
+        f'aria-label="{numerator} out of {denominator} equal parts shaded">{cells}'
+        f'<text x="130" y="62" text-anchor="middle" {SVG_FONT}>{numerator}/{denominator}</text></svg>'
+    )
+
+
+@lru_cache(maxsize=512)
+def number_line_svg(start: int, end: int) -> str:
+    high = max(start, end, 10)
+    step = 240 / high
+    ticks = "".join(
+        f'<line x1="{10 + i * step:.1f}" y1="44" x2="{10 + i * step:.1f}" y2="54" stroke="{STROKE}"/>'
+        f'<text x="{10 + i * step:.1f}" y="70" text-anchor="middle" {SVG_FONT}>{i}</text>'
+        for i in range(high + 1)
+    )
+    x0, x1 = 10 + start * step, 10 + end * step
+    hop = (
+        f'<path d="M{x0:.1f} 44 Q{(x0 + x1) / 2:.1f} 4 {x1:.1f} 44" fill="none" stroke="{FILL}" stroke-width="3"/>'
+        f'<circle cx="{x1:.1f}" cy="49" r="5" fill="{FILL}"/>'
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 260 80" role="img" '
+        f'aria-label="Number line hop from {start} to {end}">'
+        f'<line x1="10" y1="49" x2="250" y2="49" stroke="{STROKE}" stroke-width="2"/>{ticks}{hop}</svg>'
+    )
+
+
+def body_system_svg(system: BodySystem) -> str:
+    rows = "".join(
+        f'<text x="16" y="{64 + i * 20}" {SVG_FONT}>• <tspan font-weight="bold">{escape(part)}</tspan>'
+        f'{escape(" - " + description) if description else ""}</text>'
+        for i, (part, description) in enumerate(system.parts)
+    )
+    height = 76 + 20 * max(0, len(system.parts) - 1)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 300 {height}" role="img" '
+        f'aria-label="{escape(system.title)}">'
+        f'<rect x="2" y="2" width="296" height="{height - 4}" rx="12" fill="#FFF8E1" stroke="{STROKE}" stroke-width="2"/>'
+        f'<text x="16" y="30" font-family="sans-serif" font-size="17" font-weight="bold">'
+        f'{system.emoji} {escape(system.title)}</text>'
+        f'<text x="16" y="46" {SVG_FONT} fill="#6D4C41">{escape(system.subtitle)}</text>{rows}</svg>'
+    )
+
+
+class VisualService:
+    """
+    Local emoji, ASCII and SVG visuals for an answer
+
+    Everything is built from content/ and small lexicons when the service
+    starts: body-system diagram cards are parsed from the curriculum and
+    rendered once, fraction bars are rendered for every fraction up to
+    twelfths, and concept emoji come from EMOJI_LEXICON plus the emoji each
+    lesson itself uses. Per answer it is a few regex passes and lookups -
+    no network, well under a millisecond for a typical question and answer.
+    """
+
+    def __init__(self, chunks: Optional[List[ContentChunk]] = None, content_dir: Optional[str] = None):
+        retrieval = get_retrieval_service() if chunks is None or content_dir is None else None
+        chunks = chunks if chunks is not None else retrieval.chunks
+        content_dir = content_dir or retrieval.content_dir
+
+        self.classifier = get_topic_classifier()
+        subjects = {chunk.subject for chunk in chunks}
+        self.topic_emoji = lesson_emoji(chunks, subjects)
+
+        self.emoji_by_term = {term: emoji for emoji, terms in EMOJI_LEXICON.items() for term in terms}
+        self.emoji_pattern = re.compile(rf"\b{trie_pattern(self.emoji_by_term)}\b")
+
+        self.systems = parse_body_systems(content_dir)
+        self.system_by_term: Dict[str, BodySystem] = {}
+        for system in self.systems:
+            for term in body_system_terms(system):
+                self.system_by_term.setdefault(term, system)
+        self.system_pattern = (
+            re.compile(rf"\b{trie_pattern(self.system_by_term)}\b") if self.system_by_term else None
+        )
+        self.system_svgs = {system.name: body_system_svg(system) for system in self.systems}
+
+        self.fraction_svgs = {
+            (numerator, denominator): fraction_bar_svg(numerator, denominator)
+            for denominator in range(2, MAX_FRACTION_DENOMINATOR + 1)
+            for numerator in range(denominator + 1)
+        }
+
+        self.generated = 0
+        self.empty = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        logger.info(
+            f"✅ Visual engine ready: {len(self.systems)} body systems, "
+            f"{len(self.fraction_svgs)} fraction bars, {len(self.emoji_by_term) + len(self.topic_emoji)} emoji concepts"
+        )
+
+    def generate(self, question: str, answer: str = "", depth_level: int = 1) -> List[Dict]:
+        """
+        Visuals for one exchange, diagrams first, at most VISUALS_MAX
+
+        Each visual has a "type", a "text" emoji/ASCII rendering that works
+        everywhere, an optional "svg", and a "description" for alt text.
+        Diagrams come from the question and, past depth 1, from worked
+        examples in the answer; the emoji strip covers both.
+        """
+        if not settings.VISUALS_ENABLED or settings.VISUALS_MAX <= 0:
+            return []
+        started = time.perf_counter()
+        question_lower = question.lower()
+        answer_lower = answer.lower()
+
+        visuals: List[Dict] = []
+        seen = set()
+
+        def add(visual: Optional[Dict]):
+            if visual is not None and visual["description"] not in seen:
+                seen.add(visual["description"])
+                visuals.append(visual)
+
+        sources = [(question_lower, False)]
+        if depth_level >= 2:
+            sources.append((answer_lower, True))
+        for lower, from_answer in sources:
+            for visual in self._arithmetic(lower, from_answer):
+                add(visual)
+            for visual in self._fractions(lower):
+                add(visual)
+            for visual in self._body_systems(lower):
+                add(visual)
+
+        # The emoji strip always keeps a slot
+        strip = self._emoji_strip(question, question_lower, answer_lower)
+        if strip is not None:
+            visuals = visuals[:settings.VISUALS_MAX - 1] + [strip]
+        visuals = visuals[:settings.VISUALS_MAX]
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if visuals:
+            self.generated += 1
+        else:
+            self.empty += 1
+        return visuals
+
+    @staticmethod
+    def describe(visuals: List[Dict]) -> Optional[str]:
+        """Alt text for Message.visual_description"""
+        return "; ".join(visual["description"] for visual in visuals) or None
+
+    def _fractions(self, lower: str) -> List[Dict]:
+        visuals = []
+        for match in FRACTION_RE.finditer(lower):
+            if match.group("vulgar"):
+                numerator, denominator = VULGAR_FRACTIONS[match.group("vulgar")]
+            elif match.group("num"):
+                numerator, denominator = int(match.group("num")), int(match.group("den"))
+            else:
+                numerator = NUMBER_WORDS[match.group("num_word")]
+                denominator = DENOMINATOR_WORDS[match.group("den_word")]
+            svg = self.fraction_svgs.get((numerator, denominator))
+            if svg is None:
+                continue
+            visuals.append({
+                "type": "fraction_bar",
+                "concept": f"{numerator}/{denominator}",
+                "text": f"[{'▰' * numerator}{'▱' * (denominator - numerator)}] {numerator}/{denominator}",
+                "svg": svg,
+                "description": f"A bar cut into {denominator} equal parts with {numerator} shaded: {numerator}/{denominator}"
+            })
+        return visuals
+
+    def _arithmetic(self, lower: str, from_answer: bool) -> List[Dict]:
+        visuals = []
+        for match in ARITHMETIC_RE.finditer(lower):
+            if from_answer and match.group("result") is None:
+                continue  # "1860-1861" in an answer is not a subtraction
+            a, b = int(match.group("a")), int(match.group("b"))
+            op = OPERATORS[match.group("op")]
+            visual = None
+            if op == "+" and a + b <= MAX_NUMBER_LINE:
+                visual = self._number_line(a, b, a + b, "+")
+            elif op == "-" and 0 <= a - b and a <= MAX_NUMBER_LINE:
+                visual = self._number_line(a, b, a - b, "-")
+            elif op == "×" and 0 < a <= MAX_ARRAY_SIDE and 0 < b <= MAX_ARRAY_SIDE:
+                rows = "\n".join(["🔵" * b] * a)
+                visual = {
+                    "type": "array",
+                    "concept": f"{a} × {b}",
+                    "text": f"{rows}\n{a} rows of {b} = {a * b}",
+                    "description": f"{a} rows of {b} dots make {a * b}: {a} × {b} = {a * b}"
+                }
+            elif op == "÷" and 0 < b <= MAX_ARRAY_SIDE and a <= MAX_DIVIDEND:
+                each, left = divmod(a, b)
+                groups = " ".join(f"({'🍪' * each})" for _ in range(b))
+                extra = f" + {'🍪' * left} left over" if left else ""
+                visual = {
+                    "type": "groups",
+                    "concept": f"{a} ÷ {b}",
+                    "text": f"{groups}{extra}",
+                    "description": f"{a} shared into {b} equal groups of {each}" + (f" with {left} left over" if left else "")
+                }
+            if visual is not None:
+                visuals.append(visual)
+        return visuals
+
+    @staticmethod
+    def _number_line(a: int, b: int, result: int, op: str) -> Dict:
+        if op == "+":
+            text = "🟦" * a + "🟨" * b
+        else:
+            text = "🟦" * result + "❌" * b
+        return {
+            "type": "number_line",
+            "concept": f"{a} {op} {b}",
+            "text": f"{text} → {result}",
+            "svg": number_line_svg(a, result),
+            "description": f"Number line hop from {a} {'forward' if op == '+' else 'back'} {b} to {result}: {a} {op} {b} = {result}"
+        }
+
+    def _body_systems(self, lower: str) -> List[Dict]:
+        if self.system_pattern is None:
+            return []
+        visuals, found = [], []
+        for match in self.system_pattern.finditer(lower):
+            system = self.system_by_term[match.group(0)]
+            if system in found:
+                continue
+            found.append(system)
+            parts = "; ".join(f"{part} - {description}" if description else part for part, description in system.parts)
+            visuals.append({
+                "type": "body_system",
+                "concept": system.title,
+                "text": f"{system.emoji} {system.title} ({system.subtitle}): {parts}",
+                "svg": self.system_svgs[system.name],
+                "description": f"Diagram card of the {system.title.lower()}: {parts}"
+            })
+        return visuals
+
+    def _emoji_strip(self, question: str, question_lower: str, answer_lower: str) -> Optional[Dict]:
+        """Question concepts first (lexicon, then lesson emoji), then the answer's"""
+        emoji, concepts = [], []
+
+        def add(symbol: str, concept: str):
+            if symbol not in emoji:
+                emoji.append(symbol)
+                concepts.append(concept)
+
+        for match in self.emoji_pattern.finditer(question_lower):
+            add(self.emoji_by_term[match.group(0)], match.group(0))
+        for topic in self.classifier.tag(question):
+            for symbol in self.topic_emoji.get(topic, []):
+                add(symbol, topic.lower())
+        for match in self.emoji_pattern.finditer(answer_lower):
+            add(self.emoji_by_term[match.group(0)], match.group(0))
+
+        if not emoji:
+            return None
+        emoji, concepts = emoji[:settings.VISUAL_EMOJI_MAX], concepts[:settings.VISUAL_EMOJI_MAX]
+        return {
+            "type": "emoji",
+            "concept": ", ".join(concepts),
+            "text": " ".join(emoji),
+            "description": f"Emoji for {', '.join(concepts)}"
+        }
+
+    def stats(self) -> Dict:
+        calls = self.generated + self.empty
+        return {
+            "enabled": settings.VISUALS_ENABLED,
+            "generated": self.generated,
+            "empty": self.empty,
+            "mean_ms": round(self.total_ms / calls, 3) if calls else None,
+            "max_ms": round(self.max_ms, 3)
+        }
+
+
+# Global visual service instance
+_visual_service = None
+
+def get_visual_service() -> VisualService:
+    """Get or create the global visual service instance"""
+    global _visual_service
+    if _visual_service is None:
+        _visual_service = VisualService()
+    return _visual_service
@@ -0,0 +1,111 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
+
+from config import settings
+from services.retrieval_service import SearchHit
+
+logger = logging.getLogger(__name__)
+
+# (name, pattern, weight) - positive weights need fresh information,
+# negative weights mark timeless questions Claude can answer on its own
+FEATURES: List[Tuple[str, "re.Pattern", float]] = [
+    ("time_sensitive", re.compile(
+        r"\b(today|tonight|tomorrow|yesterday|right now|this (week|weekend|month|year)|"
+        r"currently|current|latest|newest|recent|recently|upcoming|next (week|game|year))\b", re.I), 4.0),
+    ("live_topic", re.compile(
+        r"\b(weather forecast|forecast|news|headline|score|scores|who won|standings|schedule|"
+        r"price|prices|cost of|tickets?|open hours|opening hours|is .+ open|flights?|traffic|"
+        r"stock|election|president now|box office|release date|came out|coming out)\b", re.I), 2.0),
+    ("recent_year", re.compile(r"\b20[2-9]\d\b"), 2.0),
+    ("place_lookup", re.compile(r"\b(near me|nearby|how far is|distance (from|to)|directions to)\b", re.I), 2.0),
+    ("arithmetic", re.compile(
+        r"\d+(\.\d+)?\s*(\+|-|\*|x|×|÷|/|plus|minus|times|divided by|multiplied by)\s*\d+", re.I), -3.0),
+    ("math_words", re.compile(
+        r"\b(fraction|decimal|multiply|multiplication|divide|division|add|addition|subtract|"
+        r"subtraction|equation|perimeter|area|volume|angle|shape|number|spell|spelling|"
+        r"noun|verb|adjective|sentence|rhyme)s?\b", re.I), -2.0),
+    ("explain_opener", re.compile(
+        r"^\s*(what (is|are) (a|an|the)\b|why (do|does|is|are|did)\b|how (do|does|did)\b|"
+        r"what does .+ mean|define\b|explain\b)", re.I), -1.0),
+]
+
+# Weight of a curriculum match: strong BM25 hits mean a timeless topic
+CURRICULUM_HIT_WEIGHT = -2.0
+CURRICULUM_STRONG_HIT_WEIGHT = -3.0
+CURRICULUM_STRONG_HIT_SCORE = 6.0
+
+
+@dataclass
+class WebSearchDecision:
+    attach: bool
+    score: float
+    features: List[str] = field(default_factory=list)
+
+
+class WebSearchClassifier:
+    """
+    Decides per question whether Claude gets the web_search tool at all
+
+    Regex features plus the curriculum hit score give a signed total;
+    the tool is attached unless the question leans timeless (score < 0),
+    so ambiguous questions keep the original behavior.
+    """
+
+    def __init__(self):
+        self.offered = 0
+        self.withheld = 0
+        self.offered_used = 0
+
+    def decide(self, question: str, hits: Optional[List[SearchHit]] = None) -> WebSearchDecision:
+        if not settings.WEB_SEARCH_CLASSIFIER_ENABLED:
+            return WebSearchDecision(attach=True, score=0.0)
+
+        score = 0.0
+        features = []
+        for name, pattern, weight in FEATURES:
+            if pattern.search(question):
+                score += weight
+                features.append(name)
+
+        if hits:
+            strong = hits[0].score >= CURRICULUM_STRONG_HIT_SCORE
+            score += CURRICULUM_STRONG_HIT_WEIGHT if strong else CURRICULUM_HIT_WEIGHT
+            features.append("curriculum_strong_hit" if strong else "curriculum_hit")
+
+        decision = WebSearchDecision(attach=score >= 0, score=score, features=features)
+        if decision.attach:
+            self.offered += 1
+        else:
+            self.withheld += 1
+        return decision
+
+    def record(self, decision: WebSearchDecision, used_web_search: bool):
+        """Log the decision next to what Claude actually did"""
+        if decision.attach and used_web_search:
+            self.offered_used += 1
+        logger.info(
+            f"🔍 Web search offered: {decision.attach}, used: {used_web_search} "
+            f"(score {decision.score:+.1f}, features: {', '.join(decision.features) or 'none'})"
+        )
+
+    def stats(self) -> Dict:
+        return {
+            "offered": self.offered,
+            "withheld": self.withheld,
+            "offered_used": self.offered_used,
+            # Share of offered tools Claude actually used - low means we over-offer
+            "offered_precision": round(self.offered_used / self.offered, 3) if self.offered else None
+        }
+
+
+# Global classifier instance
+_web_search_classifier = None
+
+def get_web_search_classifier() -> WebSearchClassifier:
+    """Get or create the global web search classifier instance"""
+    global _web_search_classifier
+    if _web_search_classifier is None:
+        _web_search_classifier = WebSearchClassifier()
+    return _web_search_classifier
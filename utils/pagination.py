@@ -0,0 +1,70 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from sqlalchemy import String, literal, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """A pagination cursor that was not produced by encode_cursor()"""
+
+
+def encode_cursor(position: datetime, row_id: int) -> str:
+    """Opaque cursor for the row at (position, row_id) - the last row of a page"""
+    raw = json.dumps([position.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position, row_id = json.loads(raw)
+        return datetime.fromisoformat(position), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def _bind_timestamp(position: datetime, dialect: str) -> Any:
+    # SQLite keeps timestamps as text: server defaults write
+    # "YYYY-MM-DD HH:MM:SS" while bound datetimes carry ".ffffff", so a
+    # whole-second cursor must be bound in the stored form to compare equal
+    if dialect == "sqlite" and position.microsecond == 0:
+        return literal(position.strftime("%Y-%m-%d %H:%M:%S"), String)
+    return position
+
+
+def keyset_page(
+    statement,
+    columns: Sequence,
+    cursor: Optional[str],
+    limit: int,
+    dialect: str,
+    descending: bool = False
+):
+    """
+    Restrict statement to the page after cursor, ordered by columns
+
+    columns is (timestamp column, id column). The row-value comparison
+    seeks straight into a matching (…, timestamp, id) index, so page N
+    costs the same as page 1. One extra row is fetched; pass the rows to
+    page_rows() to trim it and get the next cursor.
+    """
+    position_column, id_column = columns
+    if cursor:
+        position, row_id = decode_cursor(cursor)
+        key = tuple_(position_column, id_column)
+        bound = tuple_(_bind_timestamp(position, dialect), row_id)
+        statement = statement.where(key < bound if descending else key > bound)
+    order = [position_column.desc(), id_column.desc()] if descending else [position_column, id_column]
+    return statement.order_by(*order).limit(limit + 1)
+
+
+def page_rows(rows: list, limit: int, key) -> Tuple[list, Optional[str]]:
+    """Split a keyset_page() result into the page and the cursor for the next one"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,36 @@
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """SQL statements sent to the database while a count_queries() block ran"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine) -> Iterator[QueryCounter]:
+    """
+    Record every statement the engine executes inside the block
+
+    Works with AsyncEngine (listens on its sync_engine). Used to hold
+    endpoints to a fixed query budget so N+1 patterns do not creep back.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    counter = QueryCounter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)